@@ -0,0 +1,189 @@
+"""End-to-end crawl throughput against the local fake GitHub server.
+
+Every scenario starts a fresh server process and runs ``Crawler.crawl()`` in a fresh process, so peak RSS
+and CPU time belong to that scenario alone. Save a run with ``--save`` and compare later runs against it
+with ``--baseline``.
+"""
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import socket
+import statistics
+import time
+
+from benchmarks.fake_github import serve
+from crawler.config import build_crawler
+from crawler.metrics import Metrics
+from crawler.sinks import BaseExporter, ItemSink
+
+
+SCENARIOS = {
+    'baseline': {'server': {}},
+    'latency': {'server': {'latency': 0.05, 'jitter': 0.02}},
+    # A 429 cools the (only, direct) connection down, keep that short or the scenario measures the cooldown
+    'flaky': {'server': {'latency': 0.02, 'error_rate': 0.05, 'throttle_rate': 0.02}, 'crawler': {'proxy_cooldown': 1}},
+    'html': {'server': {'embedded': False}},
+}
+
+# Higher is better for these, lower for the rest
+THROUGHPUT = ('pages_per_second', 'items_per_second')
+
+
+class RecordingMetrics(Metrics):
+    """Keeps every observed value as well, for exact percentiles."""
+
+    def __init__(self):
+        super().__init__()
+        self.samples = collections.defaultdict(list)
+
+    def observe(self, name: str, value: float, *args, **labels):
+        super().observe(name, value, *args, **labels)
+        self.samples[name].append(value)
+
+
+class NullExporter(BaseExporter):
+
+    def export(self, items):
+        pass
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def percentile(values: list[float], q: int) -> float | None:
+    if len(values) < 2:
+        return values[0] if values else None
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+async def crawl(base_url: str, config: dict) -> dict:
+    metrics = RecordingMetrics()
+    sink = ItemSink(NullExporter(), flush_interval=0.1)
+    crawler = build_crawler({**config, 'base_url': base_url}, sink=sink, metrics=metrics)
+    started = time.perf_counter()
+    await crawler.crawl()
+    elapsed = time.perf_counter() - started
+
+    latencies = metrics.samples['request_latency_seconds']
+    pages = sum(
+        histogram.count for key, histogram in metrics.histograms['request_latency_seconds'].items()
+        if dict(key)['status'] == '200'
+    )
+    usage, children = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        'elapsed': round(elapsed, 3),
+        'requests': len(latencies),
+        'pages': pages,
+        'items': sink.exported,
+        'retries': crawler.retries,
+        'pages_per_second': round(pages / elapsed, 2),
+        'items_per_second': round(sink.exported / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        # ru_maxrss is in KB on Linux
+        'peak_rss_mb': round(max(usage.ru_maxrss, children.ru_maxrss) / 1024, 1),
+        'cpu_seconds': round(usage.ru_utime + usage.ru_stime + children.ru_utime + children.ru_stime, 2),
+        'parse_seconds': round(sum(metrics.samples['parse_seconds']), 3),
+        'wire_mb': round(metrics.total('downloaded_bytes_total') / 2 ** 20, 2),
+        'decoded_mb': round(metrics.total('decoded_bytes_total') / 2 ** 20, 2),
+        **{f'{stage.name}_utilization': round(stage.utilization(), 2) for stage in crawler.stages},
+    }
+
+
+def run_crawl(base_url: str, config: dict) -> dict:
+    logging.basicConfig(level=logging.WARNING)
+    return asyncio.run(crawl(base_url, config))
+
+
+def run_scenario(name: str, scenario: dict, args) -> dict:
+    context = multiprocessing.get_context('spawn')
+    port = free_port()
+    server = context.Process(target=serve, args=(port,), name=f'fake-github-{name}',
+                             kwargs={'rows': args.rows, 'total_pages': args.pages, 'seed': 0,
+                                     **scenario.get('server', {})})
+    server.start()
+    try:
+        wait_for_port(port)
+        config = {
+            'keywords': [f'keyword {index}' for index in range(args.keywords)],
+            'max_pages': args.pages,
+            'parse_executor': args.parse_executor,
+            'parser_backend': args.backend,
+            'concurrency': {'initial': args.concurrency, 'max': args.concurrency},
+            # The fake server has no limits to respect, so they would only measure themselves
+            'rate_limit': {'rate': 1_000_000, 'burst': 1_000_000},
+            'max_per_proxy': args.concurrency,
+            'retry': {'base_delay': 0.05, 'max_delay': 1.0, 'dead_letter': os.devnull},
+            **scenario.get('crawler', {}),
+        }
+        with concurrent.futures.ProcessPoolExecutor(1, mp_context=context) as pool:
+            return pool.submit(run_crawl, f'http://127.0.0.1:{port}', config).result()
+    finally:
+        server.terminate()
+        server.join()
+
+
+def compare(name: str, result: dict, baseline: dict):
+    for metric in ('pages_per_second', 'items_per_second', 'p50_ms', 'p99_ms', 'peak_rss_mb', 'cpu_seconds'):
+        old, new = baseline.get(metric), result.get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old * 100
+        better = change > 0 if metric in THROUGHPUT else change < 0
+        print(f'  {metric:<18} {old:>10} -> {new:<10} {change:+7.1f}% {"better" if better else "worse"}')
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argparser.add_argument('scenarios', nargs='*', help=f'any of {", ".join(SCENARIOS)} (default: all)')
+    argparser.add_argument('--keywords', type=int, default=10)
+    argparser.add_argument('--pages', type=int, default=5, help='search result pages per keyword')
+    argparser.add_argument('--rows', type=int, default=1500, help='rows of filler markup per page')
+    argparser.add_argument('--concurrency', type=int, default=32)
+    argparser.add_argument('--parse-executor', default='inline')
+    argparser.add_argument('--backend', default='html.parser')
+    argparser.add_argument('--save', help='write the results to this JSON file')
+    argparser.add_argument('--baseline', help='JSON file of an earlier run to compare against')
+    args = argparser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        argparser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    results = {}
+    for name in args.scenarios or SCENARIOS:
+        results[name] = result = run_scenario(name, SCENARIOS[name], args)
+        print(f'{name:<10} ' + '  '.join(f'{key} {value}' for key, value in result.items()))
+        if name in baseline:
+            compare(name, result, baseline[name])
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
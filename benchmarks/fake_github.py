@@ -0,0 +1,127 @@
+"""Local stand-in for github.com that serves search and repository pages.
+
+Every keyword has ``total_pages`` pages of 10 results, each linking to a repository page. Responses can be
+delayed by ``latency`` +- ``jitter`` seconds, fail with a 500 at ``error_rate`` and be throttled with a 429
+and ``Retry-After`` at ``throttle_rate``. Pages are synthetic unless ``pages_dir`` holds recorded
+``search.html`` and ``repository.html``, which are then served for every search and repository.
+
+Run it on its own with ``python -m benchmarks.fake_github --port 8080`` and point ``base_url`` at it.
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+
+from aiohttp import web
+
+from benchmarks.pages import detail_page, embedded_search_page, search_page
+
+
+RESULTS_PER_PAGE = 10
+OWNER_PLACEHOLDER = '__OWNER__'
+# Issue and wiki results link into a repository instead of to it
+RESULT_SUFFIXES = {'issues': '/issues/1', 'wikis': '/wiki/Home'}
+
+
+class FakeGitHub:
+
+    def __init__(self, rows: int = 1500, total_pages: int = 5, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, retry_after: int = 1, embedded: bool = True,
+                 pages_dir: str | None = None, seed: int | None = None, compress: bool = True):
+        self.rows = rows
+        self.total_pages = total_pages
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.embedded = embedded
+        # Like GitHub, compress pages for clients that accept it
+        self.compress = compress
+        self.random = random.Random(seed)
+        self.recorded_search = self.recorded_repository = None
+        if pages_dir is not None:
+            with open(os.path.join(pages_dir, 'search.html')) as f:
+                self.recorded_search = f.read()
+            with open(os.path.join(pages_dir, 'repository.html')) as f:
+                self.recorded_repository = f.read()
+        # Rendered once, only the owner differs between repositories
+        self.repository_template = detail_page(rows, owner=OWNER_PLACEHOLDER)
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.compression])
+        app.router.add_get('/search', self.search)
+        app.router.add_get('/{owner}/{repository}', self.repository)
+        return app
+
+    @web.middleware
+    async def compression(self, request: web.Request, handler) -> web.Response:
+        response = await handler(request)
+        if self.compress and response.status == 200:
+            response.enable_compression()
+        return response
+
+    async def search(self, request: web.Request) -> web.Response:
+        if (failure := await self.misbehave()) is not None:
+            return failure
+        if self.recorded_search is not None:
+            return web.Response(text=self.recorded_search, content_type='text/html')
+        slug = re.sub(r'\W+', '-', request.query.get('q', '')).strip('-') or 'q'
+        page = int(request.query.get('p', 1))
+        suffix = RESULT_SUFFIXES.get(request.query.get('type', '').lower(), '')
+        results = [f'/{slug}-{page}-{position}/repo{suffix}' for position in range(RESULTS_PER_PAGE)]
+        render = embedded_search_page if self.embedded else search_page
+        return web.Response(text=render(self.rows, results, self.total_pages), content_type='text/html')
+
+    async def repository(self, request: web.Request) -> web.Response:
+        if (failure := await self.misbehave()) is not None:
+            return failure
+        if self.recorded_repository is not None:
+            return web.Response(text=self.recorded_repository, content_type='text/html')
+        body = self.repository_template.replace(OWNER_PLACEHOLDER, request.match_info['owner'])
+        return web.Response(text=body, content_type='text/html')
+
+    async def misbehave(self) -> web.Response | None:
+        """Sleep for the configured latency, then maybe answer with an injected failure."""
+        self.requests += 1
+        delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        roll = self.random.random()
+        if roll < self.throttle_rate:
+            self.throttled += 1
+            return web.Response(status=429, headers={'Retry-After': str(self.retry_after)})
+        if roll < self.throttle_rate + self.error_rate:
+            self.errors += 1
+            return web.Response(status=500)
+        return None
+
+
+def serve(port: int, host: str = '127.0.0.1', **options):
+    web.run_app(FakeGitHub(**options).app(), host=host, port=port, print=None, access_log=None)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argparser.add_argument('--port', type=int, default=8080)
+    argparser.add_argument('--rows', type=int, default=1500, help='rows of filler markup per page')
+    argparser.add_argument('--total-pages', type=int, default=5, help='search result pages per keyword')
+    argparser.add_argument('--latency', type=float, default=0.0, help='seconds before every response')
+    argparser.add_argument('--jitter', type=float, default=0.0)
+    argparser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with 500')
+    argparser.add_argument('--throttle-rate', type=float, default=0.0, help='share of requests answered with 429')
+    argparser.add_argument('--html', action='store_true', help='search pages without the embedded JSON')
+    argparser.add_argument('--pages-dir', help='directory with recorded search.html and repository.html')
+    argparser.add_argument('--no-compress', action='store_true', help='ignore Accept-Encoding')
+    args = argparser.parse_args()
+    serve(args.port, rows=args.rows, total_pages=args.total_pages, latency=args.latency, jitter=args.jitter,
+          error_rate=args.error_rate, throttle_rate=args.throttle_rate, embedded=not args.html,
+          pages_dir=args.pages_dir, compress=not args.no_compress)
+
+
+if __name__ == '__main__':
+    main()
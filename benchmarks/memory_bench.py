@@ -0,0 +1,62 @@
+"""Memory held per queued page: raw bytes, bytes plus decoded text, and after ``Response.release()``.
+
+Bytes plus text is what a queued response used to hold: the decoded page and the body aiohttp kept.
+
+Real GitHub pages contain a few non-ASCII characters (``·``, ``…``, emoji in descriptions), and one of them is
+enough to make CPython store the whole decoded page at 2 or 4 bytes per character.
+"""
+import argparse
+import tracemalloc
+
+from benchmarks.pages import detail_page
+from crawler.core import Item, Request, Response
+from crawler.parsers.github import GHSearchPageParser
+
+
+def retained(build, count: int) -> float:
+    """Bytes per object kept alive by ``count`` objects made by ``build``."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [build(index) for index in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument('--rows', type=int, default=1500, help='rows of filler markup per page')
+    argparser.add_argument('--pages', type=int, default=200)
+    argparser.add_argument('--emoji', action='store_true', help='put an emoji in the page, not just a middle dot')
+    args = argparser.parse_args()
+
+    marker = '\N{ROCKET}' if args.emoji else '\N{MIDDLE DOT}'
+    page = detail_page(args.rows).replace('<h2>About</h2>', f'<h2>About {marker}</h2>', 1).encode()
+    parser = GHSearchPageParser()
+
+    def request(index):
+        url = f'https://github.com/a/repo{index}'
+        return Request(url, parser.parse_detail_page, meta={'item': Item(url)})
+
+    def raw(index):
+        # A copy, so every response owns its body like a downloaded one does
+        return Response(f'https://github.com/a/repo{index}', None, bytes(memoryview(page)), request(index))
+
+    def decoded(index):
+        response = raw(index)
+        response.body
+        return response
+
+    def released(index):
+        response = raw(index)
+        response.release()
+        return response
+
+    print(f'page {len(page) // 1024} KB on the wire')
+    for name, build in (('raw bytes', raw), ('decoded', decoded), ('released', released)):
+        print(f'{name:<10} {retained(build, args.pages) / 1024:10.1f} KB per page')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Synthetic GitHub pages sized like real ones: the fields the parser needs surrounded by unrelated markup."""
+import functools
+import json
+
+
+@functools.lru_cache(maxsize=None)
+def noise(rows: int) -> str:
+    return ''.join(
+        f'<div class="react-directory-row"><a href="/file{i}" class="Link--primary">file{i}.py</a>'
+        f'<span class="text-small">commit message {i}</span><relative-time datetime="2024-01-01">Jan 1</relative-time></div>'
+        for i in range(rows)
+    )
+
+
+def default_results() -> list[str]:
+    return [f'/user{i}/repo{i}' for i in range(10)]
+
+
+def search_page(rows: int, results: list[str] | None = None, total_pages: int = 5) -> str:
+    links = ''.join(
+        f'<div class="search-result-item"><div class="search-title"><a href="{path}">{path[1:]}</a></div>'
+        f'<p>description {i}</p></div>'
+        for i, path in enumerate(results if results is not None else default_results())
+    )
+    return (f'<html><body><header>{noise(rows)}</header><div data-testid="results-list">{links}</div>'
+            f'<nav aria-label="Pagination"><a href="?p=2">2</a><a href="?p={total_pages}">{total_pages}</a></nav>'
+            f'{noise(rows)}</body></html>')
+
+
+def embedded_search_page(rows: int, results: list[str] | None = None, total_pages: int = 5) -> str:
+    results = results if results is not None else default_results()
+    payload = {'payload': {'page_count': total_pages, 'results': [
+        {'hl_name': path[1:], 'language': 'Python', 'followers': 10 * i,
+         'repo': {'repository': {'owner_login': path.split('/')[1], 'name': path.split('/')[2],
+                                 'updated_at': '2024-01-01T00:00:00Z'}}}
+        for i, path in enumerate(results)
+    ]}}
+    script = f'<script type="application/json" data-target="react-app.embeddedData">{json.dumps(payload)}</script>'
+    return search_page(rows, results, total_pages).replace('<body>', f'<body>{script}', 1)
+
+
+def detail_page(rows: int, owner: str = 'org') -> str:
+    languages = ''.join(
+        f'<li><a><span class="color-fg-default text-bold mr-1">Lang{i}</span><span>{10 + i}.5%</span></a></li>'
+        for i in range(5)
+    )
+    return (f'<html><body><header>{noise(rows // 4)}</header><a data-hovercard-type="organization">{owner}</a>'
+            f'<main>{noise(rows)}</main><div class="Layout-sidebar"><h2>About</h2><p>text</p>'
+            f'<h2>Languages</h2><ul class="list-style-none">{languages}</ul></div>{noise(rows // 4)}</body></html>')
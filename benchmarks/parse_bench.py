@@ -0,0 +1,64 @@
+"""Per-page parse time of GHSearchPageParser on every installed backend.
+
+Pages are synthetic but sized like real GitHub pages: the fields the parser needs surrounded by
+a few hundred KB of unrelated markup.
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.pages import detail_page, embedded_search_page, search_page
+from crawler.core import Item, Request, Response
+from crawler.parsers.backends import SoupBackend, available_backends, get_backend
+from crawler.parsers.github import GHSearchPageParser
+
+
+def measure(parse, make_response, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        response = make_response()
+        started = time.perf_counter()
+        list(parse(response))
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument('--rows', type=int, default=1500, help='rows of filler markup per page')
+    argparser.add_argument('--repeat', type=int, default=20)
+    args = argparser.parse_args()
+
+    search_html, detail_html = search_page(args.rows), detail_page(args.rows)
+    embedded_html = embedded_search_page(args.rows)
+    print(f'search page {len(search_html) // 1024} KB, detail page {len(detail_html) // 1024} KB')
+
+    backends = {'html.parser (full tree)': SoupBackend('html.parser', targeted=False)}
+    backends.update({name: get_backend(name) for name in available_backends()})
+    for name, backend in backends.items():
+        parser = GHSearchPageParser(backend=backend)
+
+        def search_response():
+            request = Request('https://github.com/search', parser.parse_search_page, meta={'params': {'q': 'x'}})
+            return Response('https://github.com/search?q=x', None, search_html, request)
+
+        def embedded_response():
+            request = Request('https://github.com/search', parser.parse_search_page, meta={'params': {'q': 'x'}})
+            return Response('https://github.com/search?q=x', None, embedded_html, request)
+
+        def detail_response():
+            request = Request('https://github.com/a/b', parser.parse_detail_page, meta={'item': Item('https://github.com/a/b')})
+            return Response('https://github.com/a/b', None, detail_html, request)
+
+        for page, parse, make_response in (
+            ('search', parser.parse_search_page, search_response),
+            ('json', parser.parse_search_page, embedded_response),
+            ('detail', parser.parse_detail_page, detail_response),
+        ):
+            timings = measure(parse, make_response, args.repeat)
+            print(f'{name:<26} {page:<7} mean {statistics.mean(timings) * 1000:8.2f} ms  '
+                  f'min {min(timings) * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""What reading repository pages as a stream costs on the event loop and what it saves.
+
+For the synthetic detail page it reports how much of the page is read before ``DetailPageStream`` is done,
+the time the matcher spends on the loop doing so, the same chunks run through an ``html.parser`` tokenizer
+(what a tokenizing matcher would cost at least) and the targeted parse of the whole page for scale.
+"""
+import argparse
+import statistics
+import time
+from html.parser import HTMLParser
+
+from benchmarks.pages import detail_page
+from crawler.core import Item, Request, Response
+from crawler.parsers.github import DetailPageStream, GHSearchPageParser
+from crawler.streaming import DEFAULT_CHUNK_SIZE
+
+
+def chunked(body: bytes, size: int) -> list[bytes]:
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def scan(chunks: list[bytes]) -> int:
+    """Bytes fed before the matcher was done."""
+    matcher = DetailPageStream(need_owner=False)
+    read = 0
+    for chunk in chunks:
+        read += len(chunk)
+        matcher.feed(chunk)
+        if matcher.done:
+            break
+    return read
+
+
+def tokenize(chunks: list[bytes]):
+    tokenizer = HTMLParser()
+    for chunk in chunks:
+        tokenizer.feed(chunk.decode())
+
+
+def timed(function, *args, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument('--rows', type=int, default=1500, help='rows of filler markup per page')
+    argparser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    argparser.add_argument('--repeat', type=int, default=20)
+    args = argparser.parse_args()
+
+    body = detail_page(args.rows).encode()
+    chunks = chunked(body, args.chunk_size)
+    read = scan(chunks)
+    read_chunks = chunked(body[:read], args.chunk_size)
+    print(f'detail page {len(body) // 1024} KB, read {read // 1024} KB ({read / len(body):.0%}) before done')
+
+    parser = GHSearchPageParser()
+
+    def parse(page: bytes):
+        request = Request('https://github.com/a/b', parser.parse_detail_page,
+                          meta={'item': Item('https://github.com/a/b'), 'owner': 'a'})
+        list(parser.parse_detail_page(Response('https://github.com/a/b', None, page, request)))
+
+    for name, timings in (
+        ('byte scan (on the loop)', timed(scan, chunks, repeat=args.repeat)),
+        ('html.parser tokenizer (on the loop)', timed(tokenize, read_chunks, repeat=args.repeat)),
+        ('targeted parse, whole page (pool)', timed(parse, body, repeat=args.repeat)),
+        ('targeted parse, streamed part (pool)', timed(parse, body[:read], repeat=args.repeat)),
+    ):
+        print(f'{name:<38} mean {statistics.mean(timings) * 1000:8.2f} ms  min {min(timings) * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Iterator, Mapping, Optional
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'GHA1'
+# magic, codec id, metadata length, compressed body length
+HEADER = struct.Struct('>4sBII')
+
+
+class ArchiveModes:
+    record = 'record'
+    replay = 'replay'
+
+
+class ZlibCodec:
+    id = 1
+
+    def __init__(self, level: Optional[int] = None):
+        self.level = 6 if level is None else level
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class ZstdCodec:
+    id = 2
+
+    def __init__(self, level: Optional[int] = None):
+        import zstandard
+        self.compressor = zstandard.ZstdCompressor(level=3 if level is None else level)
+        self.decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self.decompressor.decompress(data)
+
+
+CODECS = {
+    'zlib': ZlibCodec,
+    'zstd': ZstdCodec,
+}
+
+
+@dataclass
+class ArchivedResponse:
+    fingerprint: str
+    url: str
+    status: int
+    headers: dict = field(repr=False)
+    body: bytes = field(repr=False)
+    encoding: str = 'utf-8'
+    fetched_at: float = 0.0
+
+
+class ResponseArchive:
+    """Append-only file of fetched pages for re-parsing them later without the network.
+
+    Every record is a fixed header, the page's URL, status and headers as JSON and its body compressed with
+    ``codec``. Records are never rewritten: fetching a page again appends a new record and the index, a SQLite
+    file next to the archive mapping request fingerprints to record offsets, points at the latest one.
+    The index is only committed every ``commit_every`` records; records written after the last commit (or by
+    a crash) are picked up by scanning the end of the file when the archive is opened again.
+    """
+
+    def __init__(self, path: str, mode: str = ArchiveModes.record, codec: str = 'zlib', level: Optional[int] = None,
+                 commit_every: int = 1000):
+        if mode not in (ArchiveModes.record, ArchiveModes.replay):
+            raise ValueError(f'Unknown archive mode {mode!r}')
+        self.path = path
+        self.mode = mode
+        self.codec = CODECS[codec](level)
+        self._codecs = {self.codec.id: self.codec}
+        self.commit_every = commit_every
+        self.written = 0
+        self.hits = 0
+        self.misses = 0
+        self._uncommitted = 0
+        self._lock = threading.Lock()
+        self.file = open(path, 'a+b' if mode == ArchiveModes.record else 'rb')
+        self.connection = sqlite3.connect(f'{path}.idx', check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS records (fingerprint TEXT PRIMARY KEY, offset INTEGER, length INTEGER)'
+        )
+        self._catch_up()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == ArchiveModes.replay
+
+    def _codec(self, codec_id: int):
+        codec = self._codecs.get(codec_id)
+        if codec is None:
+            name = next(name for name, codec_cls in CODECS.items() if codec_cls.id == codec_id)
+            codec = self._codecs[codec_id] = CODECS[name]()
+        return codec
+
+    def _catch_up(self):
+        """Index the records past the last committed one and drop a record cut short by a crash."""
+        size = os.fstat(self.file.fileno()).st_size
+        with self.connection:
+            # Index rows never outlive their data, but the file may have been truncated by hand
+            self.connection.execute('DELETE FROM records WHERE offset + length > ?', (size,))
+        end = self.connection.execute('SELECT COALESCE(MAX(offset + length), 0) FROM records').fetchone()[0]
+        indexed = 0
+        for offset, length, meta in self._scan(end, size):
+            self.connection.execute(
+                'INSERT OR REPLACE INTO records VALUES (?, ?, ?)', (meta['fingerprint'], offset, length)
+            )
+            end = offset + length
+            indexed += 1
+        self.connection.commit()
+        if indexed:
+            logger.info('Indexed %s archived responses missing from %s.idx', indexed, self.path)
+        if end < size and self.mode == ArchiveModes.record:
+            logger.warning('Dropping %s bytes of an incomplete record at the end of %s', size - end, self.path)
+            self.file.truncate(end)
+
+    def _scan(self, start: int, end: int) -> Iterator[tuple[int, int, dict]]:
+        """Offset, length and metadata of the complete records between ``start`` and ``end``."""
+        offset = start
+        while offset + HEADER.size <= end:
+            magic, _, meta_length, body_length = HEADER.unpack(os.pread(self.file.fileno(), HEADER.size, offset))
+            length = HEADER.size + meta_length + body_length
+            if magic != MAGIC or offset + length > end:
+                return
+            meta = json.loads(os.pread(self.file.fileno(), meta_length, offset + HEADER.size))
+            yield offset, length, meta
+            offset += length
+
+    def write(self, fingerprint: str, url: str, status: int, headers: Mapping[str, str], body: bytes,
+              encoding: str = 'utf-8'):
+        meta = json.dumps({
+            'fingerprint': fingerprint, 'url': url, 'status': status, 'headers': dict(headers),
+            'encoding': encoding, 'fetched_at': time.time(),
+        }).encode()
+        payload = self.codec.compress(body)
+        with self._lock:
+            offset = self.file.seek(0, os.SEEK_END)
+            self.file.write(HEADER.pack(MAGIC, self.codec.id, len(meta), len(payload)))
+            self.file.write(meta)
+            self.file.write(payload)
+            self.connection.execute(
+                'INSERT OR REPLACE INTO records VALUES (?, ?, ?)',
+                (fingerprint, offset, HEADER.size + len(meta) + len(payload))
+            )
+            self.written += 1
+            self._uncommitted += 1
+            if self._uncommitted >= self.commit_every:
+                self._commit()
+
+    def _commit(self):
+        # Data first, so a committed index row always points at a complete record
+        self.file.flush()
+        self.connection.commit()
+        self._uncommitted = 0
+
+    def get(self, fingerprint: str) -> Optional[ArchivedResponse]:
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT offset, length FROM records WHERE fingerprint = ?', (fingerprint,)
+            ).fetchone()
+            if row is not None and self._uncommitted:
+                self.file.flush()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._load(*row)
+
+    def _load(self, offset: int, length: int) -> ArchivedResponse:
+        data = os.pread(self.file.fileno(), length, offset)
+        _, codec_id, meta_length, _ = HEADER.unpack_from(data)
+        meta = json.loads(data[HEADER.size:HEADER.size + meta_length])
+        body = self._codec(codec_id).decompress(data[HEADER.size + meta_length:])
+        return ArchivedResponse(body=body, **meta)
+
+    def __iter__(self) -> Iterator[ArchivedResponse]:
+        """Every record in the order it was written, including ones superseded by a later fetch."""
+        with self._lock:
+            if self._uncommitted:
+                self.file.flush()
+        size = os.fstat(self.file.fileno()).st_size
+        for offset, length, _ in self._scan(0, size):
+            yield self._load(offset, length)
+
+    def __len__(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self.mode == ArchiveModes.record:
+                self._commit()
+            self.connection.close()
+            self.file.close()
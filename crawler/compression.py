@@ -0,0 +1,124 @@
+"""Content-Encoding negotiation and decoding for the fetch path.
+
+Sessions are opened with ``auto_decompress=False`` so the crawler sees the bytes as they came over the wire:
+that is what proxies bill for, and it lets streamed reads decompress chunk by chunk. Brotli and zstd are only
+advertised when their package (``brotli``/``brotlicffi``, ``zstandard``) is installed.
+"""
+import zlib
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        import brotlicffi as brotli
+    return brotli
+
+
+def _zstandard():
+    import zstandard
+    return zstandard
+
+
+class IdentityDecoder:
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b''
+
+
+class ZlibDecoder:
+
+    def __init__(self, encoding: str):
+        # gzip has a header, deflate is usually zlib-wrapped but some servers send it raw
+        self.raw_fallback = encoding == 'deflate'
+        self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS if encoding == 'gzip' else zlib.MAX_WBITS)
+
+    def decompress(self, data: bytes) -> bytes:
+        try:
+            return self.decompressor.decompress(data)
+        except zlib.error:
+            if not self.raw_fallback:
+                raise
+            self.raw_fallback = False
+            self.decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self.decompressor.decompress(data)
+
+    def flush(self) -> bytes:
+        return self.decompressor.flush()
+
+
+class BrotliDecoder:
+
+    def __init__(self, encoding: str):
+        self.decompressor = _brotli().Decompressor()
+
+    def decompress(self, data: bytes) -> bytes:
+        return self.decompressor.process(data)
+
+    def flush(self) -> bytes:
+        return b''
+
+
+class ZstdDecoder:
+
+    def __init__(self, encoding: str):
+        self.decompressor = _zstandard().ZstdDecompressor().decompressobj()
+
+    def decompress(self, data: bytes) -> bytes:
+        return self.decompressor.decompress(data)
+
+    def flush(self) -> bytes:
+        return b''
+
+
+DECODERS = {
+    'gzip': ZlibDecoder,
+    'x-gzip': ZlibDecoder,
+    'deflate': ZlibDecoder,
+    'br': BrotliDecoder,
+    'zstd': ZstdDecoder,
+}
+
+
+def available_encodings() -> list[str]:
+    encodings = ['gzip', 'deflate']
+    for name, module in (('br', _brotli), ('zstd', _zstandard)):
+        try:
+            module()
+        except ImportError:
+            continue
+        encodings.append(name)
+    return encodings
+
+
+def accept_encoding() -> str:
+    """``Accept-Encoding`` value listing every encoding this install can decode, best first."""
+    return ', '.join(reversed(available_encodings()))
+
+
+ACCEPT_ENCODING = accept_encoding()
+
+
+def decoder_for(content_encoding: str | None):
+    """Incremental decoder for a ``Content-Encoding`` header; raises ValueError for encodings it can't undo."""
+    encodings = [value.strip().lower() for value in (content_encoding or '').split(',') if value.strip()]
+    encodings = [encoding for encoding in encodings if encoding != 'identity']
+    if not encodings:
+        return IdentityDecoder()
+    if len(encodings) > 1:
+        raise ValueError(f'Stacked content encodings are not supported: {content_encoding}')
+    decoder_cls = DECODERS.get(encodings[0])
+    if decoder_cls is None:
+        raise ValueError(f'Unsupported content encoding: {encodings[0]}')
+    try:
+        return decoder_cls(encodings[0])
+    except ImportError:
+        raise ValueError(f'Content encoding {encodings[0]} needs a package that is not installed')
+
+
+def decode(body: bytes, content_encoding: str | None) -> bytes:
+    decoder = decoder_for(content_encoding)
+    return decoder.decompress(body) + decoder.flush()
@@ -0,0 +1,94 @@
+"""Builds crawler components from the ``input.json`` config."""
+from crawler.archive import ResponseArchive
+from crawler.compression import ACCEPT_ENCODING
+from crawler.crawler import DEFAULT_BASE_URL, Crawler
+from crawler.dupefilter import DUPEFILTER_REGISTRY
+from crawler.executor import ExecutorModes
+from crawler.hedging import HedgePolicy
+from crawler.httpcache import HttpCache
+from crawler.incremental import RepositoryIndex
+from crawler.parsers.github import DEFAULT_MAX_PAGES
+from crawler.retry import DeadLetterLog, RetryPolicy
+from crawler.sinks import EXPORTER_REGISTRY, ItemSink, JsonLinesExporter, StdoutExporter
+from crawler.streaming import DEFAULT_MAX_BYTES
+
+
+def normalize_proxies(proxies: list[str]) -> list[str]:
+    return [f"http://{proxy}" if not proxy.startswith('http') else proxy for proxy in proxies]
+
+
+def build_sink(output: dict, append: bool = False) -> ItemSink:
+    exporter_cls = EXPORTER_REGISTRY[output.get("exporter", "jsonl")]
+    if exporter_cls is StdoutExporter:
+        exporter = exporter_cls()
+    elif exporter_cls is JsonLinesExporter:
+        exporter = exporter_cls(output.get("path", "output.json"), mode="a" if append else "w")
+    else:
+        exporter = exporter_cls(output.get("path", "output.json"))
+    return ItemSink(
+        exporter,
+        flush_size=output.get("flush_size", 100),
+        flush_interval=output.get("flush_interval", 1.0),
+        buffer_size=output.get("buffer_size", 1000),
+    )
+
+
+def build_crawler(input_data: dict, crawler_cls: type[Crawler] = Crawler, **overrides) -> Crawler:
+    """Crawler configured from ``input_data``; ``overrides`` win over anything derived from it."""
+    concurrency = input_data.get("concurrency", {})
+    rate_limit = input_data.get("rate_limit", {})
+    retry = input_data.get("retry", {})
+    frontier = input_data.get("frontier", {})
+    cache_config = input_data.get("cache")
+    metrics = input_data.get("metrics", {})
+    hedging = input_data.get("hedging")
+    stages = input_data.get("stages", {})
+    archive = input_data.get("archive")
+    incremental = input_data.get("incremental")
+    options = dict(
+        parse_executor=input_data.get("parse_executor", ExecutorModes.process),
+        parse_workers=input_data.get("parse_workers"),
+        max_pages=input_data.get("max_pages", DEFAULT_MAX_PAGES),
+        dupefilter=DUPEFILTER_REGISTRY[input_data.get("dupefilter", "memory")](),
+        cache=HttpCache(**cache_config) if cache_config else None,
+        max_per_proxy=input_data.get("max_per_proxy", 5),
+        proxy_cooldown=input_data.get("proxy_cooldown", 60.0),
+        min_concurrency=concurrency.get("min", 1),
+        max_concurrency=concurrency.get("max", 32),
+        initial_concurrency=concurrency.get("initial", 5),
+        rate_limit=rate_limit.get("rate", 2.0),
+        rate_burst=rate_limit.get("burst", 5),
+        retry_policy=RetryPolicy(
+            max_retries=retry.get("max_retries", 3),
+            base_delay=retry.get("base_delay", 1.0),
+            max_delay=retry.get("max_delay", 60.0),
+            overrides=retry.get("overrides"),
+        ),
+        dead_letter=DeadLetterLog(retry.get("dead_letter", "dead_letter.jsonl")),
+        frontier_size=frontier.get("max_memory", 10_000),
+        frontier_path=frontier.get("spill_path"),
+        parser_backend=input_data.get("parser_backend", "html.parser"),
+        stream_max_bytes=input_data.get("stream_max_bytes", DEFAULT_MAX_BYTES),
+        stats_path=metrics.get("stats_path"),
+        stats_interval=metrics.get("interval", 10.0),
+        metrics_port=metrics.get("port"),
+        base_url=input_data.get("base_url", DEFAULT_BASE_URL),
+        request_timeout=input_data.get("timeout", 30.0),
+        hedging=HedgePolicy(**hedging) if hedging else None,
+        fetch_workers=stages.get("fetch_workers"),
+        parse_stage_workers=stages.get("parse_workers"),
+        parse_queue_size=stages.get("parse_queue", 100),
+        item_workers=stages.get("item_workers", 1),
+        item_queue_size=stages.get("item_queue", 1000),
+        archive=ResponseArchive(**archive) if archive else None,
+        repository_index=RepositoryIndex(**incremental) if incremental else None,
+        accept_encoding=input_data.get("accept_encoding", ACCEPT_ENCODING),
+        ordered_output=input_data.get("ordered_output", True),
+    )
+    options.update(overrides)
+    return crawler_cls(
+        input_data.get("keywords", []),
+        normalize_proxies(input_data.get("proxies", [])),
+        input_data.get("types") or input_data.get("type", "Repositories"),
+        **options,
+    )
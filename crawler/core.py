@@ -1,31 +1,80 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from urllib.parse import urljoin, urlparse
 from typing import Optional
 
 
 class Request:
-    def __init__(self, url, parse_function, meta=None):
+    __slots__ = ('url', 'parse_function', 'meta', 'priority')
+
+    def __init__(self, url, parse_function, meta=None, priority=0):
         self.url = url
         self.parse_function = parse_function
         self.meta = meta if meta else {}
+        self.priority = priority
 
 class Response:
-    def __init__(self, url, response, body, request):
+    """Fetched page. The body is kept as the raw bytes off the wire and only decoded when a parser reads ``body``."""
+    __slots__ = ('url', 'response', 'content', 'encoding', 'request', '_text')
+
+    def __init__(self, url, response, body, request, encoding='utf-8'):
         self.url = url
         self.response = response
-        self.body = body
+        self.encoding = encoding
         self.request = request
-        self.meta = self.request.meta
+        self.content = None
+        self._text = None
+        self.body = body
+
+    @property
+    def meta(self):
+        return self.request.meta
+
+    @property
+    def body(self) -> str:
+        if self._text is None and self.content is not None:
+            self._text = self.content.decode(self.encoding, errors='replace')
+        return self._text
+
+    @body.setter
+    def body(self, body):
+        if isinstance(body, str):
+            self.content, self._text = None, body
+        else:
+            self.content, self._text = body, None
+
+    @property
+    def markup(self) -> str | bytes:
+        """The body for an HTML engine: the text if something already decoded it, the raw bytes otherwise."""
+        return self._text if self._text is not None else self.content
 
     def urljoin(self, url):
-        return urljoin(str(self.response.url), url)
+        return urljoin(str(self.url), url)
+
+    def detach(self):
+        """Copy without the live aiohttp response so it can be pickled into a worker process."""
+        # Bytes when the body hasn't been decoded yet: smaller to pickle, and decoded in the worker
+        body = self.content if self.content is not None else self._text
+        return Response(str(self.url), None, body, self.request, self.encoding)
+
+    def release(self):
+        """Drop the body and the aiohttp response once the page is parsed, they are the bulk of its memory."""
+        self.response = None
+        self.content = None
+        self._text = None
 
 
 
-@dataclass
+@dataclass(slots=True)
 class Item:
     url: str
     extra: Optional[dict] = None
+    # ([type index,] keyword index, page, position) of the search result, used to keep output order stable
+    order: tuple = field(default=(), compare=False, repr=False)
+    # Search type the item was found with, set when a crawl covers several
+    type: Optional[str] = None
 
     def serialize(self):
-        return {'url': self.url, 'extra': self.extra}
\ No newline at end of file
+        data = {'url': self.url, 'extra': self.extra}
+        if self.type is not None:
+            data['type'] = self.type
+        return data
\ No newline at end of file
@@ -2,13 +2,34 @@ import asyncio
 from queue import Queue
 from urllib.parse import urljoin, urlparse
 import logging
-import random
 import ssl
+import time
 
 import aiohttp
 
-from crawler.parsers.github import GHSearchPageParser
+from crawler.archive import ResponseArchive
+from crawler.compression import ACCEPT_ENCODING, decoder_for
+from crawler.parsers.github import DEFAULT_MAX_PAGES, GHIssuesParser, GHSearchPageParser, GHWikisParser
 from crawler.core import Response, Request, Item
+from crawler.dupefilter import BaseDupeFilter, MemoryDupeFilter, request_fingerprint
+from crawler.executor import ExecutorModes, ParseExecutor
+from crawler.hedging import HedgePolicy
+from crawler.httpcache import HttpCache
+from crawler.incremental import RepositoryIndex
+from crawler.limiter import THROTTLE_STATUSES, AdaptiveLimiter
+from crawler.metrics import SIZE_BUCKETS, Metrics, MetricsServer, StatsReporter
+from crawler.ordering import OutputOrder, work_bound
+from crawler.pipeline import Stage
+from crawler.proxies import ProxyPool
+from crawler.ratelimit import RateLimiter
+from crawler.retry import DeadLetterLog, DelayedQueue, RetryPolicy
+from crawler.scheduler import Priority, Scheduler
+from crawler.streaming import DEFAULT_MAX_BYTES, read_until
+from crawler.sinks import ItemSink
+from crawler.state import CrawlState
+
+
+DEFAULT_BASE_URL = 'https://github.com'
 
 
 class ParserTypes:
@@ -18,90 +39,513 @@ class ParserTypes:
 
 
 PARSER_REGISTRY = {
-    ParserTypes.repository: GHSearchPageParser
+    ParserTypes.repository: GHSearchPageParser,
+    ParserTypes.issues: GHIssuesParser,
+    ParserTypes.wikis: GHWikisParser,
 }
 
 
+def parse_function_name(request: Request) -> str:
+    """Label for metrics broken down by page type."""
+    return getattr(request.parse_function, '__name__', 'unknown')
+
+
+def build_proxy_pool(proxies: list[str], **options) -> ProxyPool:
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+    return ProxyPool(proxies, ssl_context=ssl_context, **options)
+
+
 class Crawler:
-    def __init__(self, keywords: list[str], proxies: list[str], type_: str, result_queue: Queue):
+    def __init__(self, keywords: list[str], proxies: list[str], type_: str | list[str], result_queue: Queue | None = None,
+                 parse_executor: str | ParseExecutor = ExecutorModes.inline, parse_workers: int | None = None,
+                 sink: ItemSink | None = None, max_pages: int = DEFAULT_MAX_PAGES,
+                 dupefilter: BaseDupeFilter | None = None, cache: HttpCache | None = None,
+                 max_per_proxy: int = 5, proxy_cooldown: float = 60.0,
+                 min_concurrency: int = 1, max_concurrency: int = 32, initial_concurrency: int = 5,
+                 rate_limit: float = 2.0, rate_burst: int = 5,
+                 retry_policy: RetryPolicy | None = None, dead_letter: DeadLetterLog | None = None,
+                 frontier_size: int = 10_000, frontier_path: str | None = None,
+                 parser_backend: str = 'html.parser', stream_max_bytes: int = DEFAULT_MAX_BYTES,
+                 state: CrawlState | None = None, resume: bool = False,
+                 metrics: Metrics | None = None, stats_path: str | None = None, stats_interval: float = 10.0,
+                 metrics_port: int | None = None, base_url: str = DEFAULT_BASE_URL,
+                 request_timeout: float | None = 30.0, hedging: HedgePolicy | None = None,
+                 fetch_workers: int | None = None, parse_stage_workers: int | None = None,
+                 parse_queue_size: int = 100, item_workers: int = 1, item_queue_size: int = 1000,
+                 archive: ResponseArchive | None = None, repository_index: RepositoryIndex | None = None,
+                 proxy_pool: ProxyPool | None = None, limiter: AdaptiveLimiter | None = None,
+                 rate_limiter: RateLimiter | None = None, accept_encoding: str | None = ACCEPT_ENCODING,
+                 ordered_output: bool = True):
         self.keywords = keywords
+        self.base_url = base_url
         self.proxies = proxies
-        self.proxy = random.choice(self.proxies) if self.proxies else None
-        self.type = type_.lower()
-        # TODO handle unexpected type
-        self.parser = PARSER_REGISTRY[self.type]()
-        self.queue = asyncio.Queue()
+        # Several types are crawled in one pass, sharing the frontier, connections, dupefilter and limits
+        self.types = [name.lower() for name in ([type_] if isinstance(type_, str) else type_)]
+        unknown = [name for name in self.types if name not in PARSER_REGISTRY]
+        if unknown or not self.types:
+            raise ValueError(f'Unknown search types {unknown}, expected some of {list(PARSER_REGISTRY)}')
+        self.parsers = {
+            name: PARSER_REGISTRY[name](max_pages=max_pages, backend=parser_backend) for name in self.types
+        }
+        self.type = self.types[0]
+        self.parser = self.parsers[self.type]
+        self.queue = Scheduler(max_memory=frontier_size, spill_path=frontier_path)
         self.result_queue = result_queue
+        self.sink = sink
+        # Each keyword's items leave in search result order rather than in the order their pages happened to finish
+        self.output_order = OutputOrder() if ordered_output else None
+        self.dupefilter = dupefilter if dupefilter is not None else MemoryDupeFilter()
+        self.cache = cache
+        self.archive = archive
+        self.repository_index = repository_index
         self.logger = logging.getLogger(__name__)
         self.logger.info(f"Initialized crawler with {len(keywords)} keywords and {len(proxies)} proxies")
-        self.semaphore = asyncio.Semaphore(5)
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
-        self.session = aiohttp.ClientSession(connector=connector)
+        # The limiters and the proxy pool can be shared between crawlers running in one process
+        self.limiter = limiter if limiter is not None else AdaptiveLimiter(
+            initial_concurrency, min_concurrency, max_concurrency
+        )
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter(rate_limit, rate_burst)
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.dead_letter = dead_letter
+        self.delayed = DelayedQueue(self.queue)
+        self.retries = 0
+        self.stream_max_bytes = stream_max_bytes
+        self.request_timeout = request_timeout
+        self.accept_encoding = accept_encoding
+        self.hedging = hedging
+        self.early_aborts = 0
+        self.state = state
+        self.resume = resume
+        self.parse_executor = None
+        self.owns_parse_executor = not isinstance(parse_executor, ParseExecutor)
+        if not self.owns_parse_executor:
+            self.parse_executor = parse_executor
+        elif parse_executor != ExecutorModes.inline:
+            self.parse_executor = ParseExecutor(parse_executor, parse_workers)
+        self.owns_proxy_pool = proxy_pool is None
+        self.proxy_pool = proxy_pool if proxy_pool is not None else build_proxy_pool(
+            proxies, max_per_proxy=max_per_proxy, cooldown=proxy_cooldown
+        )
+        # fetch -> parse -> item. The request frontier is unbounded (it spills to disk) because parsing feeds it;
+        # the queues after it are bounded so a stage that falls behind holds back the one before it
+        self.fetch_stage = Stage('fetch', self.handle_request, fetch_workers or self.limiter.max_limit,
+                                 queue=self.queue)
+        if parse_stage_workers is None:
+            # Enough to keep every pool worker busy, parsing inline only ever runs one page at a time
+            parse_stage_workers = self.parse_executor.workers if self.parse_executor is not None else 1
+        self.parse_stage = Stage('parse', self.handle_response, parse_stage_workers, maxsize=parse_queue_size)
+        self.item_stage = Stage('item', self.handle_item, item_workers, maxsize=item_queue_size)
+        self.stages = (self.fetch_stage, self.parse_stage, self.item_stage)
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.metrics.collect(self.collect_metrics)
+        self.stats_reporter = StatsReporter(self.metrics, stats_path, stats_interval) if stats_path else None
+        self.metrics_server = MetricsServer(self.metrics, metrics_port) if metrics_port else None
+
+    def collect_metrics(self) -> dict[str, float]:
+        values = {
+            'queue_depth': self.queue.qsize(),
+            'delayed_retries': len(self.delayed),
+            'in_flight': self.limiter.in_flight,
+            'concurrency_limit': self.limiter.limit,
+            'retries_total': self.retries,
+            'duplicates_total': self.dupefilter.duplicates,
+            'early_aborts_total': self.early_aborts,
+            'spilled_total': self.queue.spilled,
+            'rate_limit_wait_seconds_total': round(self.rate_limiter.waited, 3),
+        }
+        for stage in self.stages:
+            values.update(stage.stats())
+        if self.hedging is not None:
+            values['hedged_requests_total'] = self.hedging.hedges
+            values['hedge_wins_total'] = self.hedging.wins
+        if self.cache is not None:
+            values['cache_hits_total'] = self.cache.hits
+            values['cache_revalidated_total'] = self.cache.revalidated
+        if self.archive is not None:
+            values['archive_written_total'] = self.archive.written
+            values['archive_replayed_total'] = self.archive.hits
+            values['archive_misses_total'] = self.archive.misses
+        if self.repository_index is not None:
+            values['unchanged_repositories_total'] = self.repository_index.unchanged
+        if self.sink is not None:
+            values['items_exported_total'] = self.sink.exported
+        return values
+
+    def start_requests(self):
+        main_url = urljoin(self.base_url, '/search')
+        for type_index, (type_, parser) in enumerate(self.parsers.items()):
+            for index, keyword in enumerate(self.keywords):
+                order = (index,) if len(self.parsers) == 1 else (type_index, index)
+                meta = {'params': {'q': keyword, 'type': type_}, 'order': order}
+                yield Request(main_url, parser.parse_search_page, meta=meta, priority=Priority.search)
 
     async def start(self):
-        main_url = 'https://github.com/search'
-        for keyword in self.keywords:
-            request = Request(main_url, self.parser.parse_search_page, meta={'params': {'q': keyword, 'type': self.type}})
-            await self.queue.put(request)
+        for request in self.start_requests():
+            await self.schedule(request)
+
+    async def restore(self):
+        """Pick up an interrupted crawl from ``self.state`` instead of starting from the keywords."""
+        for fingerprint in self.state.completed_fingerprints():
+            self.dupefilter.add(fingerprint)
+        pending = self.state.pending_requests()
+        items = self.state.unexported_items()
+        self.logger.info('Resuming with %s pending requests and %s unexported items', len(pending), len(items))
+        for obj in pending + items:
+            self.track(obj)
+            await self.stage_for(obj).put(obj)
+
+    def stage_for(self, obj) -> Stage:
+        if isinstance(obj, Response):
+            return self.parse_stage
+        if isinstance(obj, Item):
+            return self.item_stage
+        return self.fetch_stage
+
+    async def schedule(self, obj):
+        if self.state is not None:
+            if isinstance(obj, Request):
+                self.state.add_request(obj)
+            elif isinstance(obj, Item):
+                self.state.add_item(obj)
+        self.track(obj)
+        await self.stage_for(obj).put(obj)
+
+    def track(self, obj):
+        """Register work that may still produce items, until ``untrack`` is called for it."""
+        if self.output_order is not None:
+            self.output_order.add(work_bound(obj))
+
+    async def untrack(self, obj):
+        if self.output_order is not None:
+            bound = work_bound(obj)
+            self.output_order.done(bound)
+            for item in self.output_order.release(bound):
+                await self.emit(item)
 
     async def orchestrate(self, obj):
-        # TODO Make async
         if isinstance(obj, Request):
-            self.logger.info('Send request to %s', obj.url)
-            response = await self.request(obj)
-            await self.queue.put(response)
+            await self.handle_request(obj)
         elif isinstance(obj, Response):
-            self.logger.info('Get response from %s', obj.request.url)
-            for obj in self.response(obj):
-                await self.queue.put(obj)
+            await self.handle_response(obj)
         elif isinstance(obj, Item):
-            self.logger.info('Item: %s', obj)
-            self.item(obj)
+            await self.handle_item(obj)
+
+    async def handle_request(self, request: Request):
+        try:
+            await self.process_request(request)
+        finally:
+            await self.untrack(request)
+
+    async def process_request(self, request: Request):
+        if self.dupefilter.request_seen(request):
+            self.logger.debug('Skip duplicate request to %s', request.url)
+            return
+        item = await self.unchanged_item(request)
+        if item is not None:
+            self.logger.info('%s is unchanged since the last crawl', request.url)
+            await self.schedule(item)
+            if self.state is not None:
+                self.state.complete(request)
+            return
+        self.logger.info('Send request to %s', request.url)
+        response = await self.request(request)
+        if response is not None:
+            await self.schedule(response)
+
+    async def handle_response(self, response: Response):
+        try:
+            await self.process_response(response)
+        finally:
+            await self.untrack(response)
+
+    async def process_response(self, response: Response):
+        self.logger.info('Get response from %s', response.request.url)
+        request = response.request
+        results = await self.parse(response)
+        response.release()
+        signature = request.meta.get('signature')
+        if self.repository_index is not None and signature is not None:
+            entries = [(obj.url, signature, obj.extra) for obj in results if isinstance(obj, Item)]
+            if entries:
+                await asyncio.to_thread(self.repository_index.store_many, entries)
+        for obj in results:
+            await self.schedule(obj)
+        if self.state is not None:
+            self.state.complete(request)
+
+    async def handle_item(self, item: Item):
+        self.logger.info('Item: %s', item)
+        self.metrics.inc('items_total')
+        if self.output_order is None:
+            await self.emit(item)
+            return
+        self.output_order.hold(item)
+        await self.untrack(item)
+
+    async def emit(self, item: Item):
+        if self.sink is not None:
+            await self.sink.put(item)
         else:
-            self.logger.info('Crawl queue is empty. Exiting')
+            self.item(item)
+
+    async def unchanged_item(self, request: Request) -> Item | None:
+        """The stored item for a detail page whose search listing looks the same as on the last crawl."""
+        signature = request.meta.get('signature')
+        if self.repository_index is None or signature is None or 'item' not in request.meta:
+            return None
+        item = request.meta['item']
+        extra = await asyncio.to_thread(self.repository_index.lookup, item.url, signature)
+        if extra is None:
+            return None
+        return Item(item.url, extra, order=item.order, type=item.type)
+
+    async def request(self, request: Request) -> Response | None:
+        if self.archive is not None and self.archive.replaying:
+            return await self.replay(request)
+        try:
+            headers = {}
+            fingerprint, cached = None, None
+            if self.cache is not None:
+                fingerprint = request_fingerprint(request)
+                cached = await asyncio.to_thread(self.cache.get, fingerprint)
+                if cached is not None and self.cache.is_fresh(cached):
+                    self.cache.hits += 1
+                    self.logger.info('Cache hit for %s', request.url)
+                    return await self.record(Response(cached.url, None, cached.body, request, encoding=cached.encoding))
+                if cached is not None and self.cache.revalidate:
+                    headers = cached.validators()
+            response, body, truncated = await self.fetch(request, headers)
+            if cached is not None and response.status == 304:
+                self.logger.info('Cached copy of %s is still valid', request.url)
+                await asyncio.to_thread(self.cache.refresh, fingerprint, response.headers)
+                return await self.record(
+                    Response(response.url, response, cached.body, request, encoding=cached.encoding)
+                )
+            if response.status >= 400:
+                self.retry(request, f'status {response.status}', status=response.status)
+                return None
+            encoding = response.charset or 'utf-8'
+            if self.cache is not None and response.status == 200 and not truncated:
+                await asyncio.to_thread(
+                    self.cache.store, fingerprint, str(response.url), response.status, body, response.headers, encoding
+                )
+            return await self.record(
+                Response(response.url, response, body, request, encoding=encoding), response.status, response.headers
+            )
+        except Exception as e:
+            self.logger.warning('Exception during request %s: %r', request.url, e)
+            self.retry(request, repr(e), error=e)
+            return None
+
+    async def record(self, response: Response, status: int = 200, headers=None) -> Response:
+        """Append the page to the archive when recording, the 200 of a cache hit or revalidation included."""
+        if self.archive is not None and not self.archive.replaying:
+            await asyncio.to_thread(
+                self.archive.write, request_fingerprint(response.request), str(response.url),
+                200 if status == 304 else status, headers or {}, response.content, response.encoding
+            )
+        return response
+
+    async def replay(self, request: Request) -> Response | None:
+        archived = await asyncio.to_thread(self.archive.get, request_fingerprint(request))
+        if archived is None:
+            self.logger.warning('%s is not in the archive', request.url)
+            if self.state is not None:
+                self.state.complete(request)
+            return None
+        return Response(archived.url, None, archived.body, request, encoding=archived.encoding)
+
+    def retry(self, request: Request, reason: str, status: int | None = None, error: Exception | None = None):
+        retries = request.meta.get('retry_times', 0)
+        if retries >= self.retry_policy.max_retries_for(status, error):
+            self.logger.error('Gave up on %s after %s retries: %s', request.url, retries, reason)
+            if self.dead_letter is not None:
+                self.dead_letter.write(request, reason)
+            if self.state is not None:
+                self.state.complete(request)
             return
+        delay = self.retry_policy.delay(retries)
+        self.logger.info('Retry %s in %.1fs (%s)', request.url, delay, reason)
+        meta = {**request.meta, 'retry_times': retries + 1, 'dont_filter': True}
+        retry_request = Request(request.url, request.parse_function, meta=meta, priority=request.priority)
+        if self.state is not None:
+            self.state.add_request(retry_request)
+        self.track(retry_request)
+        self.delayed.schedule(retry_request, delay)
+        self.retries += 1
 
-    async def request(self, request: Request):
-        async with self.semaphore:
-                try:
-                    params = request.meta.get('params', {})
-                    async with self.session.get(request.url, proxy=self.proxy, params=params) as response:
-                        html = await response.text()
-                        return Response(response.url, response, html, request)
-                except Exception as e:
-                    self.logger.exception('Exception during request: %s', request.url)
-                    return Response(request.url, None, None, request)
+    async def fetch(self, request: Request, headers: dict) -> tuple[aiohttp.ClientResponse, bytes, bool]:
+        # Hedging needs a second route to send the backup through
+        if self.hedging is None or len(self.proxy_pool.states) < 2:
+            return await self.attempt(request, headers)
+        return await self.hedging.run(
+            lambda exclude, on_send: self.attempt(request, headers, exclude, on_send),
+            # A status the retry policy would retry loses to whatever the other attempt brings back
+            lost=lambda result: self.retry_policy.max_retries_for(status=result[0].status) > 0
+        )
+
+    async def attempt(self, request: Request, headers: dict, exclude: tuple = (),
+                      on_send=None) -> tuple[aiohttp.ClientResponse, bytes, bool]:
+        params = request.meta.get('params', {})
+        timeout = request.meta.get('timeout', self.request_timeout)
+        if self.accept_encoding:
+            headers = {'Accept-Encoding': self.accept_encoding, **headers}
+        async with self.limiter.acquire(), self.proxy_pool.acquire(exclude) as proxy:
+            session = self.proxy_pool.session_for(proxy)
+            await self.rate_limiter.wait(request.url, proxy.url)
+            if on_send is not None:
+                on_send(proxy)
+            started = time.monotonic()
+            try:
+                # The deadline covers connecting, the response and reading the body
+                async with asyncio.timeout(timeout):
+                    async with session.get(request.url, proxy=proxy.url, params=params, headers=headers) as response:
+                        body, truncated = await self.read_body(request, response)
+            except Exception as e:
+                latency = time.monotonic() - started
+                self.metrics.observe('request_latency_seconds', latency, proxy=proxy.url or 'direct', status='error')
+                self.proxy_pool.report(proxy, latency, error=e)
+                self.limiter.record(latency, ok=False)
+                raise
+            latency = time.monotonic() - started
+            self.metrics.observe('request_latency_seconds', latency, proxy=proxy.url or 'direct', status=response.status)
+            self.rate_limiter.update(request.url, proxy.url, response.status, response.headers)
+            self.proxy_pool.report(proxy, latency, response.status)
+            self.limiter.record(latency, ok=response.status < 500, throttled=response.status in THROTTLE_STATUSES)
+            if self.hedging is not None and response.status < 500:
+                self.hedging.record(latency)
+            return response, body, truncated
+
+    async def read_body(self, request: Request, response: aiohttp.ClientResponse) -> tuple[bytes, bool]:
+        if response.status == 304:
+            return b'', False
+        encoding = response.headers.get('Content-Encoding')
+        content_decoder = decoder_for(encoding)
+        matcher_cls = request.meta.get('stream')
+        # A recorded or cached page has to be complete, a later version of the parser may read more of it
+        if matcher_cls is None or response.status != 200 or self.archive is not None or self.cache is not None:
+            # Bytes, decoding the charset is left to whoever parses the page
+            raw = await response.read()
+            body, truncated = content_decoder.decompress(raw) + content_decoder.flush(), False
+        else:
+            body, truncated = await read_until(response, matcher_cls.for_request(request), self.stream_max_bytes,
+                                               content_decoder=content_decoder)
+        # What came over the wire (and what proxies bill for) against the size of the page itself
+        encoding = encoding or 'identity'
+        self.metrics.inc('downloaded_bytes_total', response.content.total_bytes, encoding=encoding)
+        self.metrics.inc('decoded_bytes_total', len(body), encoding=encoding)
+        # Per page type, so savings can be told apart between search and repository pages
+        function = parse_function_name(request)
+        self.metrics.observe('response_wire_bytes', response.content.total_bytes, SIZE_BUCKETS, function=function)
+        self.metrics.observe('response_decoded_bytes', len(body), SIZE_BUCKETS, function=function)
+        if truncated:
+            self.early_aborts += 1
+            self.logger.debug('Stopped reading %s after %s bytes', request.url, len(body))
+        return body, truncated
 
     def response(self, response: Response):
         yield from response.request.parse_function(response)
 
+    async def parse(self, response: Response) -> list:
+        started = time.perf_counter()
+        if self.parse_executor is None:
+            results = list(self.response(response))
+        else:
+            results = await self.parse_executor.run(response)
+        self.metrics.observe('parse_seconds', time.perf_counter() - started,
+                             function=parse_function_name(response.request))
+        return results
+
     def item(self, item: Item):
         self.result_queue.put(item)
 
     async def crawl(self):
         self.logger.info('Start crawler')
 
-        await self.start()
-        worker_count = 5
-        workers = [asyncio.create_task(self.worker()) for _ in range(worker_count)]
+        if self.state is not None:
+            await self.state.start()
+        if self.sink is not None:
+            if self.state is not None:
+                self.sink.on_export = self.state.mark_exported
+            await self.sink.start()
+        if self.parse_executor is not None:
+            self.parse_executor.start()
+        # Workers run before the first put: restored work can outgrow the bounded parse and item queues.
+        # Fetch workers are cheap, the limiter decides how many of them have a request in flight
+        for stage in self.stages:
+            stage.start()
+        self.delayed.start()
+        if self.state is not None and self.resume and not self.state.is_empty():
+            await self.restore()
+        else:
+            if self.state is not None:
+                self.state.reset()
+            await self.start()
+        if self.stats_reporter is not None:
+            self.stats_reporter.start()
+        if self.metrics_server is not None:
+            await self.metrics_server.start()
+            self.logger.info('Serving metrics on http://%s:%s/metrics', self.metrics_server.host, self.metrics_server.port)
 
-        await self.queue.join()
+        await self.wait_idle()
+        await self.delayed.stop()
 
-        for _ in range(worker_count):
-            await self.queue.put(None)
+        for stage in self.stages:
+            await stage.stop()
+            self.logger.info('Stage %s: %s workers, %.0f%% busy, %s handled, producers blocked %.1fs',
+                             stage.name, stage.workers, stage.utilization() * 100, stage.processed, stage.blocked)
+        if self.owns_proxy_pool:
+            await self.proxy_pool.close()
+        if self.queue.spilled:
+            self.logger.info('Spilled %s requests to disk', self.queue.spilled)
+        self.queue.close()
+        self.logger.info('Duplicate filter saved %s requests', self.dupefilter.duplicates)
+        self.logger.info('Final concurrency limit: %s', self.limiter.limit)
+        self.logger.info('Waited %.1fs for rate limits', self.rate_limiter.waited)
+        self.logger.info('Retried %s requests', self.retries)
+        self.logger.info('Stopped %s downloads early', self.early_aborts)
+        if self.cache is not None:
+            self.logger.info('Cache served %s responses and revalidated %s', self.cache.hits, self.cache.revalidated)
+            self.cache.close()
+        if self.archive is not None:
+            if self.archive.replaying:
+                self.logger.info('Replayed %s pages from %s, %s were missing',
+                                 self.archive.hits, self.archive.path, self.archive.misses)
+            else:
+                self.logger.info('Archived %s pages to %s', self.archive.written, self.archive.path)
+            await asyncio.to_thread(self.archive.close)
+        if self.repository_index is not None:
+            self.logger.info('Reused %s unchanged repositories', self.repository_index.unchanged)
+            self.repository_index.close()
+        if self.sink is not None:
+            await self.sink.close()
+        if self.parse_executor is not None and self.owns_parse_executor:
+            await asyncio.to_thread(self.parse_executor.shutdown)
+        if self.stats_reporter is not None:
+            await self.stats_reporter.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        if self.state is not None:
+            await self.state.stop()
+            await asyncio.to_thread(self.state.close)
 
-        await asyncio.gather(*workers, return_exceptions=True)
-        await self.session.close()
+    async def abort(self):
+        """Tear down a crawl cancelled half way without waiting for the work still queued."""
+        for stage in self.stages:
+            await stage.cancel()
+        await self.delayed.stop()
+        self.queue.close()
 
-    async def worker(self):
+    async def wait_idle(self):
+        """Return once every stage is drained and no retry is waiting for its delay."""
         while True:
-            obj = await self.queue.get()
-            try:
-                if obj is None:
-                    break
-                await self.orchestrate(obj)
-            finally:
-                self.queue.task_done()
+            for stage in self.stages:
+                await stage.queue.join()
+            # Parsing feeds the fetch stage, so an earlier stage may have picked up work meanwhile
+            if not all(stage.idle for stage in self.stages):
+                continue
+            if not self.delayed:
+                return
+            await self.delayed.wait_empty()
@@ -0,0 +1,97 @@
+import abc
+import hashlib
+import math
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from crawler.core import Request
+
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url: str, params: dict | None = None) -> str:
+    """Lowercase scheme and host, drop default port and fragment, merge ``params`` and sort the query."""
+    parts = urlsplit(str(url))
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f'{netloc}:{parts.port}'
+    path = parts.path.rstrip('/') or '/'
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    query.extend((str(key), str(value)) for key, value in (params or {}).items())
+    return urlunsplit((scheme, netloc, path, urlencode(sorted(query)), ''))
+
+
+def request_fingerprint(request: Request) -> str:
+    canonical = canonicalize_url(request.url, request.meta.get('params'))
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+class BaseDupeFilter(abc.ABC):
+
+    def __init__(self):
+        self.duplicates = 0
+
+    def request_seen(self, request: Request) -> bool:
+        """Record the request and tell whether an equivalent one was seen before."""
+        if request.meta.get('dont_filter'):
+            return False
+        if self.add(request_fingerprint(request)):
+            return False
+        self.duplicates += 1
+        return True
+
+    @abc.abstractmethod
+    def add(self, fingerprint: str) -> bool:
+        """Add fingerprint, return False if it was already present."""
+        pass
+
+
+class MemoryDupeFilter(BaseDupeFilter):
+    def __init__(self):
+        super().__init__()
+        self.fingerprints = set()
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return fingerprint in self.fingerprints
+
+    def add(self, fingerprint: str) -> bool:
+        if fingerprint in self.fingerprints:
+            return False
+        self.fingerprints.add(fingerprint)
+        return True
+
+
+class BloomDupeFilter(BaseDupeFilter):
+    """Fixed-size Bloom filter: memory stays at ``capacity`` sizing, at the cost of rare false positives."""
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        super().__init__()
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(math.ceil(self.size / 8))
+
+    def _positions(self, fingerprint: str):
+        # Double hashing over the two halves of the sha1 digest
+        value = int(fingerprint, 16)
+        first, second = value >> 96, (value >> 32) & 0xFFFFFFFFFFFFFFFF
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(fingerprint))
+
+    def add(self, fingerprint: str) -> bool:
+        added = False
+        for pos in self._positions(fingerprint):
+            mask = 1 << (pos & 7)
+            if not self.bits[pos >> 3] & mask:
+                self.bits[pos >> 3] |= mask
+                added = True
+        return added
+
+
+DUPEFILTER_REGISTRY = {
+    'memory': MemoryDupeFilter,
+    'bloom': BloomDupeFilter,
+}
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import os
+import pickle
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from crawler.core import Response
+
+
+class ExecutorModes:
+    process = 'process'
+    thread = 'thread'
+    inline = 'inline'
+
+
+def parse_response(response: Response) -> list:
+    """Run the request callback and materialize its output so it can cross a process boundary."""
+    return list(response.request.parse_function(response))
+
+
+def default_workers() -> int:
+    return os.process_cpu_count() or 1
+
+
+class ParseExecutor:
+    """Runs parse callbacks off the event loop.
+
+    ``process`` mode falls back to a thread pool when processes can't be spawned,
+    and any callback that can't be pickled (e.g. a lambda) is run inline.
+    """
+
+    def __init__(self, mode: str = ExecutorModes.process, workers: int | None = None):
+        self.mode = mode
+        self.workers = workers or default_workers()
+        self.logger = logging.getLogger(__name__)
+        self._executor: Executor | None = None
+        self._picklable: dict[tuple, bool] = {}
+
+    def start(self):
+        if self._executor is not None or self.mode == ExecutorModes.inline:
+            return
+        if self.mode == ExecutorModes.process:
+            try:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self.logger.info('Started parse process pool with %s workers', self.workers)
+                return
+            except (OSError, NotImplementedError, ImportError):
+                self.logger.warning('Process pool is unavailable, falling back to threads', exc_info=True)
+                self.mode = ExecutorModes.thread
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='parse')
+        self.logger.info('Started parse thread pool with %s workers', self.workers)
+
+    async def run(self, response: Response) -> list:
+        self.start()
+        if self._executor is None:
+            return parse_response(response)
+        loop = asyncio.get_running_loop()
+        if self.mode == ExecutorModes.process:
+            if not self._is_picklable(response.request.parse_function):
+                return parse_response(response)
+            try:
+                return await loop.run_in_executor(self._executor, parse_response, response.detach())
+            except BrokenProcessPool:
+                self.logger.exception('Parse process pool is broken, falling back to threads')
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self.mode = ExecutorModes.thread
+                return await self.run(response)
+        return await loop.run_in_executor(self._executor, parse_response, response)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _is_picklable(self, function) -> bool:
+        """Whether ``function`` can be sent to a worker, checked once per distinct callable rather than per page."""
+        qualname = getattr(function, '__qualname__', None)
+        if qualname is None:
+            return self._check_picklable(function)
+        # Bound methods are new objects on every attribute access, so key on the instance and the name
+        key = (getattr(function, '__self__', None), getattr(function, '__module__', None), qualname)
+        try:
+            picklable = self._picklable.get(key)
+        except TypeError:
+            # Bound to an unhashable instance
+            return self._check_picklable(function)
+        if picklable is None:
+            picklable = self._picklable[key] = self._check_picklable(function)
+            if not picklable:
+                self.logger.debug('%s can not be sent to the process pool, parsing its pages inline', qualname)
+        return picklable
+
+    @staticmethod
+    def _check_picklable(obj) -> bool:
+        try:
+            pickle.dumps(obj)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            return False
+        return True
@@ -0,0 +1,101 @@
+import asyncio
+import collections
+import logging
+from typing import Awaitable, Callable, TypeVar
+
+
+T = TypeVar('T')
+# attempt(exclude, on_send): ``exclude`` are routes the attempt must not use, ``on_send(route)`` is called
+# once it has a route and is about to send
+Attempt = Callable[[tuple, Callable[[object], None]], Awaitable[T]]
+
+
+class HedgePolicy:
+    """Sends a backup copy of a request that is slower than the ``quantile`` of recent latencies.
+
+    The backup goes through a different route, the first successful answer wins and the other attempt is
+    cancelled. An answer ``lost`` says is worth retrying (a 503, say) doesn't count as successful while the
+    other attempt may still do better. At most ``budget`` hedges are sent per request (0.1 = 10% extra load), so hedging can't
+    snowball into doubling the traffic when everything slows down at once.
+    """
+
+    def __init__(self, quantile: float = 0.95, budget: float = 0.1, min_samples: int = 20,
+                 min_delay: float = 0.05, window: int = 500):
+        self.quantile = quantile
+        self.budget = min(max(budget, 0.0), 1.0)
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.latencies = collections.deque(maxlen=window)
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+        self.logger = logging.getLogger(__name__)
+        self._delay: float | None = None
+        self._unsorted = 0
+
+    def record(self, latency: float):
+        self.latencies.append(latency)
+        self._unsorted += 1
+
+    def delay(self) -> float | None:
+        """How long to wait for the first attempt before hedging; None until enough latencies were seen."""
+        if len(self.latencies) < self.min_samples:
+            return None
+        # Sorting the window on every request would cost more than it's worth, the quantile moves slowly
+        if self._delay is None or self._unsorted >= self.min_samples:
+            ordered = sorted(self.latencies)
+            index = min(len(ordered) - 1, int(self.quantile * len(ordered)))
+            self._delay = max(self.min_delay, ordered[index])
+            self._unsorted = 0
+        return self._delay
+
+    def allow(self) -> bool:
+        return self.hedges < self.budget * self.requests
+
+    async def run(self, attempt: Attempt, lost: Callable[[T], bool] | None = None) -> T:
+        self.requests += 1
+        routes = []
+        sent = asyncio.Event()
+
+        def on_send(route):
+            routes.append(route)
+            sent.set()
+
+        primary = asyncio.ensure_future(attempt((), on_send))
+        tasks = [primary]
+        try:
+            delay = self.delay()
+            if delay is None:
+                return await primary
+            # The clock starts when the request goes out, not while it waits for a proxy or a rate limit slot
+            waiter = asyncio.ensure_future(sent.wait())
+            try:
+                await asyncio.wait((primary, waiter), return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiter.cancel()
+            if not primary.done():
+                await asyncio.wait((primary,), timeout=delay)
+            if primary.done() or not self.allow():
+                return await primary
+
+            self.hedges += 1
+            self.logger.debug('Hedging a request after %.2fs', delay)
+            hedge = asyncio.ensure_future(attempt(tuple(routes), lambda route: None))
+            tasks.append(hedge)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and not (lost is not None and lost(task.result())):
+                        if task is hedge:
+                            self.wins += 1
+                        return task.result()
+            # Both failed, an answer (the original's first) tells the caller more than an exception
+            for task in tasks:
+                if task.exception() is None:
+                    return task.result()
+            return await primary
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
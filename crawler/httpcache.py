@@ -0,0 +1,172 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Mapping, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    status: int
+    digest: str
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+    encoding: str = 'utf-8'
+
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.encoding, errors='replace')
+
+    def validators(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """Persistent response cache keyed by request fingerprint.
+
+    Bodies are stored once per content digest under ``objects/``, the index lives in SQLite.
+    Entries younger than ``ttl`` are served without touching the network, older ones are
+    revalidated with their ETag/Last-Modified. Least recently used entries are evicted once
+    the stored bodies exceed ``max_size`` bytes.
+    """
+
+    def __init__(self, directory: str, ttl: float = 24 * 60 * 60, max_size: int = 512 * 1024 * 1024,
+                 revalidate: bool = True):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.revalidate = revalidate
+        self.hits = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'fingerprint TEXT PRIMARY KEY, url TEXT, status INTEGER, digest TEXT, size INTEGER, '
+            'etag TEXT, last_modified TEXT, stored_at REAL, accessed_at REAL, encoding TEXT)'
+        )
+        columns = [row[1] for row in self.connection.execute('PRAGMA table_info(entries)')]
+        if 'encoding' not in columns:
+            # Caches written before the charset was kept, their entries are read as UTF-8
+            self.connection.execute('ALTER TABLE entries ADD COLUMN encoding TEXT')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)')
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, 'objects', digest[:2], digest)
+
+    def get(self, fingerprint: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT url, status, digest, etag, last_modified, stored_at, encoding FROM entries '
+                'WHERE fingerprint = ?',
+                (fingerprint,)
+            ).fetchone()
+            if row is None:
+                return None
+            url, status, digest, etag, last_modified, stored_at, encoding = row
+            try:
+                with open(self._object_path(digest), 'rb') as f:
+                    body = f.read()
+            except FileNotFoundError:
+                logger.warning('Cache object %s is missing, dropping entry', digest)
+                self._delete(fingerprint)
+                return None
+            with self.connection:
+                self.connection.execute(
+                    'UPDATE entries SET accessed_at = ? WHERE fingerprint = ?', (time.time(), fingerprint)
+                )
+        return CacheEntry(url, status, digest, body, etag, last_modified, stored_at, encoding or 'utf-8')
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.stored_at < self.ttl
+
+    def store(self, fingerprint: str, url: str, status: int, body: bytes, headers: Mapping[str, str],
+              encoding: str = 'utf-8'):
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f'{path}.{threading.get_ident()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+            old = self.connection.execute(
+                'SELECT digest FROM entries WHERE fingerprint = ?', (fingerprint,)
+            ).fetchone()
+            now = time.time()
+            with self.connection:
+                self.connection.execute(
+                    'INSERT OR REPLACE INTO entries (fingerprint, url, status, digest, size, etag, last_modified, '
+                    'stored_at, accessed_at, encoding) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (fingerprint, url, status, digest, len(body), headers.get('ETag'),
+                     headers.get('Last-Modified'), now, now, encoding)
+                )
+            if old is not None and old[0] != digest:
+                self._release_object(old[0])
+            self._evict()
+
+    def refresh(self, fingerprint: str, headers: Mapping[str, str]):
+        """Mark an entry fresh again after a 304, picking up new validators if the server sent any."""
+        self.revalidated += 1
+        now = time.time()
+        with self._lock, self.connection:
+            self.connection.execute(
+                'UPDATE entries SET stored_at = ?, accessed_at = ?, '
+                'etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE fingerprint = ?',
+                (now, now, headers.get('ETag'), headers.get('Last-Modified'), fingerprint)
+            )
+
+    def size(self) -> int:
+        row = self.connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM entries)'
+        ).fetchone()
+        return row[0]
+
+    def _evict(self):
+        total = self.size()
+        if total <= self.max_size:
+            return
+        rows = self.connection.execute(
+            'SELECT fingerprint, digest, size FROM entries ORDER BY accessed_at'
+        ).fetchall()
+        for fingerprint, digest, size in rows:
+            if total <= self.max_size:
+                break
+            self._delete(fingerprint)
+            if self._release_object(digest):
+                total -= size
+
+    def _delete(self, fingerprint: str):
+        with self.connection:
+            self.connection.execute('DELETE FROM entries WHERE fingerprint = ?', (fingerprint,))
+
+    def _release_object(self, digest: str) -> bool:
+        """Remove a body file once no entry references it."""
+        in_use = self.connection.execute('SELECT 1 FROM entries WHERE digest = ? LIMIT 1', (digest,)).fetchone()
+        if in_use:
+            return False
+        try:
+            os.remove(self._object_path(digest))
+        except FileNotFoundError:
+            pass
+        return True
+
+    def close(self):
+        self.connection.close()
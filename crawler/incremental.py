@@ -0,0 +1,61 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional
+
+
+class RepositoryIndex:
+    """Repositories seen by earlier crawls, for re-crawls that only fetch what changed.
+
+    For every repository it keeps the signature the search listing showed (last update and star count) and
+    the ``Item.extra`` its detail page produced. While a listing still shows the same signature the stored
+    extra is reused instead of fetching the detail page again. Entries older than ``max_age`` seconds are
+    refetched regardless, which catches changes the listing doesn't reflect.
+
+    The crawler calls ``lookup`` and ``store_many`` through ``asyncio.to_thread``, so the connection is shared
+    between threads behind a lock.
+    """
+
+    def __init__(self, path: str, max_age: Optional[float] = None):
+        self.path = path
+        self.max_age = max_age
+        self.unchanged = 0
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS repositories (url TEXT PRIMARY KEY, signature TEXT, extra TEXT, crawled_at REAL)'
+        )
+
+    def lookup(self, url: str, signature: str) -> Optional[dict]:
+        """The stored extra if ``url`` was crawled while the listing showed ``signature``."""
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT extra, crawled_at FROM repositories WHERE url = ? AND signature = ?', (url, signature)
+            ).fetchone()
+            if row is None:
+                return None
+            extra, crawled_at = row
+            if self.max_age is not None and time.time() - crawled_at > self.max_age:
+                return None
+            self.unchanged += 1
+        return json.loads(extra)
+
+    def store(self, url: str, signature: str, extra: Optional[dict]):
+        self.store_many([(url, signature, extra)])
+
+    def store_many(self, entries: Iterable[tuple[str, str, Optional[dict]]]):
+        """Store ``(url, signature, extra)`` entries in one transaction."""
+        now = time.time()
+        rows = [(url, signature, json.dumps(extra), now) for url, signature, extra in entries]
+        with self._lock, self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO repositories VALUES (?, ?, ?, ?)', rows)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.connection.execute('SELECT COUNT(*) FROM repositories').fetchone()[0]
+
+    def close(self):
+        self.connection.close()
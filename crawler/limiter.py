@@ -0,0 +1,72 @@
+import asyncio
+import contextlib
+import logging
+import time
+
+
+THROTTLE_STATUSES = (429, 503)
+
+
+class AdaptiveLimiter:
+    """AIMD limit on in-flight requests.
+
+    Every healthy response grows the limit by ``increase / limit`` (about ``increase`` per round trip of
+    the whole window). A failure, a throttling status or a latency spike over ``latency_factor`` times
+    the smoothed baseline multiplies it by ``decrease``, at most once per ``decrease_interval`` so one
+    congestion event doesn't collapse the window.
+    """
+
+    def __init__(self, initial: int = 5, min_limit: int = 1, max_limit: int = 32, increase: float = 1.0,
+                 decrease: float = 0.5, latency_factor: float = 2.0, decrease_interval: float = 1.0,
+                 smoothing: float = 0.1):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.decrease_interval = decrease_interval
+        self.smoothing = smoothing
+        self.baseline: float | None = None
+        self.in_flight = 0
+        self.logger = logging.getLogger(__name__)
+        self._last_decrease = 0.0
+        self._changed = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            async with self._changed:
+                self._changed.notify_all()
+
+    def record(self, latency: float, ok: bool = True, throttled: bool = False):
+        spike = self.baseline is not None and latency > self.baseline * self.latency_factor
+        if ok:
+            # Spikes still feed the baseline so a lasting slowdown becomes the new normal
+            self.baseline = latency if self.baseline is None else (
+                (1 - self.smoothing) * self.baseline + self.smoothing * latency
+            )
+        if not ok or throttled or spike:
+            self._backoff(latency)
+            return
+        self._limit = min(self.max_limit, self._limit + self.increase / self._limit)
+
+    def _backoff(self, latency: float):
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_interval:
+            return
+        self._last_decrease = now
+        previous = self.limit
+        self._limit = max(self.min_limit, self._limit * self.decrease)
+        if self.limit != previous:
+            self.logger.info('Concurrency limit lowered from %s to %s (latency %.2fs)', previous, self.limit, latency)
@@ -0,0 +1,239 @@
+"""Counters and latency histograms for a running crawl.
+
+Hot paths only bump a counter or a histogram bucket. Values components already keep (duplicates, retries,
+queue depth, ...) are read by collectors when a snapshot is taken, so they cost nothing in between.
+Snapshots are dumped to a JSON file periodically and can be served in the Prometheus text format.
+"""
+import asyncio
+import bisect
+import collections
+import json
+import logging
+import os
+import time
+from typing import Callable
+
+from aiohttp import web
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+PREFIX = 'gh_crawler_'
+
+
+def label_key(labels: dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def format_labels(key: tuple) -> str:
+    return ','.join(f'{name}={value}' for name, value in key)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # The last slot counts everything above the largest bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the ``q`` quantile, the largest bucket if it is beyond all of them."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+
+
+class Metrics:
+
+    def __init__(self):
+        self.counters: dict[str, dict[tuple, float]] = collections.defaultdict(lambda: collections.defaultdict(float))
+        self.histograms: dict[str, dict[tuple, Histogram]] = collections.defaultdict(dict)
+        self.collectors: list[Callable[[], dict[str, float]]] = []
+        self.started = time.monotonic()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        self.counters[name][label_key(labels)] += value
+
+    def observe(self, name: str, value: float, buckets: tuple = LATENCY_BUCKETS, **labels):
+        series = self.histograms[name]
+        key = label_key(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def collect(self, collector: Callable[[], dict[str, float]]):
+        """Register a callable whose values are read at snapshot time."""
+        self.collectors.append(collector)
+
+    def gauges(self) -> dict[str, float]:
+        values = {}
+        for collector in self.collectors:
+            values.update(collector())
+        return values
+
+    def total(self, name: str) -> float:
+        return sum(self.counters[name].values()) if name in self.counters else 0
+
+    def snapshot(self) -> dict:
+        return {
+            'uptime': round(time.monotonic() - self.started, 3),
+            'counters': {
+                name: {format_labels(key): value for key, value in series.items()}
+                for name, series in self.counters.items()
+            },
+            'histograms': {
+                name: {format_labels(key): histogram.snapshot() for key, histogram in series.items()}
+                for name, series in self.histograms.items()
+            },
+            'gauges': self.gauges(),
+        }
+
+    def prometheus(self) -> str:
+        lines = []
+        for name, series in self.counters.items():
+            lines.append(f'# TYPE {PREFIX}{name} counter')
+            for key, value in series.items():
+                lines.append(f'{PREFIX}{name}{prometheus_labels(key)} {value}')
+        for name, series in self.histograms.items():
+            lines.append(f'# TYPE {PREFIX}{name} histogram')
+            for key, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{PREFIX}{name}_bucket{prometheus_labels(key + (("le", bound),))} {cumulative}')
+                lines.append(f'{PREFIX}{name}_bucket{prometheus_labels(key + (("le", "+Inf"),))} {histogram.count}')
+                lines.append(f'{PREFIX}{name}_sum{prometheus_labels(key)} {histogram.sum}')
+                lines.append(f'{PREFIX}{name}_count{prometheus_labels(key)} {histogram.count}')
+        for name, value in self.gauges().items():
+            kind = 'counter' if name.endswith('_total') else 'gauge'
+            lines.append(f'# TYPE {PREFIX}{name} {kind}')
+            lines.append(f'{PREFIX}{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def prometheus_labels(key: tuple) -> str:
+    if not key:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in key)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(key, escaped)) + '}'
+
+
+class StatsReporter:
+    """Samples the gauges every ``interval`` seconds and rewrites ``path`` with the latest snapshot.
+
+    The dump carries the last ``history`` samples, so queue depth and throughput can be followed over time.
+    """
+
+    def __init__(self, metrics: Metrics, path: str, interval: float = 10.0, history: int = 360):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.history = collections.deque(maxlen=history)
+        self.logger = logging.getLogger(__name__)
+        self._last_items = 0
+        self._last_time = time.monotonic()
+        self._task = None
+
+    def sample(self) -> dict:
+        now = time.monotonic()
+        items = self.metrics.total('items_total')
+        elapsed = now - self._last_time
+        point = {
+            'time': round(now - self.metrics.started, 3),
+            'items_per_second': round((items - self._last_items) / elapsed, 3) if elapsed > 0 else 0.0,
+            **self.metrics.gauges(),
+        }
+        self._last_items, self._last_time = items, now
+        self.history.append(point)
+        return point
+
+    def report(self) -> dict:
+        point = self.sample()
+        snapshot = self.metrics.snapshot()
+        snapshot['items_per_second'] = point['items_per_second']
+        uptime = snapshot['uptime']
+        snapshot['average_items_per_second'] = round(self.metrics.total('items_total') / uptime, 3) if uptime else 0.0
+        snapshot['history'] = list(self.history)
+        return snapshot
+
+    def write(self, snapshot: dict):
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(snapshot, f, indent=2)
+        os.replace(temporary, self.path)
+
+    async def dump(self):
+        # The snapshot is taken on the loop so nothing mutates it while the thread writes it out
+        await asyncio.to_thread(self.write, self.report())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.dump()
+            except OSError:
+                self.logger.exception('Failed to write stats to %s', self.path)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.dump()
+
+
+class MetricsServer:
+    """Serves ``/metrics`` in the Prometheus text format and ``/stats`` as JSON."""
+
+    def __init__(self, metrics: Metrics, port: int, host: str = '127.0.0.1'):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.runner: web.AppRunner | None = None
+
+    async def prometheus(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.metrics.prometheus(), content_type='text/plain', charset='utf-8')
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.metrics.snapshot())
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.prometheus)
+        app.router.add_get('/stats', self.stats)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
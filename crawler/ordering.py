@@ -0,0 +1,102 @@
+import heapq
+import itertools
+from collections import Counter
+from typing import Iterator
+
+from crawler.core import Item, Request, Response
+
+
+def work_bound(obj) -> tuple:
+    """Smallest ``Item.order`` that ``obj``, or anything it leads to, can still produce.
+
+    Every bound is ``(*keyword order, page)``. A search page bounds the items of its own page and of the pages it
+    paginates to. A detail page and an item bound the whole page the item was listed on rather than the item alone,
+    which keeps fewer distinct bounds around.
+    """
+    if isinstance(obj, Item):
+        return obj.order[:-1]
+    if isinstance(obj, Response):
+        obj = obj.request
+    if isinstance(obj, Request):
+        if 'item' in obj.meta:
+            return obj.meta['item'].order[:-1]
+        return (*obj.meta.get('order', ()), obj.meta.get('page', 1))
+    raise TypeError(f'No output order for {obj!r}')
+
+
+class KeywordOrder:
+    """Pending bounds and held items of one keyword."""
+
+    def __init__(self):
+        self.pending = Counter()
+        # Bounds in ``pending``, cleaned up lazily once their count drops to zero
+        self.bounds: list[tuple] = []
+        self.held: list[tuple[tuple, int, Item]] = []
+        self._counter = itertools.count()
+
+    def add(self, bound: tuple):
+        if not self.pending[bound]:
+            heapq.heappush(self.bounds, bound)
+        self.pending[bound] += 1
+
+    def done(self, bound: tuple):
+        # Tolerates work that was handed to a stage directly and never registered
+        if self.pending[bound] <= 1:
+            self.pending.pop(bound, None)
+        else:
+            self.pending[bound] -= 1
+
+    def hold(self, item: Item):
+        heapq.heappush(self.held, (item.order, next(self._counter), item))
+
+    def watermark(self) -> tuple | None:
+        """Smallest bound still pending, None once nothing is."""
+        while self.bounds and not self.pending[self.bounds[0]]:
+            self.pending.pop(heapq.heappop(self.bounds), None)
+        return self.bounds[0] if self.bounds else None
+
+    def release(self) -> Iterator[Item]:
+        """Held items that nothing pending can be ordered before, in order."""
+        watermark = self.watermark()
+        while self.held and (watermark is None or self.held[0][0] < watermark):
+            yield heapq.heappop(self.held)[2]
+
+    def __len__(self) -> int:
+        return len(self.held)
+
+
+class OutputOrder:
+    """Reorder buffer that lets items out in ``Item.order`` no matter which page finished first.
+
+    Every request, response and item on its way through the crawl is registered with its ``work_bound``.
+    An item is held until nothing pending for its keyword can produce an item ordered before it, so each keyword's
+    items come out the same from run to run however requests and retries interleave. Keywords are ordered
+    independently: a slow keyword holds back only its own items, not those of the keywords after it.
+    """
+
+    def __init__(self):
+        self.keywords: dict[tuple, KeywordOrder] = {}
+
+    def add(self, bound: tuple):
+        self.keywords.setdefault(bound[:-1], KeywordOrder()).add(bound)
+
+    def done(self, bound: tuple):
+        keyword = self.keywords.get(bound[:-1])
+        if keyword is not None:
+            keyword.done(bound)
+
+    def hold(self, item: Item):
+        self.keywords.setdefault(item.order[:-2], KeywordOrder()).hold(item)
+
+    def release(self, bound: tuple) -> Iterator[Item]:
+        """Held items of the keyword ``bound`` belongs to that nothing pending can be ordered before, in order."""
+        key = bound[:-1]
+        keyword = self.keywords.get(key)
+        if keyword is None:
+            return
+        yield from keyword.release()
+        if not keyword and keyword.watermark() is None and self.keywords.get(key) is keyword:
+            del self.keywords[key]
+
+    def __len__(self) -> int:
+        return sum(map(len, self.keywords.values()))
@@ -0,0 +1,198 @@
+"""HTML engines the parsers can run on.
+
+A backend turns markup into a tree and runs precompiled CSS selectors over it. Parsers only talk to
+the backend, so switching between ``html.parser``, ``lxml`` and ``selectolax`` is a constructor argument.
+"""
+import abc
+import codecs
+from typing import Any, Callable, Iterable, Optional
+
+import soupsieve
+from bs4 import BeautifulSoup
+from bs4.filter import ElementFilter
+
+
+# (attribute, predicate) pairs; a top-level element matching any of them is kept together with its subtree
+Target = tuple[str, Callable[[str], bool]]
+
+
+def attr_equals(attr: str, *values: str) -> Target:
+    return attr, lambda value: value in values
+
+
+def attr_present(attr: str) -> Target:
+    return attr, lambda value: True
+
+
+def has_class(name: str) -> Target:
+    return 'class', lambda value: name in value.split()
+
+
+def decode_unless_utf8(markup: str | bytes, encoding: Optional[str]) -> str | bytes:
+    """For engines that read bytes as UTF-8 whatever the page declared: other charsets are decoded here."""
+    if isinstance(markup, bytes) and encoding and codecs.lookup(encoding).name != 'utf-8':
+        return markup.decode(encoding, errors='replace')
+    return markup
+
+
+class SubtreeFilter(ElementFilter):
+    """Only builds the subtrees rooted at elements matching one of ``targets``, everything else is skipped."""
+
+    def __init__(self, targets: Iterable[Target]):
+        super().__init__()
+        self.targets = tuple(targets)
+
+    def allow_tag_creation(self, nsprefix: Optional[str], name: str, attrs) -> bool:
+        if not attrs:
+            return False
+        return any(attr in attrs and predicate(attrs[attr]) for attr, predicate in self.targets)
+
+    def allow_string_creation(self, string: str) -> bool:
+        return False
+
+
+class BaseBackend(abc.ABC):
+    name: str
+
+    def __init__(self):
+        self._compiled = {}
+
+    def __getstate__(self):
+        # Compiled selectors are rebuilt lazily on the other side of a process boundary
+        state = self.__dict__.copy()
+        state['_compiled'] = {}
+        return state
+
+    def compiled(self, selector: str):
+        if selector not in self._compiled:
+            self._compiled[selector] = self.compile(selector)
+        return self._compiled[selector]
+
+    @abc.abstractmethod
+    def parse(self, markup: str | bytes, targets: Optional[Iterable[Target]] = None,
+              encoding: Optional[str] = None) -> Any:
+        """Build a tree, optionally only for the subtrees matching ``targets``.
+
+        Bytes are decoded by the engine itself, ``encoding`` is the charset the server declared for them.
+        """
+        pass
+
+    @abc.abstractmethod
+    def compile(self, selector: str) -> Any:
+        pass
+
+    @abc.abstractmethod
+    def select(self, node, selector: str) -> list:
+        pass
+
+    @abc.abstractmethod
+    def select_one(self, node, selector: str) -> Any:
+        pass
+
+    @abc.abstractmethod
+    def text(self, node) -> str:
+        pass
+
+    @abc.abstractmethod
+    def attr(self, node, name: str) -> Optional[str]:
+        pass
+
+    @abc.abstractmethod
+    def parent(self, node) -> Any:
+        pass
+
+
+class SoupBackend(BaseBackend):
+    """BeautifulSoup tree with soupsieve selectors, on top of ``html.parser`` or ``lxml``."""
+
+    def __init__(self, features: str = 'html.parser', targeted: bool = True):
+        super().__init__()
+        self.name = features
+        self.features = features
+        self.targeted = targeted
+
+    def parse(self, markup, targets=None, encoding=None):
+        parse_only = SubtreeFilter(targets) if targets and self.targeted else None
+        if self.features == 'lxml':
+            # bs4's lxml builder ignores from_encoding
+            markup = decode_unless_utf8(markup, encoding)
+        # bs4 only takes a declared encoding along with bytes, it is tried first and sniffing takes over if it fails
+        from_encoding = encoding if isinstance(markup, bytes) else None
+        return BeautifulSoup(markup, features=self.features, parse_only=parse_only, from_encoding=from_encoding)
+
+    def compile(self, selector):
+        return soupsieve.compile(selector)
+
+    def select(self, node, selector):
+        return self.compiled(selector).select(node)
+
+    def select_one(self, node, selector):
+        return self.compiled(selector).select_one(node)
+
+    def text(self, node):
+        return node.text
+
+    def attr(self, node, name):
+        return node.get(name)
+
+    def parent(self, node):
+        return node.parent
+
+
+class SelectolaxBackend(BaseBackend):
+    """Lexbor engine through selectolax; it parses the whole document but an order of magnitude faster."""
+
+    name = 'selectolax'
+
+    def __init__(self):
+        super().__init__()
+        from selectolax.lexbor import LexborHTMLParser
+        self.parser_class = LexborHTMLParser
+
+    def parse(self, markup, targets=None, encoding=None):
+        return self.parser_class(decode_unless_utf8(markup, encoding))
+
+    def compile(self, selector):
+        # selectolax compiles selectors internally and offers no handle for reuse
+        return selector
+
+    def select(self, node, selector):
+        return node.css(self.compiled(selector))
+
+    def select_one(self, node, selector):
+        return node.css_first(self.compiled(selector))
+
+    def text(self, node):
+        return node.text()
+
+    def attr(self, node, name):
+        return node.attributes.get(name)
+
+    def parent(self, node):
+        return node.parent
+
+
+BACKEND_FACTORIES = {
+    'html.parser': lambda: SoupBackend('html.parser'),
+    'lxml': lambda: SoupBackend('lxml'),
+    'selectolax': SelectolaxBackend,
+}
+
+
+def get_backend(name: str = 'html.parser') -> BaseBackend:
+    backend = BACKEND_FACTORIES[name]()
+    if name == 'lxml':
+        # bs4 only complains about a missing tree builder on first use
+        import lxml  # noqa: F401
+    return backend
+
+
+def available_backends() -> list[str]:
+    names = []
+    for name in BACKEND_FACTORIES:
+        try:
+            get_backend(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
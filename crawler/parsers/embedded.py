@@ -0,0 +1,95 @@
+"""Structured data GitHub ships inside its pages.
+
+React-rendered pages carry their payload as JSON in ``<script type="application/json" data-target="...">``.
+Reading it with a regex and ``json.loads`` skips building an HTML tree, and it doesn't break when the markup changes.
+The regex runs on the raw bytes when the page hasn't been decoded, then only the JSON itself is decoded.
+"""
+import functools
+import json
+import logging
+import re
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+SEARCH_RESULT_TAG = re.compile(r'</?em>')
+
+
+def _script_pattern(target: str) -> re.Pattern:
+    return re.compile(
+        r'<script[^>]*data-target="' + re.escape(target) + r'"[^>]*>(.*?)</script>',
+        re.DOTALL,
+    )
+
+
+@functools.cache
+def _bytes_pattern(pattern: re.Pattern) -> re.Pattern:
+    return re.compile(pattern.pattern.encode(), pattern.flags & ~re.UNICODE)
+
+
+EMBEDDED_DATA = _script_pattern('react-app.embeddedData')
+
+
+def extract_embedded_data(body: str | bytes, pattern: re.Pattern = EMBEDDED_DATA,
+                          encoding: str = 'utf-8') -> Optional[dict]:
+    if isinstance(body, bytes):
+        pattern = _bytes_pattern(pattern)
+    match = pattern.search(body)
+    if match is None:
+        return None
+    data = match.group(1)
+    if isinstance(data, bytes):
+        data = data.decode(encoding, errors='replace')
+    try:
+        return json.loads(data)
+    except json.JSONDecodeError:
+        logger.warning('Embedded data is not valid JSON, falling back to HTML')
+        return None
+
+
+def embedded_payload(body: str | bytes, encoding: str = 'utf-8') -> Optional[dict]:
+    data = extract_embedded_data(body, encoding=encoding)
+    if not isinstance(data, dict):
+        return None
+    payload = data.get('payload')
+    return payload if isinstance(payload, dict) else None
+
+
+def result_signature(result: dict) -> Optional[str]:
+    """What the search listing shows about a repository's freshness, None when it shows nothing."""
+    repository = result.get('repo', {}).get('repository', {})
+    updated_at = result.get('updated_at') or repository.get('updated_at')
+    stars = result.get('followers')
+    if updated_at is None and stars is None:
+        return None
+    return f'{updated_at}|{stars}'
+
+
+def search_results(payload: dict) -> Optional[list[dict]]:
+    """Repository results of a search payload as ``{'path', 'owner', 'language', 'signature'}`` dicts."""
+    results = payload.get('results')
+    if not isinstance(results, list):
+        return None
+    parsed = []
+    for result in results:
+        repository = result.get('repo', {}).get('repository', {})
+        owner, name = repository.get('owner_login'), repository.get('name')
+        if owner and name:
+            path = f'/{owner}/{name}'
+        elif result.get('hl_name'):
+            path = '/' + SEARCH_RESULT_TAG.sub('', result['hl_name'])
+            owner = path.split('/')[1]
+        else:
+            continue
+        parsed.append({
+            'path': path, 'owner': owner, 'language': result.get('language'), 'signature': result_signature(result),
+        })
+    return parsed
+
+
+def repository_owner(payload: dict) -> Optional[str]:
+    repo = payload.get('repo')
+    if isinstance(repo, dict):
+        return repo.get('ownerLogin')
+    return None
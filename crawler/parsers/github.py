@@ -1,44 +1,180 @@
 import logging
 from typing import Generator
 
-from bs4 import BeautifulSoup
-
 from crawler.core import Response, Item, Request
 from crawler.parsers import BaseParser
+from crawler.parsers.backends import BaseBackend, attr_equals, attr_present, get_backend, has_class
+from crawler.parsers.embedded import embedded_payload, repository_owner, search_results
+from crawler.scheduler import Priority
+from crawler.streaming import MarkerScan, StreamMatcher, TagBalance
 
 
 logger = logging.getLogger(__name__)
 
+# Search pages fetched per keyword unless configured; GitHub itself stops serving results after page 100
+DEFAULT_MAX_PAGES = 10
+
+# Subtrees the parsers actually read, everything else is skipped by backends that support it
+SEARCH_PAGE_TARGETS = (
+    attr_equals('data-testid', 'results-list'),
+    attr_present('data-total-pages'),
+    attr_equals('aria-label', 'Pagination'),
+    has_class('pagination'),
+)
+LANGUAGE_TARGETS = (
+    has_class('Layout-sidebar'),
+)
+DETAIL_PAGE_TARGETS = (
+    attr_equals('data-hovercard-type', 'organization', 'user'),
+    *LANGUAGE_TARGETS,
+)
+
+
+class DetailPageStream(StreamMatcher):
+    """Done once the owner link and the sidebar's Languages list (or the end of the sidebar) went by."""
+
+    def __init__(self, need_owner: bool = True):
+        self.need_owner = need_owner
+        self.owner = MarkerScan((b'data-hovercard-type="organization"', b'data-hovercard-type="user"'), b'</a>')
+        self.sidebar = MarkerScan(b'Layout-sidebar')
+        self.languages = MarkerScan(b'Languages</h2>', b'</ul>')
+        # Created once the sidebar opens, from inside its opening tag
+        self.sidebar_divs: TagBalance | None = None
+
+    @classmethod
+    def for_request(cls, request):
+        return cls(need_owner='owner' not in request.meta)
+
+    @property
+    def owner_found(self) -> bool:
+        return self.owner.done
+
+    @property
+    def languages_found(self) -> bool:
+        # A sidebar without a Languages section has nothing more to offer once it is closed
+        return self.languages.done or (self.sidebar_divs is not None and self.sidebar_divs.closed)
+
+    @property
+    def done(self) -> bool:
+        return (self.owner_found or not self.need_owner) and self.languages_found
+
+    def feed(self, chunk: bytes):
+        if self.need_owner:
+            self.owner.feed(chunk)
+        if self.sidebar_divs is None:
+            self.sidebar.feed(chunk)
+            if not self.sidebar.done:
+                return
+            self.sidebar_divs = TagBalance(b'div')
+            chunk = self.sidebar.rest
+        self.languages.feed(chunk)
+        self.sidebar_divs.feed(chunk)
+
+
 class GHSearchPageParser(BaseParser):
+    """Repository search: every result's page is fetched for its owner and languages."""
+    type = 'repositories'
+
+    def __init__(self, max_pages: int = DEFAULT_MAX_PAGES, backend: BaseBackend | str = 'html.parser'):
+        self.max_pages = max_pages
+        self.backend = get_backend(backend) if isinstance(backend, str) else backend
 
     def parse_search_page(self, response: Response) -> Generator[Request, None]:
-        soup = BeautifulSoup(response.body, features="html.parser")
-        links = soup.select('div[data-testid="results-list"] div.search-title a')
-        for link in links:
-            url = response.urljoin(link.get('href'))
-            item = Item(url=url)
-            detail_page_request = Request(
-                url=item.url,
-                parse_function=self.parse_detail_page,
-                meta={'item': item}
+        payload = embedded_payload(response.markup, response.encoding)
+        results = search_results(payload) if payload else None
+        if results is not None:
+            yield from self.parse_search_payload(response, payload, results)
+            return
+        yield from self.parse_search_html(response)
+
+    def parse_search_html(self, response: Response) -> Generator[Request | Item, None]:
+        backend = self.backend
+        root = backend.parse(response.markup, SEARCH_PAGE_TARGETS, response.encoding)
+        page = response.meta.get('page', 1)
+        order = response.meta.get('order', ())
+        if page == 1:
+            yield from self.paginate(response, self.total_pages(root))
+
+        links = backend.select(root, 'div[data-testid="results-list"] div.search-title a')
+        for position, link in enumerate(links):
+            yield self.search_result(response.urljoin(backend.attr(link, 'href')), (*order, page, position))
+
+    def search_result(self, url: str, order: tuple) -> Request | Item:
+        """What a result link on the search page turns into."""
+        return self.detail_request(url, order)
+
+    def parse_search_payload(self, response: Response, payload: dict, results: list[dict]) -> Generator[Request, None]:
+        page = response.meta.get('page', 1)
+        order = response.meta.get('order', ())
+        if page == 1:
+            yield from self.paginate(response, payload.get('page_count', 1))
+        for position, result in enumerate(results):
+            meta = {'owner': result['owner']}
+            if result['signature'] is not None:
+                meta['signature'] = result['signature']
+            yield self.detail_request(response.urljoin(result['path']), (*order, page, position), **meta)
+
+    def detail_request(self, url: str, order: tuple, **meta) -> Request:
+        item = Item(url=url, order=order, type=self.type)
+        return Request(
+            url=item.url,
+            parse_function=self.parse_detail_page,
+            meta={'item': item, 'stream': DetailPageStream, **meta},
+            priority=Priority.detail
+        )
+
+    def paginate(self, response: Response, total_pages: int) -> Generator[Request, None]:
+        """Fan out requests for pages 2..N at once so they are fetched concurrently."""
+        params = response.meta.get('params', {})
+        for page in range(2, min(total_pages, self.max_pages) + 1):
+            yield Request(
+                url=response.request.url,
+                parse_function=self.parse_search_page,
+                meta={'params': {**params, 'p': page}, 'page': page, 'order': response.meta.get('order', ())},
+                priority=Priority.search
             )
-            yield detail_page_request
+
+    def total_pages(self, root) -> int:
+        backend = self.backend
+        marker = backend.select_one(root, '[data-total-pages]')
+        if marker:
+            value = backend.attr(marker, 'data-total-pages')
+            try:
+                return int(value)
+            except ValueError:
+                logger.warning('Unexpected total pages value: %s', value)
+        pages = [
+            int(backend.text(link).strip())
+            for link in backend.select(root, 'nav[aria-label="Pagination"] a, div.pagination a')
+            if backend.text(link).strip().isdigit()
+        ]
+        return max(pages, default=1)
 
     def parse_detail_page(self, response) -> Generator[Item, None]:
         item = response.meta['item']
-        soup = BeautifulSoup(response.body, features="html.parser")
+        backend = self.backend
+        owner = response.meta.get('owner')
+        if owner is None:
+            payload = embedded_payload(response.markup, response.encoding)
+            owner = repository_owner(payload) if payload else None
+        # With the owner known only the sidebar is left to read from the HTML
+        root = backend.parse(response.markup, LANGUAGE_TARGETS if owner else DETAIL_PAGE_TARGETS, response.encoding)
         try:
-            owner_element = soup.select_one('a[data-hovercard-type="organization"], a[data-hovercard-type="user"]')
-            owner = owner_element.text.strip()
+            if owner is None:
+                owner_element = backend.select_one(
+                    root, 'a[data-hovercard-type="organization"], a[data-hovercard-type="user"]'
+                )
+                owner = backend.text(owner_element).strip()
 
             language_stats = {}
-            language_section = soup.select_one('div.Layout-sidebar h2:-soup-contains("Languages")')
+            language_section = self.language_section(root)
             if language_section:
-                for tag in language_section.parent.select('ul.list-style-none li a'):
-                    if tag.select_one('span.color-fg-default.text-bold.mr-1'):
+                for tag in backend.select(backend.parent(language_section), 'ul.list-style-none li a'):
+                    if backend.select_one(tag, 'span.color-fg-default.text-bold.mr-1'):
                         try:
-                            language = tag.select('span')[0].text
-                            percentage = float(tag.select('span')[1].text.strip('%'))
+                            spans = backend.select(tag, 'span')
+                            language = backend.text(spans[0])
+                            percentage = float(backend.text(spans[1]).strip('%'))
                             language_stats[language] = percentage
                         except (IndexError, ValueError) as e:
                             logger.warning(f"Failed to parse language stats: {e}")
@@ -52,5 +188,28 @@ class GHSearchPageParser(BaseParser):
             logger.exception("Error parsing detail page", response.url)
             raise e
 
+    def language_section(self, root):
+        # Plain text match instead of :-soup-contains, which only soupsieve understands
+        for heading in self.backend.select(root, 'div.Layout-sidebar h2'):
+            if 'Languages' in self.backend.text(heading):
+                return heading
+        return None
+
+
+class GHSearchListingParser(GHSearchPageParser):
+    """Search types whose results are the output themselves: each result link becomes an item, nothing else is fetched."""
+
+    def parse_search_page(self, response: Response) -> Generator[Request | Item, None]:
+        # The embedded payload only describes repository results
+        yield from self.parse_search_html(response)
+
+    def search_result(self, url: str, order: tuple) -> Item:
+        return Item(url, order=order, type=self.type)
+
+
+class GHIssuesParser(GHSearchListingParser):
+    type = 'issues'
 
 
+class GHWikisParser(GHSearchListingParser):
+    type = 'wikis'
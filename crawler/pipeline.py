@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+
+class Stage:
+    """A pool of ``workers`` tasks draining ``queue`` with ``handler``.
+
+    With a bounded queue ``put`` waits while the stage is behind, so a slow stage throttles the stages
+    that feed it instead of letting their output pile up in memory. ``busy`` is the time workers spent in
+    ``handler`` (including waiting for room further down), ``blocked`` the time producers waited for
+    room in this stage's queue.
+    """
+
+    def __init__(self, name: str, handler: Callable[[object], Awaitable[None]], workers: int = 1,
+                 queue: asyncio.Queue | None = None, maxsize: int = 0):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue = queue if queue is not None else asyncio.Queue(maxsize)
+        self.logger = logging.getLogger(__name__)
+        self.active = 0
+        self.processed = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.started: float | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def idle(self) -> bool:
+        return self.queue.empty() and not self.active
+
+    async def put(self, obj):
+        if not self.queue.full():
+            self.queue.put_nowait(obj)
+            return
+        started = time.monotonic()
+        await self.queue.put(obj)
+        self.blocked += time.monotonic() - started
+
+    def start(self):
+        if self._tasks:
+            return
+        self.started = time.monotonic()
+        self._tasks = [asyncio.create_task(self.work()) for _ in range(self.workers)]
+
+    async def work(self):
+        while True:
+            obj = await self.queue.get()
+            try:
+                if obj is None:
+                    return
+                self.active += 1
+                started = time.monotonic()
+                try:
+                    await self.handler(obj)
+                except Exception:
+                    self.logger.exception('%s stage failed on %r', self.name, obj)
+                finally:
+                    self.busy += time.monotonic() - started
+                    self.active -= 1
+                    self.processed += 1
+            finally:
+                self.queue.task_done()
+
+    async def stop(self):
+        for _ in self._tasks:
+            await self.queue.put(None)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def cancel(self):
+        """Stop the workers right away, dropping whatever is still queued."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def utilization(self) -> float:
+        if self.started is None:
+            return 0.0
+        elapsed = time.monotonic() - self.started
+        return min(1.0, self.busy / (self.workers * elapsed)) if elapsed > 0 else 0.0
+
+    def stats(self) -> dict[str, float]:
+        return {
+            f'{self.name}_workers': self.workers,
+            f'{self.name}_queue_depth': self.queue.qsize(),
+            f'{self.name}_utilization': round(self.utilization(), 3),
+            f'{self.name}_processed_total': self.processed,
+            f'{self.name}_blocked_seconds_total': round(self.blocked, 3),
+        }
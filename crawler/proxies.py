@@ -0,0 +1,151 @@
+import asyncio
+import contextlib
+import logging
+import random
+import ssl
+import time
+from typing import Optional
+
+import aiohttp
+
+
+BAN_STATUSES = (403, 429)
+
+
+class ProxyState:
+    """Health bookkeeping and a dedicated keep-alive connection pool for one proxy.
+
+    ``url`` is None for the direct route used when no proxies are configured.
+    """
+
+    def __init__(self, url: Optional[str], max_concurrency: int):
+        self.url = url
+        self.max_concurrency = max_concurrency
+        self.session: aiohttp.ClientSession | None = None
+        self.in_flight = 0
+        self.latency: float | None = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.requests = 0
+        self.bans = 0
+        self.cooldown_until = 0.0
+
+    def __repr__(self):
+        return f'<ProxyState {self.url} latency={self.latency} error_rate={self.error_rate:.2f}>'
+
+    def available(self, now: float) -> bool:
+        return self.cooldown_until <= now and self.in_flight < self.max_concurrency
+
+    def score(self) -> float:
+        # Untried proxies get a chance first, afterwards the fastest reliable one wins
+        if self.latency is None:
+            return 0.0
+        return self.latency * (1 + 4 * self.error_rate)
+
+
+class ProxyPool:
+    """Spreads requests over all proxies and takes unhealthy ones out for ``cooldown`` seconds.
+
+    A proxy is cooled down when it gets a ban status (403/429), fails ``max_failures`` times in a row,
+    its error rate climbs over ``max_error_rate`` or its average latency goes over ``slow_latency``.
+    """
+
+    def __init__(self, proxies: list[str], max_per_proxy: int = 5, cooldown: float = 60.0,
+                 max_failures: int = 3, max_error_rate: float = 0.5, slow_latency: float = 15.0,
+                 smoothing: float = 0.2, ssl_context: ssl.SSLContext | None = None):
+        self.states = [ProxyState(url, max_per_proxy) for url in proxies] or [ProxyState(None, max_per_proxy)]
+        self.cooldown = cooldown
+        self.max_failures = max_failures
+        self.max_error_rate = max_error_rate
+        self.slow_latency = slow_latency
+        self.smoothing = smoothing
+        self.ssl_context = ssl_context
+        self.logger = logging.getLogger(__name__)
+        self._changed = asyncio.Condition()
+
+    def session_for(self, state: ProxyState) -> aiohttp.ClientSession:
+        if state.session is None or state.session.closed:
+            connector = aiohttp.TCPConnector(
+                ssl=self.ssl_context if self.ssl_context is not None else True,
+                limit=state.max_concurrency,
+            )
+            # Bodies are decoded by the crawler, which needs to see how many bytes crossed the wire
+            state.session = aiohttp.ClientSession(connector=connector, auto_decompress=False)
+        return state.session
+
+    def pick(self, exclude: tuple = ()) -> ProxyState | None:
+        now = time.monotonic()
+        candidates = [state for state in self.states if state.available(now) and state not in exclude]
+        if not candidates:
+            return None
+        best = min(state.score() for state in candidates)
+        return random.choice([state for state in candidates if state.score() == best])
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, exclude: tuple = ()):
+        async with self._changed:
+            while (state := self.pick(exclude)) is None:
+                await self._wait_for_proxy(exclude)
+            state.in_flight += 1
+        try:
+            yield state
+        finally:
+            state.in_flight -= 1
+            async with self._changed:
+                self._changed.notify()
+
+    async def _wait_for_proxy(self, exclude: tuple):
+        now = time.monotonic()
+        cooling = [state.cooldown_until for state in self.states if state.cooldown_until > now and state not in exclude]
+        timeout = min(cooling) - now if cooling else None
+        if timeout is None and all(state in exclude for state in self.states):
+            raise LookupError('No proxy left to try')
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._changed.wait(), timeout)
+
+    def report(self, state: ProxyState, latency: float, status: int | None = None, error: Exception | None = None):
+        state.requests += 1
+        failed = error is not None or (status is not None and status >= 500)
+        banned = status in BAN_STATUSES
+        state.latency = latency if state.latency is None else (
+            (1 - self.smoothing) * state.latency + self.smoothing * latency
+        )
+        state.error_rate = (1 - self.smoothing) * state.error_rate + self.smoothing * (failed or banned)
+        state.failures = state.failures + 1 if failed else 0
+
+        if banned:
+            state.bans += 1
+            self.cool_down(state, f'ban status {status}')
+        elif state.failures >= self.max_failures:
+            self.cool_down(state, f'{state.failures} failures in a row')
+        elif state.requests >= self.max_failures and state.error_rate > self.max_error_rate:
+            self.cool_down(state, f'error rate {state.error_rate:.2f}')
+        elif state.latency > self.slow_latency:
+            self.cool_down(state, f'latency {state.latency:.2f}s')
+
+    def cool_down(self, state: ProxyState, reason: str):
+        self.logger.warning('Cooling down proxy %s for %ss: %s', state.url, self.cooldown, reason)
+        state.cooldown_until = time.monotonic() + self.cooldown
+        # Give the proxy a clean slate when it comes back
+        state.failures = 0
+        state.latency = None
+        state.error_rate = self.max_error_rate / 2
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                'proxy': state.url,
+                'requests': state.requests,
+                'latency': state.latency,
+                'error_rate': state.error_rate,
+                'bans': state.bans,
+                'cooling_down': state.cooldown_until > time.monotonic(),
+            }
+            for state in self.states
+        ]
+
+    async def close(self):
+        for state in self.states:
+            if state.session is not None:
+                await state.session.close()
+                state.session = None
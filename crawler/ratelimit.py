@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import time
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """Token bucket in its virtual-scheduling form.
+
+    Each ``reserve`` call books the next free slot and returns how long the caller has to wait for it, so
+    concurrent callers are spaced ``1 / rate`` apart instead of all waking up at once after a pause.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.interval = 1 / rate
+        self.tolerance = (burst - 1) * self.interval
+        self.next_slot = 0.0
+        self.paused_until = 0.0
+
+    def reserve(self, now: float) -> float:
+        slot = max(self.next_slot, now - self.tolerance)
+        self.next_slot = slot + self.interval
+        start = max(slot, self.paused_until)
+        if start > slot:
+            self.next_slot = start + self.interval
+        return max(0.0, start - now)
+
+    def pause(self, until: float):
+        if until <= self.paused_until:
+            return
+        self.paused_until = until
+        # No burst right after a pause: the first request goes at ``until``, the rest one interval apart
+        self.next_slot = max(self.next_slot, until)
+
+
+class RateLimiter:
+    """Per (host, proxy) token buckets that pause on 429s, ``Retry-After`` and exhausted ``X-RateLimit-*``."""
+
+    def __init__(self, rate: float = 2.0, burst: int = 5, default_pause: float = 60.0):
+        self.rate = rate
+        self.burst = burst
+        self.default_pause = default_pause
+        self.buckets: dict[tuple, TokenBucket] = {}
+        self.waited = 0.0
+        self.logger = logging.getLogger(__name__)
+
+    def bucket(self, url: str, proxy: Optional[str]) -> TokenBucket:
+        key = (urlsplit(str(url)).hostname, proxy)
+        if key not in self.buckets:
+            self.buckets[key] = TokenBucket(self.rate, self.burst)
+        return self.buckets[key]
+
+    async def wait(self, url: str, proxy: Optional[str]):
+        delay = self.bucket(url, proxy).reserve(time.monotonic())
+        if delay > 0:
+            self.waited += delay
+            await asyncio.sleep(delay)
+
+    def update(self, url: str, proxy: Optional[str], status: int, headers: Mapping[str, str]):
+        pause = self.pause_from_headers(status, headers)
+        if pause:
+            self.logger.warning('Rate limited by %s via %s, pausing for %.1fs', urlsplit(str(url)).hostname, proxy, pause)
+            self.bucket(url, proxy).pause(time.monotonic() + pause)
+
+    def pause_from_headers(self, status: int, headers: Mapping[str, str]) -> float:
+        retry_after = headers.get('Retry-After')
+        if retry_after:
+            return self.parse_retry_after(retry_after)
+        if headers.get('X-RateLimit-Remaining') == '0' and headers.get('X-RateLimit-Reset'):
+            try:
+                return max(0.0, float(headers['X-RateLimit-Reset']) - time.time())
+            except ValueError:
+                pass
+        if status == 429:
+            return self.default_pause
+        return 0.0
+
+    def parse_retry_after(self, value: str) -> float:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return self.default_pause
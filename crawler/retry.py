@@ -0,0 +1,122 @@
+import asyncio
+import heapq
+import itertools
+import json
+import random
+import time
+
+import aiohttp
+
+from crawler.core import Request
+
+
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+RETRY_EXCEPTIONS = (aiohttp.ClientError, asyncio.TimeoutError, OSError)
+
+
+class RetryPolicy:
+    """Decides whether and when a failed request is tried again.
+
+    ``overrides`` maps a status code or an exception class (or its name, for JSON configs) to its own
+    retry count, e.g. ``{429: 8, 'ClientProxyConnectionError': 1, 404: 0}``.
+    """
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 60.0,
+                 retry_statuses: tuple = RETRY_STATUSES, retry_exceptions: tuple = RETRY_EXCEPTIONS,
+                 overrides: dict | None = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = retry_statuses
+        self.retry_exceptions = retry_exceptions
+        self.overrides = overrides or {}
+
+    def max_retries_for(self, status: int | None = None, error: Exception | None = None) -> int:
+        if error is not None:
+            for cls in type(error).__mro__:
+                for key in (cls, cls.__name__):
+                    if key in self.overrides:
+                        return self.overrides[key]
+            return self.max_retries if isinstance(error, self.retry_exceptions) else 0
+        if status in self.overrides or str(status) in self.overrides:
+            return self.overrides.get(status, self.overrides.get(str(status)))
+        return self.max_retries if status in self.retry_statuses else 0
+
+    def delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class DelayedQueue:
+    """Timer heap that puts objects back on ``target`` once their delay has passed.
+
+    A single task sleeps until the earliest due time, so a request waiting out its backoff
+    doesn't occupy a worker.
+    """
+
+    def __init__(self, target: asyncio.Queue):
+        self.target = target
+        self.heap = []
+        self._counter = itertools.count()
+        self._changed = asyncio.Event()
+        self._empty = asyncio.Event()
+        self._empty.set()
+        self._task = None
+
+    def __len__(self):
+        return len(self.heap)
+
+    def schedule(self, obj, delay: float):
+        heapq.heappush(self.heap, (time.monotonic() + delay, next(self._counter), obj))
+        self._empty.clear()
+        self._changed.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            self._changed.clear()
+            if not self.heap:
+                await self._changed.wait()
+                continue
+            due = self.heap[0][0] - time.monotonic()
+            if due > 0:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), due)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, _, obj = heapq.heappop(self.heap)
+            await self.target.put(obj)
+            if not self.heap:
+                self._empty.set()
+
+    async def wait_empty(self):
+        await self._empty.wait()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class DeadLetterLog:
+    """Append-only JSONL file of requests that ran out of retries."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+
+    def write(self, request: Request, reason: str):
+        self.count += 1
+        record = {
+            'url': str(request.url),
+            'params': request.meta.get('params', {}),
+            'retries': request.meta.get('retry_times', 0),
+            'reason': reason,
+        }
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
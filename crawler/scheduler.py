@@ -0,0 +1,126 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+
+from crawler.core import Request
+
+
+class Priority:
+    search = 0
+    detail = 10
+
+
+class SpillStore:
+    """SQLite-backed overflow for requests that don't fit in the in-memory frontier."""
+
+    def __init__(self, path: str | None = None):
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='gh_crawler_frontier_', suffix='.sqlite')
+            os.close(fd)
+            self.temporary = True
+        else:
+            self.temporary = False
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS frontier (rank INTEGER, seq INTEGER, request BLOB)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS frontier_order ON frontier (rank, seq)')
+        # Sequence numbers restart every run, so leftovers from an earlier run can't be ordered against new work
+        self.connection.execute('DELETE FROM frontier')
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def push(self, rank: int, seq: int, blob: bytes):
+        self.connection.execute('INSERT INTO frontier VALUES (?, ?, ?)', (rank, seq, blob))
+        self.count += 1
+
+    def peek(self) -> tuple[int, int] | None:
+        return self.connection.execute('SELECT rank, seq FROM frontier ORDER BY rank, seq LIMIT 1').fetchone()
+
+    def pop_many(self, limit: int) -> list[tuple[int, int, Request]]:
+        rows = self.connection.execute(
+            'SELECT rowid, rank, seq, request FROM frontier ORDER BY rank, seq LIMIT ?', (limit,)
+        ).fetchall()
+        self.connection.executemany('DELETE FROM frontier WHERE rowid = ?', [(row[0],) for row in rows])
+        self.count -= len(rows)
+        return [(rank, seq, pickle.loads(blob)) for _, rank, seq, blob in rows]
+
+    def close(self):
+        self.connection.close()
+        if self.temporary:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(self.path + suffix):
+                    os.remove(self.path + suffix)
+
+
+class Scheduler(asyncio.Queue):
+    """Priority frontier that keeps at most ``max_memory`` requests in memory and spills the rest to disk.
+
+    Requests come out by ``Request.priority`` (detail pages ahead of search pages); equal priorities stay FIFO.
+    Responses and items don't pass through here, they have their own stages.
+    """
+
+    def __init__(self, max_memory: int = 10_000, spill_path: str | None = None):
+        if max_memory < 1:
+            # Everything would spill, and the in-memory heap the queue waits on would never fill
+            raise ValueError(f'max_memory must be at least 1, got {max_memory}')
+        self.max_memory = max_memory
+        self.spill_path = spill_path
+        self.spill: SpillStore | None = None
+        self.spilled = 0
+        self.logger = logging.getLogger(__name__)
+        super().__init__()
+
+    def _init(self, maxsize):
+        self._queue = []
+        self._counter = itertools.count()
+
+    @staticmethod
+    def priority(obj) -> int:
+        if isinstance(obj, Request):
+            return obj.priority
+        # Shutdown sentinels go last
+        return -1
+
+    def qsize(self) -> int:
+        return len(self._queue) + (len(self.spill) if self.spill else 0)
+
+    def _put(self, obj):
+        entry = (-self.priority(obj), next(self._counter), obj)
+        if isinstance(obj, Request) and len(self._queue) >= self.max_memory:
+            try:
+                blob = pickle.dumps(obj)
+            except (pickle.PicklingError, AttributeError, TypeError):
+                self.logger.debug('Keeping unpicklable request %s in memory', obj.url)
+            else:
+                if self.spill is None:
+                    self.spill = SpillStore(self.spill_path)
+                self.spill.push(entry[0], entry[1], blob)
+                self.spilled += 1
+                return
+        heapq.heappush(self._queue, entry)
+
+    def _get(self):
+        spilled = self.spill.peek() if self.spill else None
+        if spilled is not None and spilled < self._queue[0][:2]:
+            # A spilled request outranks everything in memory, swap it in
+            heapq.heappush(self._queue, self.spill.pop_many(1)[0])
+        _, _, obj = heapq.heappop(self._queue)
+        # Refill before the heap runs dry: asyncio.Queue.empty() only looks at the in-memory part
+        low_water = max(1, self.max_memory // 2)
+        if self.spill and len(self._queue) < low_water:
+            for entry in self.spill.pop_many(low_water):
+                heapq.heappush(self._queue, entry)
+        return obj
+
+    def close(self):
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
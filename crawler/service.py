@@ -0,0 +1,285 @@
+"""Long-running crawl service: keyword jobs over a local HTTP API, all sharing one warm proxy pool."""
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import time
+import uuid
+
+from aiohttp import web
+
+from crawler.config import build_crawler, normalize_proxies
+from crawler.core import Item
+from crawler.crawler import Crawler, build_proxy_pool
+from crawler.executor import ExecutorModes, ParseExecutor
+from crawler.limiter import AdaptiveLimiter
+from crawler.ratelimit import RateLimiter
+
+
+# Parts of ``input.json`` that belong to a single standalone run
+STANDALONE_KEYS = ('keywords', 'cache', 'archive', 'incremental', 'metrics', 'state', 'output', 'processes')
+# What a job may set for itself, everything else comes from the service config
+JOB_KEYS = ('type', 'types', 'max_pages')
+
+
+class JobStatus:
+    queued = 'queued'
+    running = 'running'
+    done = 'done'
+    failed = 'failed'
+    cancelled = 'cancelled'
+
+
+FINISHED = (JobStatus.done, JobStatus.failed, JobStatus.cancelled)
+
+
+class Job:
+
+    def __init__(self, keywords: list[str], priority: int = 0, options: dict | None = None):
+        self.id = uuid.uuid4().hex
+        self.keywords = keywords
+        self.priority = priority
+        self.options = options or {}
+        self.status = JobStatus.queued
+        self.items: list[Item] = []
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.crawler: Crawler | None = None
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    async def add(self, item: Item):
+        self.items.append(item)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def set_status(self, status: str, error: str | None = None):
+        self.status = status
+        self.error = error
+        if status == JobStatus.running:
+            self.started_at = time.time()
+        elif status in FINISHED:
+            self.finished_at = time.time()
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def follow(self):
+        """Items as they arrive, starting from the first one, until the job is finished."""
+        position = 0
+        while True:
+            while position < len(self.items):
+                yield self.items[position]
+                position += 1
+            if self.finished:
+                return
+            async with self._changed:
+                await self._changed.wait_for(lambda: position < len(self.items) or self.finished)
+
+    def describe(self) -> dict:
+        return {
+            'id': self.id,
+            'keywords': self.keywords,
+            'priority': self.priority,
+            'status': self.status,
+            'items': len(self.items),
+            'pages': self.crawler.fetch_stage.processed if self.crawler is not None else 0,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobCrawler(Crawler):
+    """Crawler for one job: items go to the job instead of a sink."""
+
+    def __init__(self, *args, job: Job, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.job = job
+
+    async def emit(self, item: Item):
+        await self.job.add(item)
+
+
+class CrawlService:
+    """Runs up to ``max_jobs`` jobs at once; queued jobs start in order of priority, highest first.
+
+    The proxy pool (with its keep-alive connections), the concurrency and rate limiters and the parse pool are
+    built once from ``config`` and shared by every job, so a job pays neither interpreter startup nor TLS
+    handshakes, and the limits hold for all jobs together.
+    """
+
+    def __init__(self, config: dict, max_jobs: int = 4, host: str = '127.0.0.1', port: int = 8080,
+                 socket_path: str | None = None, keep_finished: int = 1000):
+        self.config = {key: value for key, value in config.items() if key not in STANDALONE_KEYS}
+        self.max_jobs = max_jobs
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.keep_finished = keep_finished
+        self.logger = logging.getLogger(__name__)
+        concurrency = config.get('concurrency', {})
+        rate_limit = config.get('rate_limit', {})
+        self.proxy_pool = build_proxy_pool(
+            normalize_proxies(config.get('proxies', [])),
+            max_per_proxy=config.get('max_per_proxy', 5),
+            cooldown=config.get('proxy_cooldown', 60.0),
+        )
+        self.limiter = AdaptiveLimiter(concurrency.get('initial', 5), concurrency.get('min', 1),
+                                       concurrency.get('max', 32))
+        self.rate_limiter = RateLimiter(rate_limit.get('rate', 2.0), rate_limit.get('burst', 5))
+        self.parse_executor = ParseExecutor(config.get('parse_executor', ExecutorModes.process),
+                                            config.get('parse_workers'))
+        self.jobs: dict[str, Job] = {}
+        self.running: set[Job] = set()
+        self.queued: list[tuple[int, int, Job]] = []
+        self._counter = itertools.count()
+        self.runner: web.AppRunner | None = None
+
+    def submit(self, keywords: list[str], priority: int = 0, **options) -> Job:
+        job = Job(keywords, priority, options)
+        self.jobs[job.id] = job
+        heapq.heappush(self.queued, (-priority, next(self._counter), job))
+        self.logger.info('Queued job %s for %s keywords with priority %s', job.id, len(keywords), priority)
+        self.dispatch()
+        return job
+
+    def dispatch(self):
+        while self.queued and len(self.running) < self.max_jobs:
+            _, _, job = heapq.heappop(self.queued)
+            if job.finished:
+                # Cancelled while it was waiting
+                continue
+            self.running.add(job)
+            job.task = asyncio.create_task(self.run(job))
+
+    async def run(self, job: Job):
+        try:
+            job.crawler = build_crawler(
+                {**self.config, **job.options, 'keywords': job.keywords},
+                crawler_cls=JobCrawler,
+                job=job,
+                proxy_pool=self.proxy_pool,
+                limiter=self.limiter,
+                rate_limiter=self.rate_limiter,
+                parse_executor=self.parse_executor,
+            )
+            await job.set_status(JobStatus.running)
+            try:
+                await job.crawler.crawl()
+            except asyncio.CancelledError:
+                await job.crawler.abort()
+                raise
+            await job.set_status(JobStatus.done)
+            self.logger.info('Job %s finished with %s items', job.id, len(job.items))
+        except asyncio.CancelledError:
+            await job.set_status(JobStatus.cancelled)
+            self.logger.info('Job %s cancelled', job.id)
+        except Exception as e:
+            self.logger.exception('Job %s failed', job.id)
+            await job.set_status(JobStatus.failed, repr(e))
+        finally:
+            self.running.discard(job)
+            self.forget_finished()
+            self.dispatch()
+
+    async def cancel(self, job: Job):
+        if job.finished:
+            return
+        if job.task is None:
+            await job.set_status(JobStatus.cancelled)
+            return
+        job.task.cancel()
+        await asyncio.gather(job.task, return_exceptions=True)
+
+    def forget_finished(self):
+        finished = [job for job in self.jobs.values() if job.finished]
+        for job in sorted(finished, key=lambda job: job.finished_at)[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job.id]
+
+    def job_for(self, request: web.Request) -> Job:
+        job = self.jobs.get(request.match_info['job_id'])
+        if job is None:
+            raise web.HTTPNotFound(text='Unknown job')
+        return job
+
+    async def create_job(self, request: web.Request) -> web.Response:
+        try:
+            data = await request.json()
+        except json.JSONDecodeError:
+            raise web.HTTPBadRequest(text='Body must be JSON')
+        keywords = data.get('keywords') if isinstance(data, dict) else None
+        if not keywords or not isinstance(keywords, list) or not all(isinstance(k, str) for k in keywords):
+            raise web.HTTPBadRequest(text='keywords must be a non-empty list of strings')
+        priority = data.get('priority', 0)
+        if not isinstance(priority, int):
+            raise web.HTTPBadRequest(text='priority must be an integer')
+        job = self.submit(keywords, priority, **{key: data[key] for key in JOB_KEYS if key in data})
+        return web.json_response(job.describe(), status=201)
+
+    async def list_jobs(self, request: web.Request) -> web.Response:
+        return web.json_response([job.describe() for job in self.jobs.values()])
+
+    async def get_job(self, request: web.Request) -> web.Response:
+        return web.json_response(self.job_for(request).describe())
+
+    async def cancel_job(self, request: web.Request) -> web.Response:
+        job = self.job_for(request)
+        await self.cancel(job)
+        return web.json_response(job.describe())
+
+    async def job_items(self, request: web.Request) -> web.StreamResponse:
+        """Items as JSON lines, streamed while the job runs; the response ends when the job does."""
+        job = self.job_for(request)
+        response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+        await response.prepare(request)
+        async for item in job.follow():
+            await response.write(json.dumps(item.serialize()).encode() + b'\n')
+        await response.write_eof()
+        return response
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/jobs', self.create_job)
+        app.router.add_get('/jobs', self.list_jobs)
+        app.router.add_get('/jobs/{job_id}', self.get_job)
+        app.router.add_delete('/jobs/{job_id}', self.cancel_job)
+        app.router.add_get('/jobs/{job_id}/items', self.job_items)
+        return app
+
+    async def start(self):
+        self.parse_executor.start()
+        self.runner = web.AppRunner(self.app(), access_log=None)
+        await self.runner.setup()
+        if self.socket_path is not None:
+            await web.UnixSite(self.runner, self.socket_path).start()
+            self.logger.info('Serving jobs on unix socket %s', self.socket_path)
+        else:
+            await web.TCPSite(self.runner, self.host, self.port).start()
+            self.logger.info('Serving jobs on http://%s:%s/jobs', self.host, self.port)
+
+    async def stop(self):
+        for _, _, job in self.queued:
+            await self.cancel(job)
+        self.queued = []
+        for job in list(self.running):
+            await self.cancel(job)
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+        await self.proxy_pool.close()
+        await asyncio.to_thread(self.parse_executor.shutdown)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
@@ -0,0 +1,270 @@
+"""Crawl across several processes, each running its own event loop, sessions and limiters.
+
+Every request belongs to exactly one shard, picked from its fingerprint, so each shard's duplicate
+filter sees all the requests it is responsible for. A shard that discovers a request owned by another
+shard hands it to the coordinator, which forwards it and writes the items of all shards through one sink.
+
+Messages from a shard to the coordinator::
+
+    ('request', source, target, pickled request)
+    ('item', item)
+    ('idle', index, sent, received)
+
+The coordinator sends pickled requests to a shard's inbox, and ``None`` once the crawl is over.
+"""
+import asyncio
+import logging
+import math
+import multiprocessing
+import pickle
+import queue
+
+from crawler.config import build_crawler
+from crawler.core import Item, Request
+from crawler.crawler import Crawler
+from crawler.dupefilter import request_fingerprint
+from crawler.executor import ExecutorModes
+from crawler.sinks import ItemSink
+
+
+POLL_INTERVAL = 0.5
+RECEIVE_BATCH = 100
+
+
+def shard_for(fingerprint: str, shards: int) -> int:
+    return int(fingerprint[:8], 16) % shards
+
+
+class ShardRouter:
+    """Decides which requests a shard keeps and sends the rest to the coordinator."""
+
+    def __init__(self, index: int, shards: int, outbox):
+        self.index = index
+        self.shards = shards
+        self.outbox = outbox
+        self.sent = 0
+        self.received = 0
+        self.logger = logging.getLogger(__name__)
+
+    def target(self, request: Request) -> int:
+        return shard_for(request_fingerprint(request), self.shards)
+
+    def owns(self, request: Request) -> bool:
+        return self.target(request) == self.index
+
+    def handoff(self, request: Request) -> bool:
+        """Send ``request`` to its shard; False if it can't cross a process boundary."""
+        try:
+            # Pickled here rather than in the queue's feeder thread, where a failure would be silently dropped
+            blob = pickle.dumps(request)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            self.logger.warning('Request to %s can not be handed off, crawling it here', request.url)
+            return False
+        self.outbox.put(('request', self.index, self.target(request), blob))
+        self.sent += 1
+        return True
+
+    def report_idle(self):
+        self.outbox.put(('idle', self.index, self.sent, self.received))
+
+
+class ShardSink:
+    """Stands in for ``ItemSink`` inside a shard and passes items on to the coordinator."""
+
+    def __init__(self, outbox):
+        self.outbox = outbox
+        self.on_export = None
+        self.exported = 0
+
+    async def start(self):
+        pass
+
+    async def put(self, item: Item):
+        self.outbox.put(('item', item))
+        self.exported += 1
+
+    async def close(self):
+        pass
+
+
+class ShardCrawler(Crawler):
+    """Crawler that only fetches the requests of its own shard and stays up until the coordinator stops it."""
+
+    def __init__(self, *args, router: ShardRouter, inbox, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.router = router
+        self.inbox = inbox
+        self.wake = asyncio.Event()
+        self.stopping = False
+
+    def start_requests(self):
+        for request in super().start_requests():
+            if self.router.owns(request):
+                yield request
+
+    async def schedule(self, obj):
+        if isinstance(obj, Request) and not self.router.owns(obj) and self.router.handoff(obj):
+            return
+        await super().schedule(obj)
+
+    async def read_inbox(self):
+        while not self.stopping:
+            try:
+                blob = await asyncio.to_thread(self.inbox.get, True, POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if blob is None:
+                self.stopping = True
+            else:
+                self.router.received += 1
+                request = pickle.loads(blob)
+                self.track(request)
+                self.queue.put_nowait(request)
+            self.wake.set()
+
+    async def wait_idle(self):
+        reader = asyncio.create_task(self.read_inbox())
+        try:
+            while not self.stopping:
+                received = self.router.received
+                await super().wait_idle()
+                if self.router.received != received:
+                    # A handoff arrived while the queue was draining, it may still be in flight
+                    continue
+                self.router.report_idle()
+                await self.wake.wait()
+                self.wake.clear()
+        finally:
+            self.stopping = True
+            await reader
+
+
+def shard_config(input_data: dict, shards: int) -> dict:
+    """Split the limits that protect GitHub and the proxies so all shards together stay within them."""
+    config = dict(input_data)
+    rate_limit = dict(config.get("rate_limit", {}))
+    rate_limit["rate"] = rate_limit.get("rate", 2.0) / shards
+    rate_limit["burst"] = max(1, rate_limit.get("burst", 5) // shards)
+    config["rate_limit"] = rate_limit
+    config["max_per_proxy"] = max(1, math.ceil(config.get("max_per_proxy", 5) / shards))
+    return config
+
+
+def run_shard(input_data: dict, index: int, shards: int, inbox, outbox):
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s:%(processName)s:%(name)s:%(levelname)s - %(message)s'
+    )
+    asyncio.run(crawl_shard(input_data, index, shards, inbox, outbox))
+
+
+async def crawl_shard(input_data: dict, index: int, shards: int, inbox, outbox):
+    frontier = dict(input_data.get("frontier", {}))
+    if frontier.get("spill_path"):
+        frontier["spill_path"] = f'{frontier["spill_path"]}.{index}'
+    metrics = dict(input_data.get("metrics", {}))
+    if metrics.get("stats_path"):
+        metrics["stats_path"] = f'{metrics["stats_path"]}.{index}'
+    if metrics.get("port"):
+        metrics["port"] += index
+    archive = input_data.get("archive")
+    if archive:
+        # Pages are archived by the shard that owns them, so replaying needs the same number of processes
+        archive = {**archive, "path": f'{archive["path"]}.{index}'}
+    incremental = input_data.get("incremental")
+    if incremental:
+        incremental = {**incremental, "path": f'{incremental["path"]}.{index}'}
+    router = ShardRouter(index, shards, outbox)
+    crawler = build_crawler(
+        {**shard_config(input_data, shards), "frontier": frontier, "metrics": metrics, "archive": archive,
+         "incremental": incremental},
+        crawler_cls=ShardCrawler,
+        router=router,
+        inbox=inbox,
+        sink=ShardSink(outbox),
+        # The shard already has a core to itself, a parse pool per shard would only oversubscribe it
+        parse_executor=ExecutorModes.inline,
+        # A shard never sees the pages other shards own, the coordinator only sorts each batch it writes
+        ordered_output=False,
+    )
+    await crawler.crawl()
+    crawler.logger.info('Shard %s handed off %s requests and received %s', index, router.sent, router.received)
+
+
+class ShardCoordinator:
+    """Starts one process per shard, forwards handoffs between them and merges their items into ``sink``.
+
+    The crawl is over once every shard has reported idle after receiving everything routed to it,
+    and every request a shard sent has been routed.
+    """
+
+    def __init__(self, input_data: dict, shards: int, sink: ItemSink):
+        self.input_data = input_data
+        self.shards = shards
+        self.sink = sink
+        self.logger = logging.getLogger(__name__)
+        context = multiprocessing.get_context('spawn')
+        self.outbox = context.Queue()
+        self.inboxes = [context.Queue() for _ in range(shards)]
+        self.processes = [
+            context.Process(target=run_shard, name=f'shard-{index}',
+                            args=(input_data, index, shards, self.inboxes[index], self.outbox))
+            for index in range(shards)
+        ]
+        self.routed = [0] * shards
+        self.handed_off = [0] * shards
+        self.idle: list[tuple[int, int] | None] = [None] * shards
+
+    def finished(self) -> bool:
+        return all(
+            self.idle[index] == (self.handed_off[index], self.routed[index]) for index in range(self.shards)
+        )
+
+    def receive(self) -> list:
+        messages = [self.outbox.get(True, POLL_INTERVAL)]
+        while len(messages) < RECEIVE_BATCH:
+            try:
+                messages.append(self.outbox.get_nowait())
+            except queue.Empty:
+                break
+        return messages
+
+    async def handle(self, message):
+        kind = message[0]
+        if kind == 'request':
+            _, source, target, blob = message
+            self.handed_off[source] += 1
+            self.routed[target] += 1
+            self.inboxes[target].put(blob)
+        elif kind == 'item':
+            await self.sink.put(message[1])
+        elif kind == 'idle':
+            _, index, sent, received = message
+            self.idle[index] = (sent, received)
+
+    async def route(self):
+        while not self.finished():
+            try:
+                messages = await asyncio.to_thread(self.receive)
+            except queue.Empty:
+                dead = [process.name for process in self.processes if not process.is_alive()]
+                if dead:
+                    raise RuntimeError(f'Shards exited before the crawl finished: {", ".join(dead)}')
+                continue
+            for message in messages:
+                await self.handle(message)
+
+    async def crawl(self):
+        self.logger.info('Starting %s crawler shards', self.shards)
+        await self.sink.start()
+        for process in self.processes:
+            process.start()
+        try:
+            await self.route()
+        finally:
+            for inbox in self.inboxes:
+                inbox.put(None)
+            for process in self.processes:
+                await asyncio.to_thread(process.join)
+            await self.sink.close()
+        self.logger.info('Routed %s requests between shards', sum(self.routed))
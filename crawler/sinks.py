@@ -0,0 +1,168 @@
+import abc
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+from typing import Callable
+
+from crawler.core import Item
+
+
+class BaseExporter(abc.ABC):
+
+    def open(self):
+        """Acquire file handles or connections before the first batch."""
+
+    @abc.abstractmethod
+    def export(self, items: list[Item]):
+        """Write a batch of items."""
+        pass
+
+    def close(self):
+        """Flush and release resources."""
+
+
+class JsonLinesExporter(BaseExporter):
+    def __init__(self, path: str, mode: str = 'w'):
+        self.path = path
+        self.mode = mode
+        self.file = None
+
+    def open(self):
+        self.file = open(self.path, self.mode)
+
+    def recover(self) -> list[str]:
+        """URLs already written by an interrupted run; a half-written last line is cut off."""
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'rb+') as f:
+            content = f.read()
+            complete = content[:content.rfind(b'\n') + 1]
+            if len(complete) != len(content):
+                f.truncate(len(complete))
+        return [json.loads(line)['url'] for line in complete.splitlines() if line.strip()]
+
+    def export(self, items: list[Item]):
+        self.file.writelines(json.dumps(item.serialize()) + '\n' for item in items)
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class StdoutExporter(BaseExporter):
+    def export(self, items: list[Item]):
+        sys.stdout.writelines(json.dumps(item.serialize()) + '\n' for item in items)
+        sys.stdout.flush()
+
+
+class SQLiteExporter(BaseExporter):
+    def __init__(self, path: str, table: str = 'items'):
+        self.path = path
+        self.table = table
+        self.connection = None
+
+    def open(self):
+        # The writer runs batches in a worker thread, so the connection must not be tied to this one
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute(f'CREATE TABLE IF NOT EXISTS {self.table} (url TEXT, extra TEXT, type TEXT)')
+        columns = [row[1] for row in self.connection.execute(f'PRAGMA table_info({self.table})')]
+        if 'type' not in columns:
+            # Tables written before items were tagged by type
+            self.connection.execute(f'ALTER TABLE {self.table} ADD COLUMN type TEXT')
+
+    def export(self, items: list[Item]):
+        rows = [(item.url, json.dumps(item.extra), item.type) for item in items]
+        with self.connection:
+            self.connection.executemany(f'INSERT INTO {self.table} (url, extra, type) VALUES (?, ?, ?)', rows)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+EXPORTER_REGISTRY = {
+    'jsonl': JsonLinesExporter,
+    'stdout': StdoutExporter,
+    'sqlite': SQLiteExporter,
+}
+
+
+class ItemSink:
+    """Bounded item buffer drained by a background writer task.
+
+    ``put`` blocks once ``buffer_size`` items are waiting, which slows the crawler
+    down to the speed of the exporter instead of growing memory.
+    """
+
+    def __init__(self, exporter: BaseExporter, flush_size: int = 100, flush_interval: float = 1.0,
+                 buffer_size: int = 1000, on_export: Callable[[list[Item]], None] | None = None):
+        self.exporter = exporter
+        self.on_export = on_export
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.buffer = asyncio.Queue(maxsize=buffer_size)
+        self.exported = 0
+        self.logger = logging.getLogger(__name__)
+        self._writer = None
+
+    async def start(self):
+        if self._writer is not None:
+            return
+        await asyncio.to_thread(self.exporter.open)
+        self._writer = asyncio.create_task(self.write())
+
+    async def put(self, item: Item):
+        await self.buffer.put(item)
+
+    async def write(self):
+        while True:
+            item = await self.buffer.get()
+            if item is None:
+                self.buffer.task_done()
+                return
+            batch = [item]
+            finished = await self.fill(batch)
+            batch.sort(key=lambda item: item.order)
+            try:
+                await asyncio.to_thread(self.exporter.export, batch)
+                self.exported += len(batch)
+                if self.on_export is not None:
+                    self.on_export(batch)
+            except Exception:
+                self.logger.exception('Failed to export batch of %s items', len(batch))
+            finally:
+                for _ in range(len(batch) + finished):
+                    self.buffer.task_done()
+            if finished:
+                return
+
+    async def fill(self, batch: list) -> bool:
+        """Collect items until the batch is full or the flush interval runs out; True on close sentinel."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.flush_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.buffer.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                return True
+            batch.append(item)
+        return False
+
+    async def close(self):
+        if self._writer is None:
+            return
+        await self.buffer.put(None)
+        await self._writer
+        self._writer = None
+        await asyncio.to_thread(self.exporter.close)
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import pickle
+import sqlite3
+import threading
+from collections import deque
+from typing import Callable, Iterable
+
+from crawler.core import Item, Request
+from crawler.dupefilter import request_fingerprint
+
+
+class CrawlState:
+    """Durable record of a crawl so a killed run can be resumed.
+
+    * ``pending`` - requests scheduled but not yet fetched and parsed
+    * ``completed`` - fingerprints of requests whose results are already recorded
+    * ``items`` - every emitted item and whether the sink has written it out
+
+    A request only moves to ``completed`` after everything its response produced has been recorded,
+    so a crash at any point loses nothing, and resuming neither refetches completed pages nor
+    writes an item twice.
+
+    Changes are buffered and written in batches from a thread once ``start`` has been awaited, so the event
+    loop neither waits for SQLite nor pickles requests. A crash loses at most the last unwritten batch, which
+    the resumed crawl redoes; items the sink wrote in that window may be written again. Reads write out the
+    buffer first.
+    """
+
+    def __init__(self, path: str, flush_size: int = 100, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.logger = logging.getLogger(__name__)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(
+            'CREATE TABLE IF NOT EXISTS pending (fingerprint TEXT PRIMARY KEY, request BLOB);'
+            'CREATE TABLE IF NOT EXISTS completed (fingerprint TEXT PRIMARY KEY);'
+            'CREATE TABLE IF NOT EXISTS items (url TEXT PRIMARY KEY, item BLOB, exported INTEGER DEFAULT 0);'
+        )
+        # Writes wait in ``_buffer`` on the loop, sealed batches in ``_batches`` are written in order under ``_lock``
+        self._buffer: list[tuple[Callable, object]] = []
+        self._batches: deque[list[tuple[Callable, object]]] = deque()
+        self._lock = threading.Lock()
+        self._writer = None
+        self._wakeup = None
+        self._closing = False
+
+    async def start(self):
+        """Write buffered changes from a background task, every ``flush_size`` changes or ``flush_interval``."""
+        if self._writer is not None:
+            return
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._writer = asyncio.create_task(self.write())
+
+    async def write(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            self._seal()
+            await asyncio.to_thread(self._drain)
+
+    async def stop(self):
+        if self._writer is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._writer
+        self._writer = None
+
+    def flush(self):
+        """Write everything buffered so far, blocking."""
+        self._seal()
+        self._drain()
+
+    def _queue(self, write: Callable, arg):
+        self._buffer.append((write, arg))
+        if self._wakeup is not None and len(self._buffer) >= self.flush_size:
+            self._wakeup.set()
+
+    def _seal(self):
+        if self._buffer:
+            self._batches.append(self._buffer)
+            self._buffer = []
+
+    def _drain(self):
+        # Each batch is one transaction, applied in the order the changes were made, so a request is never
+        # recorded completed before the items and requests its response produced
+        with self._lock:
+            while self._batches:
+                batch = self._batches.popleft()
+                with self.connection:
+                    for write, arg in batch:
+                        write(arg)
+
+    def reset(self):
+        self.flush()
+        with self._lock, self.connection:
+            self.connection.executescript('DELETE FROM pending; DELETE FROM completed; DELETE FROM items;')
+
+    def is_empty(self) -> bool:
+        self.flush()
+        with self._lock:
+            return not any(
+                self.connection.execute(f'SELECT 1 FROM {table} LIMIT 1').fetchone()
+                for table in ('pending', 'completed', 'items')
+            )
+
+    def add_request(self, request: Request):
+        self._queue(self._add_request, request)
+
+    def complete(self, request: Request):
+        self._queue(self._complete, request)
+
+    def add_item(self, item: Item):
+        self._queue(self._add_item, item)
+
+    def mark_exported(self, items: Iterable[Item]):
+        self._queue(self._mark_exported, [item.url for item in items])
+
+    def mark_exported_urls(self, urls: Iterable[str]):
+        self._queue(self._mark_exported, list(urls))
+
+    def _add_request(self, request: Request):
+        fingerprint = request_fingerprint(request)
+        try:
+            blob = pickle.dumps(request)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            self.logger.warning('Request to %s can not be checkpointed', request.url)
+            return
+        # Retries replace the original row so the retry count survives a restart
+        self.connection.execute(
+            'INSERT OR REPLACE INTO pending '
+            'SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM completed WHERE fingerprint = ?)',
+            (fingerprint, blob, fingerprint)
+        )
+
+    def _complete(self, request: Request):
+        fingerprint = request_fingerprint(request)
+        self.connection.execute('DELETE FROM pending WHERE fingerprint = ?', (fingerprint,))
+        self.connection.execute('INSERT OR IGNORE INTO completed VALUES (?)', (fingerprint,))
+
+    def _add_item(self, item: Item):
+        self.connection.execute('INSERT OR IGNORE INTO items (url, item) VALUES (?, ?)', (item.url, pickle.dumps(item)))
+
+    def _mark_exported(self, urls: list[str]):
+        self.connection.executemany('UPDATE items SET exported = 1 WHERE url = ?', [(url,) for url in urls])
+
+    def pending_requests(self) -> list[Request]:
+        self.flush()
+        with self._lock:
+            return [pickle.loads(blob) for blob, in self.connection.execute('SELECT request FROM pending')]
+
+    def completed_fingerprints(self) -> list[str]:
+        self.flush()
+        with self._lock:
+            return [fingerprint for fingerprint, in self.connection.execute('SELECT fingerprint FROM completed')]
+
+    def unexported_items(self) -> list[Item]:
+        self.flush()
+        with self._lock:
+            return [pickle.loads(blob) for blob, in self.connection.execute('SELECT item FROM items WHERE exported = 0')]
+
+    def close(self):
+        self.flush()
+        self.connection.close()
@@ -0,0 +1,118 @@
+import abc
+
+import aiohttp
+
+
+DEFAULT_CHUNK_SIZE = 16 * 1024
+DEFAULT_MAX_BYTES = 1024 * 1024
+
+
+class StreamMatcher(abc.ABC):
+    """Tells when a page being downloaded has delivered everything a parser needs.
+
+    Parsers opt in by putting the subclass into ``Request.meta['stream']``; the crawler then feeds it the
+    decoded body chunk by chunk and stops downloading once ``done`` is True. ``feed`` runs on the event loop
+    for every chunk, so matchers look for byte markers rather than tokenizing the HTML.
+    """
+
+    @classmethod
+    def for_request(cls, request) -> 'StreamMatcher':
+        return cls()
+
+    @abc.abstractmethod
+    def feed(self, chunk: bytes):
+        """Scan the next chunk of the body."""
+
+    @property
+    @abc.abstractmethod
+    def done(self) -> bool:
+        """True once the page has delivered everything the parser reads."""
+
+
+class MarkerScan:
+    """Finds ``markers`` one after the other in a stream of chunks, also when one straddles two chunks.
+
+    A marker is bytes or a tuple of alternatives. Once the last one is found ``rest`` holds what followed it
+    in that chunk.
+    """
+
+    def __init__(self, *markers: bytes | tuple[bytes, ...]):
+        self.markers = [marker if isinstance(marker, tuple) else (marker,) for marker in markers]
+        self.found = 0
+        self.tail = b''
+        self.rest = b''
+
+    @property
+    def done(self) -> bool:
+        return self.found == len(self.markers)
+
+    def feed(self, chunk: bytes):
+        if self.done:
+            return
+        data = self.tail + chunk
+        start = 0
+        while not self.done:
+            ends = [index + len(marker) for marker in self.markers[self.found]
+                    if (index := data.find(marker, start)) >= 0]
+            if not ends:
+                break
+            start = min(ends)
+            self.found += 1
+        if self.done:
+            self.tail, self.rest = b'', data[start:]
+            return
+        # Enough of the end to complete a marker that starts in this chunk
+        keep = max(len(marker) for marker in self.markers[self.found]) - 1
+        self.tail = data[max(start, len(data) - keep):]
+
+
+class TagBalance:
+    """Tracks whether the element a stream is inside of has been closed, by counting ``<tag`` and ``</tag``.
+
+    Depth is only checked at the end of each chunk, so the close is noticed at most one chunk late.
+    """
+
+    def __init__(self, tag: bytes, depth: int = 1):
+        self.opening = b'<' + tag
+        self.closing = b'</' + tag
+        self.depth = depth
+        self.tail = b''
+
+    @property
+    def closed(self) -> bool:
+        return self.depth <= 0
+
+    def feed(self, chunk: bytes):
+        data = self.tail + chunk
+        # Markers starting in the last few bytes are counted with the next chunk, once they are complete
+        limit = max(0, len(data) - len(self.closing) + 1)
+        self.depth += data.count(self.opening, 0, limit + len(self.opening) - 1)
+        self.depth -= data.count(self.closing, 0, limit + len(self.closing) - 1)
+        self.tail = data[limit:]
+
+
+async def read_until(response: aiohttp.ClientResponse, matcher: StreamMatcher, max_bytes: int = DEFAULT_MAX_BYTES,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE, content_decoder=None) -> tuple[bytes, bool]:
+    """Read the body until ``matcher`` is satisfied or ``max_bytes`` (of the decoded page) arrived.
+
+    ``content_decoder`` undoes the Content-Encoding chunk by chunk when the session doesn't. Returns the
+    decoded bytes read and whether the body was cut short. A cut-short response is closed so its connection
+    is dropped instead of draining the rest of the page.
+    """
+    chunks = []
+    received = 0
+    truncated = False
+    async for chunk in response.content.iter_chunked(chunk_size):
+        if content_decoder is not None:
+            chunk = content_decoder.decompress(chunk)
+        received += len(chunk)
+        chunks.append(chunk)
+        matcher.feed(chunk)
+        if matcher.done or received >= max_bytes:
+            truncated = not response.content.at_eof()
+            break
+    if truncated:
+        response.close()
+    elif content_decoder is not None:
+        chunks.append(content_decoder.flush())
+    return b''.join(chunks), truncated
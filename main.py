@@ -1,15 +1,21 @@
 import asyncio
-from queue import Queue
 
-from crawler.crawler import Crawler
+from crawler.config import build_crawler, build_sink
+from crawler.executor import ExecutorModes
+from crawler.service import CrawlService
+from crawler.sharding import ShardCoordinator
+from crawler.sinks import JsonLinesExporter
+from crawler.state import CrawlState
 
 
+import argparse
 import json
 import sys
 import logging
 
 
 async def main():
+    args = parse_args()
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s:%(name)s:%(levelname)s - %(message)s'
@@ -17,27 +23,61 @@ async def main():
     logger = logging.getLogger(__name__)
     # TODO Add validation
     input_data = json.load(sys.stdin)
+    if args.record or args.replay:
+        mode = "record" if args.record else "replay"
+        input_data["archive"] = {**input_data.get("archive", {}), "path": args.record or args.replay, "mode": mode}
     keywords = input_data.get("keywords", [])
     proxies = input_data.get("proxies", [])
-    type_ = input_data.get("type", "Repositories")
+    types = input_data.get("types") or input_data.get("type", "Repositories")
+    parse_executor = input_data.get("parse_executor", ExecutorModes.process)
+    output = input_data.get("output", {})
+    processes = args.processes or input_data.get("processes", 1)
+
+    if args.serve:
+        service = CrawlService(input_data, max_jobs=args.max_jobs, port=args.port, socket_path=args.socket)
+        await service.serve_forever()
+        return
 
     if not keywords:
         logger.warning("No keywords provided. Crawling won't yield results.")
         return
 
     logger.info('Starting crawler with keywords: %s', keywords)
-    logger.info('Using type: %s', type_)
+    logger.info('Using types: %s', types)
     logger.info('Using %s proxies', len(proxies))
 
-    proxies = [f"http://{proxy}" if not proxy.startswith('http') else proxy for proxy in proxies]
-    queue = Queue()
-    crawler = Crawler(keywords, proxies, type_, queue)
+    if processes > 1:
+        if args.resume:
+            logger.error("--resume is not supported together with several processes")
+            return
+        sink = build_sink(output)
+        await ShardCoordinator(input_data, processes, sink).crawl()
+        logger.info('Exported %s items', sink.exported)
+        return
+
+    logger.info('Using %s parse executor', parse_executor)
+    state = CrawlState(input_data.get("state", "crawl_state.sqlite"))
+    sink = build_sink(output, append=args.resume)
+    if args.resume and isinstance(sink.exporter, JsonLinesExporter):
+        # Items that reached the file before the crash count as exported even if the state missed it
+        state.mark_exported_urls(sink.exporter.recover())
+    crawler = build_crawler(input_data, sink=sink, state=state, resume=args.resume)
     await crawler.crawl()
-    with open("output.json", "w") as f:
-        while not queue.empty():
-            f.write(json.dumps(queue.get().serialize()) + "\n")
-            queue.task_done()
-    queue.join()
+    logger.info('Exported %s items', sink.exported)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Crawl GitHub search results, reading the config from stdin")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted crawl from its state file")
+    parser.add_argument("--processes", type=int, help="split the crawl across this many worker processes")
+    parser.add_argument("--serve", action="store_true", help="run as a service taking keyword jobs over HTTP")
+    parser.add_argument("--port", type=int, default=8080, help="port the service listens on")
+    parser.add_argument("--socket", metavar="PATH", help="serve on this unix socket instead of a port")
+    parser.add_argument("--max-jobs", type=int, default=4, help="jobs the service runs at once")
+    archive = parser.add_mutually_exclusive_group()
+    archive.add_argument("--record", metavar="PATH", help="append every fetched page to this archive")
+    archive.add_argument("--replay", metavar="PATH", help="parse pages from this archive instead of fetching them")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
@@ -11,8 +11,10 @@ pytest_plugins = ["pytest_asyncio"]
 
 import pytest
 import pytest_asyncio
+from aiohttp.test_utils import TestServer
 from unittest.mock import MagicMock, AsyncMock
 
+from benchmarks.fake_github import FakeGitHub
 from crawler.crawler import Crawler
 from crawler.core import Response
 
@@ -24,7 +26,7 @@ async def crawler():
     queue = Queue()
     crawler_instance = Crawler(keywords=keywords, proxies=proxies, type_="repositories", result_queue=queue)
     yield crawler_instance
-    await crawler_instance.session.close()
+    await crawler_instance.proxy_pool.close()
 
 
 @pytest.fixture
@@ -43,5 +45,21 @@ def mock_response():
 
     response = Mock()
     response.text = mock_text
+    response.read = AsyncMock(return_value=b"<html>Mock HTML</html>")
+    response.charset = 'utf-8'
+    response.content.total_bytes = len("<html>Mock HTML</html>")
+    response.status = 200
+    response.headers = {}
     response.url = "https://github.com/search?q=python&type=repositories"
     return response
+
+
+@pytest_asyncio.fixture
+async def fake_github(request):
+    """A running FakeGitHub; its ``base_url`` is set. Parametrize indirectly to pass FakeGitHub options."""
+    fake = FakeGitHub(**{'rows': 5, 'total_pages': 1, **getattr(request, 'param', {})})
+    server = TestServer(fake.app())
+    await server.start_server()
+    fake.base_url = str(server.make_url('/'))
+    yield fake
+    await server.close()
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from crawler.archive import ArchiveModes, ResponseArchive
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'crawl.archive')
+
+
+def test_write_and_get(path):
+    archive = ResponseArchive(path)
+    archive.write('fp1', 'https://github.com/a/b', 200, {'Content-Type': 'text/html'}, b'<html>b</html>' * 100)
+    entry = archive.get('fp1')
+    assert entry.url == 'https://github.com/a/b'
+    assert entry.headers == {'Content-Type': 'text/html'}
+    assert entry.body == b'<html>b</html>' * 100
+    assert archive.get('missing') is None
+    assert (archive.hits, archive.misses) == (1, 1)
+    archive.close()
+    assert os.path.getsize(path) < 1400
+
+
+def test_latest_record_wins(path):
+    archive = ResponseArchive(path)
+    archive.write('fp1', 'https://github.com/a/b', 200, {}, b'old')
+    archive.write('fp1', 'https://github.com/a/b', 200, {}, b'new')
+    assert archive.get('fp1').body == b'new'
+    assert len(archive) == 1
+    assert [entry.body for entry in archive] == [b'old', b'new']
+    archive.close()
+
+
+def test_replay_indexes_records_missing_from_the_index(path):
+    archive = ResponseArchive(path, commit_every=100)
+    for index in range(3):
+        archive.write(f'fp{index}', f'https://github.com/a/{index}', 200, {}, f'page {index}'.encode())
+    # Killed before the index was committed
+    archive.file.close()
+    archive.connection.close()
+
+    replay = ResponseArchive(path, mode=ArchiveModes.replay)
+    assert len(replay) == 3
+    assert replay.get('fp2').body == b'page 2'
+    replay.close()
+
+
+def test_incomplete_record_is_dropped(path):
+    archive = ResponseArchive(path)
+    archive.write('fp1', 'https://github.com/a/b', 200, {}, b'page')
+    archive.close()
+    size = os.path.getsize(path)
+    with open(path, 'ab') as f:
+        f.write(b'GHA1\x01\x00\x00')
+
+    archive = ResponseArchive(path)
+    assert os.path.getsize(path) == size
+    archive.write('fp2', 'https://github.com/a/c', 200, {}, b'next')
+    assert archive.get('fp2').body == b'next'
+    archive.close()
+
+
+def test_unknown_mode(path):
+    with pytest.raises(ValueError):
+        ResponseArchive(path, mode='rewind')
@@ -0,0 +1,55 @@
+import gzip
+import zlib
+
+import pytest
+
+from crawler.compression import IdentityDecoder, accept_encoding, decode, decoder_for
+
+
+PAGE = b'<html>' + b'<div class="row">same markup</div>' * 200 + b'</html>'
+
+
+def raw_deflate(data: bytes) -> bytes:
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def test_accept_encoding_lists_what_can_be_decoded():
+    encodings = accept_encoding().split(', ')
+    assert {'gzip', 'deflate'} <= set(encodings)
+    assert encodings[-1] == 'gzip'
+
+
+@pytest.mark.parametrize('encoding, body', [
+    ('gzip', gzip.compress(PAGE)),
+    ('deflate', zlib.compress(PAGE)),
+    ('deflate', raw_deflate(PAGE)),
+    ('identity', PAGE),
+    (None, PAGE),
+])
+def test_decode(encoding, body):
+    assert decode(body, encoding) == PAGE
+
+
+def test_decoder_works_chunk_by_chunk():
+    body = gzip.compress(PAGE)
+    decoder = decoder_for('GZIP')
+    chunks = [decoder.decompress(body[i:i + 10]) for i in range(0, len(body), 10)]
+    assert b''.join(chunks) + decoder.flush() == PAGE
+    assert len(body) * 8 < len(PAGE)
+
+
+def test_unsupported_encodings():
+    assert isinstance(decoder_for(''), IdentityDecoder)
+    with pytest.raises(ValueError, match='compress'):
+        decoder_for('compress')
+    with pytest.raises(ValueError, match='Stacked'):
+        decoder_for('gzip, br')
+
+
+@pytest.mark.parametrize('encoding, module', [('br', 'brotli'), ('zstd', 'zstandard')])
+def test_optional_encodings(encoding, module):
+    # Only advertised and decoded with the ``compression`` extra installed
+    package = pytest.importorskip(module)
+    assert decode(package.compress(PAGE), encoding) == PAGE
+    assert encoding in accept_encoding().split(', ')
@@ -0,0 +1,41 @@
+import pickle
+
+from crawler.core import Item, Request, Response
+
+
+def test_body_is_decoded_lazily():
+    response = Response('https://github.com/a/b', None, 'naïve'.encode('latin-1'), Request('u', None), encoding='latin-1')
+    assert response.content == 'naïve'.encode('latin-1')
+    assert response._text is None
+    assert response.body == 'naïve'
+    assert response.body is response.body
+
+
+def test_text_body_is_kept_as_is():
+    response = Response('https://github.com/a/b', None, '<html></html>', Request('u', None))
+    assert response.body == '<html></html>'
+    assert response.content is None
+
+
+def test_release_drops_body_and_handle():
+    response = Response('https://github.com/a/b', object(), b'<html></html>', Request('u', None, meta={'x': 1}))
+    response.body
+    response.release()
+    assert response.response is None
+    assert response.body is None
+    assert response.meta == {'x': 1}
+
+
+def test_detach_pickles_raw_bytes():
+    response = Response('https://github.com/a/b', object(), b'<p>\xc3\xa9</p>', Request('u', None))
+    detached = pickle.loads(pickle.dumps(response.detach()))
+    assert detached.response is None
+    assert detached.content == b'<p>\xc3\xa9</p>'
+    assert detached.body == '<p>é</p>'
+
+
+def test_objects_are_slotted():
+    for obj in (Request('u', None), Response('u', None, b'', Request('u', None)), Item('u')):
+        assert not hasattr(obj, '__dict__')
+    item = pickle.loads(pickle.dumps(Item('u', {'owner': 'a'}, order=(1, 2))))
+    assert (item, item.order) == (Item('u', {'owner': 'a'}), (1, 2))
@@ -9,11 +9,18 @@ import asyncio
 from unittest.mock import AsyncMock
 import json
 import os
+from queue import Queue
 from unittest.mock import patch, MagicMock
 
 import pytest
 from aiohttp import ClientSession
+from crawler.archive import ArchiveModes, ResponseArchive
 from crawler.core import Request, Response, Item
+from crawler.crawler import Crawler
+from crawler.httpcache import HttpCache
+from crawler.incremental import RepositoryIndex
+from crawler.proxies import ProxyPool
+from crawler.retry import RetryPolicy
 
 
 @pytest.mark.asyncio
@@ -22,7 +29,8 @@ async def test_crawler_initialization(crawler):
     assert crawler.proxies == ["proxy1", "proxy2"]
     assert crawler.type == "repositories"
     assert isinstance(crawler.queue, asyncio.Queue)
-    assert isinstance(crawler.session, ClientSession)
+    assert isinstance(crawler.proxy_pool, ProxyPool)
+    assert [state.url for state in crawler.proxy_pool.states] == ["proxy1", "proxy2"]
 
 
 @pytest.mark.asyncio
@@ -51,9 +59,10 @@ async def test_response_processing(crawler):
 @pytest.mark.asyncio
 async def test_orchestrate_with_request(crawler, mock_response):
     with patch.object(crawler, 'request') as mock_request:
-        with patch.object(crawler, 'queue') as mock_queue:
+        with patch.object(crawler.parse_stage, 'queue') as mock_queue:
             test_request = Request('http://test.url', lambda x: [])
             test_response = Response('http://test.url', None, "<html>content</html>", test_request)
+            mock_queue.full.return_value = True
             
             # Make the mocked methods return awaitable objects
             mock_request.return_value = test_response
@@ -74,9 +83,10 @@ async def test_orchestrate_with_request(crawler, mock_response):
 @pytest.mark.asyncio
 async def test_orchestrate_with_response(crawler):
     with patch.object(crawler, 'response') as mock_response_method:
-        with patch.object(crawler, 'queue') as mock_queue:
+        with patch.object(crawler.item_stage, 'queue') as mock_queue:
             test_request = Request('http://test.url', lambda x: [])
             test_response = Response('http://test.url', None, "<html>content</html>", test_request)
+            mock_queue.full.return_value = True
             
             # Mock response method to return items
             result_items = [Item('http://result1.url'), Item('http://result2.url')]
@@ -142,4 +152,303 @@ async def test_orchestrate(crawler):
         mock_request.assert_called_once()
     test_item = Item('http://some.url')
     await crawler.orchestrate(test_item)
-    assert test_item == crawler.result_queue.get()
\ No newline at end of file
+    assert test_item == crawler.result_queue.get()
+
+@pytest.mark.asyncio
+async def test_orchestrate_item_with_sink(crawler):
+    crawler.sink = MagicMock()
+    crawler.sink.put = AsyncMock()
+    test_item = Item('http://some.url')
+    await crawler.orchestrate(test_item)
+    crawler.sink.put.assert_awaited_once_with(test_item)
+    assert crawler.result_queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_orchestrate_skips_duplicate_request(crawler):
+    with patch.object(crawler, 'request') as mock_request:
+        mock_request.return_value = None
+        await crawler.orchestrate(Request('http://test.url/repo', lambda x: []))
+        await crawler.orchestrate(Request('http://test.url/repo', lambda x: []))
+        mock_request.assert_called_once()
+    assert crawler.dupefilter.duplicates == 1
+
+
+@pytest.mark.asyncio
+async def test_request_revalidates_cached_response(crawler, tmp_path):
+    from crawler.dupefilter import request_fingerprint
+    from crawler.httpcache import HttpCache
+
+    crawler.cache = HttpCache(str(tmp_path), ttl=0)
+    request = Request("https://github.com/user/repo", lambda x: [])
+    crawler.cache.store(request_fingerprint(request), request.url, 200, b"<html>cached</html>", {"ETag": '"v1"'})
+    not_modified = MagicMock(status=304, url=request.url, headers={})
+    with patch('aiohttp.ClientSession.get') as mock_get:
+        mock_get.return_value.__aenter__.return_value = not_modified
+        response = await crawler.request(request)
+    assert mock_get.call_args.kwargs['headers'] == {'Accept-Encoding': crawler.accept_encoding, 'If-None-Match': '"v1"'}
+    assert response.body == "<html>cached</html>"
+    assert crawler.cache.revalidated == 1
+    crawler.cache.close()
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_keeps_the_charset(crawler, tmp_path):
+    from crawler.dupefilter import request_fingerprint
+
+    crawler.cache = HttpCache(str(tmp_path))
+    request = Request("https://github.com/user/repo", lambda x: [])
+    crawler.cache.store(request_fingerprint(request), request.url, 200, "<p>café</p>".encode('latin-1'), {},
+                        encoding='latin-1')
+    with patch('aiohttp.ClientSession.get') as mock_get:
+        response = await crawler.request(request)
+    assert not mock_get.called
+    assert response.encoding == 'latin-1'
+    assert response.body == "<p>café</p>"
+    crawler.cache.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_request_is_scheduled_for_retry(crawler, mock_response):
+    mock_response.status = 503
+    with patch('aiohttp.ClientSession.get') as mock_get:
+        mock_get.return_value.__aenter__.return_value = mock_response
+        request = Request("https://github.com/user/repo", lambda x: [])
+        assert await crawler.request(request) is None
+    assert len(crawler.delayed) == 1
+    retry_request = crawler.delayed.heap[0][2]
+    assert retry_request.meta['retry_times'] == 1
+    assert retry_request.meta['dont_filter']
+
+
+@pytest.mark.asyncio
+async def test_exhausted_request_goes_to_dead_letter(crawler, tmp_path):
+    from crawler.retry import DeadLetterLog
+
+    crawler.dead_letter = DeadLetterLog(str(tmp_path / 'dead.jsonl'))
+    request = Request("https://github.com/user/repo", lambda x: [], meta={'retry_times': 3})
+    crawler.retry(request, 'status 503', status=503)
+    assert len(crawler.delayed) == 0
+    assert crawler.dead_letter.count == 1
+
+
+@pytest.mark.asyncio
+async def test_crawl_resumes_from_state(crawler, mock_response, tmp_path):
+    from crawler.state import CrawlState
+    from crawler.dupefilter import request_fingerprint
+
+    state = CrawlState(str(tmp_path / 'state.sqlite'))
+    done = Request('https://github.com/search', crawler.parser.parse_search_page, meta={'params': {'q': 'python'}})
+    pending = Request('https://github.com/search', crawler.parser.parse_search_page, meta={'params': {'q': 'async'}})
+    state.add_request(done)
+    state.complete(done)
+    state.add_request(pending)
+    state.add_item(Item('http://unexported.url'))
+    crawler.state, crawler.resume = state, True
+
+    fetched = []
+    original_request = crawler.request
+
+    async def tracking_request(request):
+        fetched.append(request_fingerprint(request))
+        return await original_request(request)
+
+    with patch('aiohttp.ClientSession.get') as mock_get, patch.object(crawler, 'request', tracking_request):
+        mock_get.return_value.__aenter__.return_value = mock_response
+        await crawler.crawl()
+
+    assert fetched == [request_fingerprint(pending)]
+    assert crawler.result_queue.get() == Item('http://unexported.url')
+
+
+@pytest.mark.asyncio
+async def test_resume_restores_more_items_than_the_item_queue_holds(tmp_path):
+    from crawler.state import CrawlState
+
+    state = CrawlState(str(tmp_path / 'state.sqlite'))
+    for i in range(25):
+        state.add_item(Item(f'http://unexported.url/{i}'))
+    crawler = Crawler(['python'], [], 'repositories', result_queue=Queue(), item_queue_size=10,
+                      state=state, resume=True)
+    await asyncio.wait_for(crawler.crawl(), timeout=5)
+    assert crawler.result_queue.qsize() == 25
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_github', [{'rows': 10, 'total_pages': 2}], indirect=True)
+async def test_crawl_against_fake_github(fake_github):
+    crawler = Crawler(['python'], [], 'repositories', result_queue=Queue(), max_pages=2, rate_limit=1000,
+                      base_url=fake_github.base_url)
+    await crawler.crawl()
+
+    items = [crawler.result_queue.get() for _ in range(crawler.result_queue.qsize())]
+    assert len(items) == 20
+    assert {item.extra['owner'] for item in items} == {f'python-{page}-{position}' for page in (1, 2) for position in range(10)}
+    assert all(item.extra['language_stats'] for item in items)
+
+
+@pytest.mark.asyncio
+async def test_response_is_released_after_parse(crawler):
+    request = Request('http://test.url', lambda response: [Item(response.body)])
+    response = Response('http://test.url', MagicMock(), b'<html>content</html>', request)
+    await crawler.orchestrate(response)
+    assert crawler.item_stage.queue.get_nowait() == Item('<html>content</html>')
+    assert response.response is None and response.content is None
+
+
+@pytest.mark.asyncio
+async def test_request_deadline_schedules_retry(crawler):
+    async def stuck(*args, **kwargs):
+        await asyncio.sleep(10)
+
+    crawler.request_timeout = 0.05
+    request = Request('http://test.url', lambda response: [])
+    with patch('aiohttp.ClientSession.get') as mock_get:
+        mock_get.return_value.__aenter__ = stuck
+        assert await crawler.request(request) is None
+    assert crawler.retries == 1
+    assert len(crawler.delayed) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_github', [{'total_pages': 2}], indirect=True)
+async def test_crawl_replays_recorded_archive(tmp_path, fake_github):
+    path = str(tmp_path / 'crawl.archive')
+    recorder = Crawler(['python'], [], 'repositories', result_queue=Queue(), max_pages=2, rate_limit=1000,
+                       base_url=fake_github.base_url, archive=ResponseArchive(path))
+    await recorder.crawl()
+    assert recorder.archive.written == 22
+    fetched = fake_github.requests
+
+    # Every page has to come from the archive
+    replayer = Crawler(['python'], [], 'repositories', result_queue=Queue(), max_pages=2,
+                       base_url=fake_github.base_url, parse_executor='thread',
+                       archive=ResponseArchive(path, mode=ArchiveModes.replay))
+    await replayer.crawl()
+
+    recorded = [recorder.result_queue.get() for _ in range(recorder.result_queue.qsize())]
+    replayed = [replayer.result_queue.get() for _ in range(replayer.result_queue.qsize())]
+    assert len(replayed) == 20
+    assert {(item.url, tuple(item.extra['language_stats'])) for item in replayed} == \
+           {(item.url, tuple(item.extra['language_stats'])) for item in recorded}
+    assert replayer.archive.misses == 0
+    assert fake_github.requests == fetched
+
+
+@pytest.mark.asyncio
+async def test_incremental_crawl_only_fetches_changed_repositories(tmp_path, fake_github):
+    async def crawl():
+        crawler = Crawler(['python'], [], 'repositories', result_queue=Queue(), max_pages=1, rate_limit=1000,
+                          base_url=fake_github.base_url,
+                          repository_index=RepositoryIndex(str(tmp_path / 'repositories.sqlite')))
+        await crawler.crawl()
+        return [crawler.result_queue.get() for _ in range(crawler.result_queue.qsize())]
+
+    first = await crawl()
+    assert fake_github.requests == 11
+    index = RepositoryIndex(str(tmp_path / 'repositories.sqlite'))
+    with index.connection:
+        index.connection.execute("UPDATE repositories SET signature = 'stale' WHERE url LIKE '%python-1-0%'")
+    index.close()
+
+    second = await crawl()
+
+    # The search page and the one repository whose listing changed
+    assert fake_github.requests == 13
+    assert sorted((item.url, item.extra['owner']) for item in second) == \
+           sorted((item.url, item.extra['owner']) for item in first)
+
+
+@pytest.mark.asyncio
+async def test_crawl_several_types_in_one_pass(fake_github):
+    crawler = Crawler(['python'], [], ['Repositories', 'Issues', 'Wikis'], result_queue=Queue(), max_pages=1,
+                      rate_limit=1000, base_url=fake_github.base_url)
+    await crawler.crawl()
+
+    items = [crawler.result_queue.get() for _ in range(crawler.result_queue.qsize())]
+    by_type = {type_: [item for item in items if item.type == type_] for type_ in ('repositories', 'issues', 'wikis')}
+    assert [len(found) for found in by_type.values()] == [10, 10, 10]
+    assert all(item.url.endswith('/issues/1') for item in by_type['issues'])
+    assert all(item.extra['owner'] for item in by_type['repositories'])
+    # Three search pages and the repository pages, issues and wikis come straight from their search page
+    assert fake_github.requests == 13
+
+
+def test_unknown_type_is_rejected():
+    with pytest.raises(ValueError, match='gists'):
+        Crawler(['python'], [], ['repositories', 'gists'])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_github', [{'rows': 200}], indirect=True)
+async def test_crawl_negotiates_compression(fake_github):
+    crawler = Crawler(['python'], [], 'repositories', result_queue=Queue(), max_pages=1, rate_limit=1000,
+                      base_url=fake_github.base_url)
+    await crawler.crawl()
+
+    assert crawler.result_queue.qsize() == 10
+    counters = crawler.metrics.snapshot()['counters']
+    [labels] = counters['downloaded_bytes_total']
+    assert labels in ('encoding=gzip', 'encoding=deflate')
+    assert counters['downloaded_bytes_total'][labels] * 5 < counters['decoded_bytes_total'][labels]
+    histograms = crawler.metrics.snapshot()['histograms']
+    wire, decoded = histograms['response_wire_bytes'], histograms['response_decoded_bytes']
+    assert wire['function=parse_detail_page']['count'] == 10
+    assert set(decoded) == {'function=parse_search_page', 'function=parse_detail_page'}
+    assert wire['function=parse_detail_page']['sum'] * 5 < decoded['function=parse_detail_page']['sum']
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_github', [{'total_pages': 3, 'latency': 0.01, 'jitter': 0.01, 'error_rate': 0.1,
+                                          'seed': 3}], indirect=True)
+async def test_items_come_out_in_search_order_per_keyword(fake_github):
+    crawler = Crawler(['python', 'async'], [], 'repositories', result_queue=Queue(), max_pages=3, rate_limit=1000,
+                      base_url=fake_github.base_url, retry_policy=RetryPolicy(base_delay=0.01, max_delay=0.05),
+                      proxy_cooldown=0.01)
+    await crawler.crawl()
+
+    items = [crawler.result_queue.get() for _ in range(crawler.result_queue.qsize())]
+    assert fake_github.errors
+    for keyword in ('python', 'async'):
+        assert [item.extra['owner'] for item in items if item.extra['owner'].startswith(f'{keyword}-')] == \
+               [f'{keyword}-{page}-{position}' for page in (1, 2, 3) for position in range(10)]
+
+
+@pytest.mark.asyncio
+async def test_incremental_crawl_keeps_item_types(tmp_path, fake_github):
+    async def crawl():
+        crawler = Crawler(['python'], [], ['Repositories', 'Issues'], result_queue=Queue(), max_pages=1,
+                          rate_limit=1000, base_url=fake_github.base_url,
+                          repository_index=RepositoryIndex(str(tmp_path / 'repositories.sqlite')))
+        await crawler.crawl()
+        return [crawler.result_queue.get() for _ in range(crawler.result_queue.qsize())]
+
+    first = await crawl()
+    second = await crawl()
+
+    # Only the two search pages the second time round
+    assert fake_github.requests == 12 + 2
+    for type_ in ('repositories', 'issues'):
+        assert [(item.url, item.extra) for item in second if item.type == type_] == \
+               [(item.url, item.extra) for item in first if item.type == type_]
+    assert sorted(item.type for item in second) == ['issues'] * 10 + ['repositories'] * 10
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_github', [{'rows': 2000, 'compress': False}], indirect=True)
+async def test_cached_pages_are_read_whole(tmp_path, fake_github):
+    async def crawl():
+        crawler = Crawler(['python'], [], 'repositories', result_queue=Queue(), max_pages=1, rate_limit=1000,
+                          base_url=fake_github.base_url, cache=HttpCache(str(tmp_path / 'cache')))
+        await crawler.crawl()
+        return crawler
+
+    first = await crawl()
+    assert first.early_aborts == 0
+    assert fake_github.requests == 11
+
+    # Every page, repository pages included, is served from the cache
+    second = await crawl()
+    assert fake_github.requests == 11
+    assert second.cache.hits == 11
+    assert second.result_queue.qsize() == 10
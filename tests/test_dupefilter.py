@@ -0,0 +1,31 @@
+from crawler.core import Request
+from crawler.dupefilter import BloomDupeFilter, MemoryDupeFilter, canonicalize_url, request_fingerprint
+
+
+def test_canonicalize_url():
+    assert canonicalize_url('HTTPS://GitHub.com:443/user/repo/?b=2&a=1#readme') == 'https://github.com/user/repo?a=1&b=2'
+
+
+def test_fingerprint_includes_params():
+    first = Request('https://github.com/search', None, meta={'params': {'q': 'nova', 'type': 'repositories'}})
+    same = Request('https://github.com/search?type=repositories', None, meta={'params': {'q': 'nova'}})
+    other = Request('https://github.com/search', None, meta={'params': {'q': 'css', 'type': 'repositories'}})
+    assert request_fingerprint(first) == request_fingerprint(same)
+    assert request_fingerprint(first) != request_fingerprint(other)
+
+
+def test_memory_dupefilter_counts_duplicates():
+    dupefilter = MemoryDupeFilter()
+    assert not dupefilter.request_seen(Request('https://github.com/user/repo', None))
+    assert dupefilter.request_seen(Request('https://github.com/user/repo/', None))
+    assert not dupefilter.request_seen(Request('https://github.com/user/repo', None, meta={'dont_filter': True}))
+    assert dupefilter.duplicates == 1
+
+
+def test_bloom_dupefilter():
+    dupefilter = BloomDupeFilter(capacity=1000, error_rate=0.01)
+    requests = [Request(f'https://github.com/user/repo{i}', None) for i in range(500)]
+    assert not any(dupefilter.request_seen(request) for request in requests)
+    assert all(dupefilter.request_seen(request) for request in requests)
+    assert dupefilter.duplicates == 500
+    assert len(dupefilter.bits) < 2000
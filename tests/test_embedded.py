@@ -0,0 +1,57 @@
+import json
+
+from crawler.parsers.embedded import (
+    embedded_payload, extract_embedded_data, repository_owner, result_signature, search_results
+)
+
+
+def page(data):
+    return (
+        '<html><body><script type="application/json" data-target="react-partial.embeddedData">{"x": 1}</script>'
+        f'<script type="application/json" data-target="react-app.embeddedData">{json.dumps(data)}</script>'
+        '</body></html>'
+    )
+
+
+def test_extract_embedded_data():
+    assert extract_embedded_data(page({'payload': {'a': 1}})) == {'payload': {'a': 1}}
+    assert extract_embedded_data('<html></html>') is None
+
+
+def test_extract_embedded_data_from_bytes():
+    html = '<script type="application/json" data-target="react-app.embeddedData">{"name": "caf\u00e9"}</script>'
+    assert extract_embedded_data(html.encode('latin-1'), encoding='latin-1') == {'name': 'caf\u00e9'}
+    assert extract_embedded_data(page({'payload': {'a': 1}}).encode()) == {'payload': {'a': 1}}
+    assert extract_embedded_data(b'<html></html>') is None
+
+
+def test_invalid_json_is_ignored():
+    html = '<script type="application/json" data-target="react-app.embeddedData">{broken</script>'
+    assert embedded_payload(html) is None
+
+
+def test_search_results():
+    payload = {
+        'results': [
+            {'repo': {'repository': {'owner_login': 'openstack', 'name': 'nova'}}, 'language': 'Python'},
+            {'hl_name': '<em>open</em>stack/swift', 'language': None},
+            {'unexpected': True},
+        ]
+    }
+    assert search_results(payload) == [
+        {'path': '/openstack/nova', 'owner': 'openstack', 'language': 'Python', 'signature': None},
+        {'path': '/openstack/swift', 'owner': 'openstack', 'language': None, 'signature': None},
+    ]
+    assert search_results({}) is None
+
+
+def test_result_signature():
+    result = {'repo': {'repository': {'updated_at': '2024-05-01T10:00:00Z'}}, 'followers': 120}
+    assert result_signature(result) == '2024-05-01T10:00:00Z|120'
+    assert result_signature({'followers': 3}) == 'None|3'
+    assert result_signature({}) is None
+
+
+def test_repository_owner():
+    assert repository_owner(embedded_payload(page({'payload': {'repo': {'ownerLogin': 'openstack'}}}))) == 'openstack'
+    assert repository_owner({}) is None
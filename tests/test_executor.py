@@ -0,0 +1,79 @@
+import pickle
+from unittest.mock import patch
+
+import pytest
+
+from crawler.core import Request, Response, Item
+from crawler.executor import ExecutorModes, ParseExecutor, parse_response
+from crawler.parsers.github import GHSearchPageParser
+
+
+SEARCH_HTML = """
+<div data-testid="results-list">
+    <div class="search-title"><a href="/user1/repo1">user1/repo1</a></div>
+    <div class="search-title"><a href="/user2/repo2">user2/repo2</a></div>
+</div>
+"""
+
+
+@pytest.fixture
+def search_response():
+    parser = GHSearchPageParser()
+    request = Request('https://github.com/search', parser.parse_search_page)
+    return Response('https://github.com/search?q=python', None, SEARCH_HTML, request)
+
+
+def test_parse_response_materializes_generator(search_response):
+    results = parse_response(search_response)
+    assert isinstance(results, list)
+    assert [r.url for r in results] == ['https://github.com/user1/repo1', 'https://github.com/user2/repo2']
+
+
+def test_detach_drops_live_response(search_response):
+    search_response.response = object()
+    detached = search_response.detach()
+    assert detached.response is None
+    assert detached.body == search_response.body
+    assert detached.urljoin('/a/b') == 'https://github.com/a/b'
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('mode', [ExecutorModes.process, ExecutorModes.thread, ExecutorModes.inline])
+async def test_run_returns_requests(mode, search_response):
+    executor = ParseExecutor(mode, workers=1)
+    try:
+        results = await executor.run(search_response)
+    finally:
+        executor.shutdown()
+    assert len(results) == 2
+    assert all(isinstance(r, Request) for r in results)
+    assert isinstance(results[0].meta['item'], Item)
+
+
+@pytest.mark.asyncio
+async def test_unpicklable_callback_runs_inline():
+    item = Item('http://some.url')
+    request = Request('http://test.url', lambda response: [item])
+    response = Response('http://test.url', None, '<html></html>', request)
+    executor = ParseExecutor(ExecutorModes.process, workers=1)
+    try:
+        results = await executor.run(response)
+    finally:
+        executor.shutdown()
+    assert results == [item]
+
+
+def test_picklability_is_checked_once_per_callable(caplog):
+    parser = GHSearchPageParser()
+    executor = ParseExecutor(ExecutorModes.process, workers=1)
+    caplog.set_level('DEBUG', 'crawler.executor')
+    with patch('crawler.executor.pickle.dumps', wraps=pickle.dumps) as dumps:
+        assert all(executor._is_picklable(parser.parse_detail_page) for _ in range(3))
+        assert not any(executor._is_picklable(lambda response: []) for _ in range(3))
+        assert executor._is_picklable(GHSearchPageParser().parse_detail_page)
+    assert dumps.call_count == 3
+    # Logged once, the lambda is a fresh object every time but has the same name
+    assert [record.getMessage() for record in caplog.records] == [
+        'test_picklability_is_checked_once_per_callable.<locals>.<genexpr>.<lambda> '
+        'can not be sent to the process pool, parsing its pages inline'
+    ]
@@ -1,9 +1,13 @@
+import json
+import pickle
+
 import pytest
 from bs4 import BeautifulSoup
 from unittest.mock import MagicMock, patch
 
-from crawler.parsers.github import GHSearchPageParser
+from crawler.parsers.github import GHIssuesParser, GHSearchPageParser, GHWikisParser
 from crawler.core import Response, Request, Item
+from crawler.parsers.backends import SoupBackend, has_class
 
 
 
@@ -211,12 +215,165 @@ def test_urljoin_functionality(parser, search_response):
     </html>
     """
 
-    # Mock the urljoin method to verify it's called correctly
-    with patch.object(search_response, 'urljoin') as mock_urljoin:
+    # Mock the urljoin method to verify it's called correctly; Response has slots, so patch the class
+    with patch.object(Response, 'urljoin', autospec=True) as mock_urljoin:
         mock_urljoin.return_value = "https://github.com/relative/path"
 
         results = list(parser.parse_search_page(search_response))
 
         assert len(results) == 1
-        mock_urljoin.assert_called_once_with("/relative/path")
+        mock_urljoin.assert_called_once_with(search_response, "/relative/path")
         assert results[0].url == "https://github.com/relative/path"
+
+def test_parse_search_page_fans_out_pages(parser):
+    html = """
+    <div data-testid="results-list">
+        <div class="search-title"><a href="/user1/repo1">user1/repo1</a></div>
+    </div>
+    <nav aria-label="Pagination">
+        <a href="?p=2">2</a><a href="?p=3">3</a><a href="?p=100">100</a><a href="?p=2">Next</a>
+    </nav>
+    """
+    parser.max_pages = 4
+    request = Request('https://github.com/search', parser.parse_search_page,
+                      meta={'params': {'q': 'python', 'type': 'repositories'}, 'order': (0,)})
+    response = Response('https://github.com/search?q=python', None, html, request)
+
+    results = list(parser.parse_search_page(response))
+
+    pages = [r for r in results if r.parse_function == parser.parse_search_page]
+    assert [r.meta['page'] for r in pages] == [2, 3, 4]
+    assert [r.meta['params']['p'] for r in pages] == [2, 3, 4]
+    assert all(r.meta['params']['q'] == 'python' for r in pages)
+    details = [r for r in results if r.parse_function == parser.parse_detail_page]
+    assert details[0].meta['item'].order == (0, 1, 0)
+
+
+def test_follow_up_pages_do_not_paginate_again(parser):
+    html = '<div data-total-pages="5"></div>'
+    request = Request('https://github.com/search', parser.parse_search_page,
+                      meta={'params': {'q': 'python', 'p': 3}, 'page': 3})
+    response = Response('https://github.com/search?q=python&p=3', None, html, request)
+
+    assert list(parser.parse_search_page(response)) == []
+
+
+# Engines other than html.parser are optional extras, a missing one shows up as a skip
+BACKEND_MODULES = {'html.parser': None, 'lxml': 'lxml', 'selectolax': 'selectolax'}
+
+
+@pytest.fixture(params=list(BACKEND_MODULES))
+def backend(request):
+    if BACKEND_MODULES[request.param] is not None:
+        pytest.importorskip(BACKEND_MODULES[request.param])
+    return request.param
+
+
+def test_backend_parity_search_page(backend, search_page_html):
+    reference = GHSearchPageParser(backend=SoupBackend(targeted=False))
+    parser = GHSearchPageParser(backend=backend)
+    html = search_page_html.replace('</body>', '<nav aria-label="Pagination"><a>2</a><a>3</a></nav></body>')
+
+    def parse(p):
+        request = Request('https://github.com/search', p.parse_search_page, meta={'params': {'q': 'python'}})
+        response = Response('https://github.com/search?q=python', None, html, request)
+        return [(r.url, r.meta.get('page')) for r in p.parse_search_page(response)]
+
+    assert parse(parser) == parse(reference)
+    assert len(parse(parser)) == 5
+
+
+def test_backend_parity_detail_page(backend, detail_page_html):
+    reference = GHSearchPageParser(backend=SoupBackend(targeted=False))
+    parser = GHSearchPageParser(backend=backend)
+
+    def parse(p):
+        request = Request('https://github.com/user1/repo1', p.parse_detail_page,
+                          meta={'item': Item('https://github.com/user1/repo1')})
+        response = Response('https://github.com/user1/repo1', None, detail_page_html, request)
+        return [(r.url, r.extra) for r in p.parse_detail_page(response)]
+
+    assert parse(parser) == parse(reference)
+    assert parse(parser)[0][1]['language_stats'] == {'Python': 80.5, 'JavaScript': 19.5}
+
+
+def test_targeted_parse_skips_unrelated_markup():
+    backend = SoupBackend()
+    root = backend.parse('<p>noise</p><div class="Layout-sidebar"><h2>Languages</h2></div><p>more</p>',
+                         [has_class('Layout-sidebar')])
+    assert str(root) == '<div class="Layout-sidebar"><h2>Languages</h2></div>'
+
+
+def test_detail_page_is_parsed_from_bytes(backend):
+    parser = GHSearchPageParser(backend=backend)
+    page = ('<div class="Layout-sidebar"><h2>Languages</h2><ul class="list-style-none"><li><a>'
+            '<span class="color-fg-default text-bold mr-1">Caf\u00e9Script</span><span>100%</span></a></li></ul></div>')
+    request = Request('https://github.com/user1/repo1', parser.parse_detail_page,
+                      meta={'item': Item('https://github.com/user1/repo1'), 'owner': 'user1'})
+    response = Response('https://github.com/user1/repo1', None, page.encode('latin-1'), request, encoding='latin-1')
+    [item] = parser.parse_detail_page(response)
+    assert item.extra['language_stats'] == {'Caf\u00e9Script': 100.0}
+    # The backend decoded the bytes itself
+    assert response._text is None
+
+
+def test_parser_with_backend_is_picklable(parser):
+    parser.backend.select(parser.backend.parse('<a></a>'), 'a')
+    restored = pickle.loads(pickle.dumps(parser))
+    assert restored.backend.name == 'html.parser'
+    assert restored.backend._compiled == {}
+
+
+def test_parse_search_page_from_embedded_json(parser):
+    payload = {'payload': {'page_count': 3, 'results': [
+        {'repo': {'repository': {'owner_login': 'openstack', 'name': 'nova'}}, 'language': 'Python'},
+    ]}}
+    html = ('<html><body><script type="application/json" data-target="react-app.embeddedData">'
+            f'{json.dumps(payload)}</script></body></html>')
+    request = Request('https://github.com/search', parser.parse_search_page, meta={'params': {'q': 'nova'}})
+    response = Response('https://github.com/search?q=nova', None, html.encode(), request)
+
+    results = list(parser.parse_search_page(response))
+
+    # Only the JSON was decoded, not the page
+    assert response._text is None
+    assert [r.meta['page'] for r in results[:2]] == [2, 3]
+    detail = results[2]
+    assert detail.url == 'https://github.com/openstack/nova'
+    assert detail.meta['owner'] == 'openstack'
+
+
+def test_parse_detail_page_with_known_owner(parser, detail_page_html):
+    html = detail_page_html.replace('<a data-hovercard-type="organization">organization-name</a>', '')
+    request = Request('https://github.com/user1/repo1', parser.parse_detail_page,
+                      meta={'item': Item('https://github.com/user1/repo1'), 'owner': 'user1'})
+    response = Response('https://github.com/user1/repo1', None, html, request)
+
+    item, = parser.parse_detail_page(response)
+
+    assert item.extra == {'owner': 'user1', 'language_stats': {'Python': 80.5, 'JavaScript': 19.5}}
+
+
+@pytest.mark.parametrize('parser_cls', [GHIssuesParser, GHWikisParser])
+def test_listing_parsers_emit_result_links(parser_cls):
+    html = """
+    <div data-testid="results-list">
+        <div class="search-title"><a href="/user1/repo1/issues/7">Crash on start</a></div>
+        <div class="search-title"><a href="/user2/repo2/wiki/Home">Home</a></div>
+    </div>
+    <div data-total-pages="3"></div>
+    """
+    parser = parser_cls(max_pages=2)
+    request = Request('https://github.com/search', parser.parse_search_page,
+                      meta={'params': {'q': 'python', 'type': parser.type}, 'order': (1, 0)})
+    results = list(parser.parse_search_page(Response('https://github.com/search', None, html, request)))
+
+    pages, items = results[:1], results[1:]
+    assert pages[0].meta['params'] == {'q': 'python', 'type': parser.type, 'p': 2}
+    assert [item.url for item in items] == [
+        'https://github.com/user1/repo1/issues/7', 'https://github.com/user2/repo2/wiki/Home'
+    ]
+    assert all(item.type == parser.type for item in items)
+    assert items[1].order == (1, 0, 1, 1)
+    assert items[0].serialize() == {'url': 'https://github.com/user1/repo1/issues/7', 'extra': None, 'type': parser.type}
+
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from crawler.hedging import HedgePolicy
+
+
+def primed(**kwargs) -> HedgePolicy:
+    policy = HedgePolicy(min_samples=10, min_delay=0.01, **kwargs)
+    for _ in range(10):
+        policy.record(0.02)
+    return policy
+
+
+def make_attempt(latencies: dict, calls: list, errors: dict | None = None):
+    """Attempts on route ``len(calls)`` answer after ``latencies[route]`` seconds."""
+    async def attempt(exclude, on_send):
+        route = len(calls)
+        calls.append((route, exclude))
+        on_send(route)
+        try:
+            await asyncio.sleep(latencies[route])
+        except asyncio.CancelledError:
+            calls.append((route, 'cancelled'))
+            raise
+        if errors and route in errors:
+            raise errors[route]
+        return route
+    return attempt
+
+
+def test_delay_needs_enough_samples():
+    policy = HedgePolicy(min_samples=5, min_delay=0.0)
+    for latency in (0.1, 0.2, 0.3, 0.4):
+        policy.record(latency)
+    assert policy.delay() is None
+    policy.record(1.0)
+    assert policy.delay() == 1.0
+    assert HedgePolicy(quantile=0.5, min_samples=5, min_delay=0.0).delay() is None
+
+
+def test_budget_caps_hedges():
+    policy = HedgePolicy(budget=0.1)
+    policy.requests = 20
+    policy.hedges = 1
+    assert policy.allow()
+    policy.hedges = 2
+    assert not policy.allow()
+    assert HedgePolicy(budget=5).budget == 1.0
+
+
+@pytest.mark.asyncio
+async def test_fast_request_is_not_hedged():
+    policy, calls = primed(), []
+    assert await policy.run(make_attempt({0: 0.0}, calls)) == 0
+    assert calls == [(0, ())]
+    assert policy.hedges == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_request_is_hedged_on_another_route():
+    policy, calls = primed(budget=1.0), []
+    assert await policy.run(make_attempt({0: 5.0, 1: 0.0}, calls)) == 1
+    assert calls == [(0, ()), (1, (0,)), (0, 'cancelled')]
+    assert (policy.hedges, policy.wins) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_exhausted_budget_waits_for_the_original():
+    policy, calls = primed(budget=0.0), []
+    assert await policy.run(make_attempt({0: 0.05}, calls)) == 0
+    assert calls == [(0, ())]
+
+
+@pytest.mark.asyncio
+async def test_failed_hedge_leaves_the_original_running():
+    policy, calls = primed(budget=1.0), []
+    attempt = make_attempt({0: 0.1, 1: 0.0}, calls, errors={1: LookupError('No proxy left to try')})
+    assert await policy.run(attempt) == 0
+    assert policy.wins == 0
+
+
+@pytest.mark.asyncio
+async def test_both_failing_raises_the_original_error():
+    policy, calls = primed(budget=1.0), []
+    attempt = make_attempt({0: 0.1, 1: 0.0}, calls, errors={0: ValueError('primary'), 1: LookupError('hedge')})
+    with pytest.raises(ValueError, match='primary'):
+        await policy.run(attempt)
+
+
+@pytest.mark.asyncio
+async def test_retryable_answer_loses_to_the_other_attempt():
+    policy, calls = primed(budget=1.0), []
+    statuses = {0: 200, 1: 503}
+    attempt = make_attempt({0: 0.1, 1: 0.0}, calls)
+    assert await policy.run(attempt, lost=lambda route: statuses[route] == 503) == 0
+    assert policy.wins == 0
+
+
+@pytest.mark.asyncio
+async def test_retryable_answers_on_both_routes_return_the_original():
+    policy, calls = primed(budget=1.0), []
+    attempt = make_attempt({0: 0.1, 1: 0.0}, calls)
+    assert await policy.run(attempt, lost=lambda route: True) == 0
+    assert policy.wins == 0
@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import time
+
+import pytest
+
+from crawler.httpcache import HttpCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache'), ttl=60, max_size=100)
+    yield cache
+    cache.close()
+
+
+def test_store_and_get(cache):
+    cache.store('fp1', 'https://github.com/a/b', 200, b'<html>body</html>', {'ETag': '"abc"'})
+    entry = cache.get('fp1')
+    assert entry.text == '<html>body</html>'
+    assert entry.status == 200
+    assert cache.is_fresh(entry)
+    assert entry.validators() == {'If-None-Match': '"abc"'}
+    assert cache.get('missing') is None
+
+
+def test_charset_is_kept(cache):
+    cache.store('fp1', 'https://github.com/a/b', 200, 'café'.encode('latin-1'), {}, encoding='latin-1')
+    entry = cache.get('fp1')
+    assert entry.encoding == 'latin-1'
+    assert entry.text == 'café'
+
+
+def test_index_without_encoding_is_migrated(tmp_path):
+    os.makedirs(tmp_path / 'cache')
+    connection = sqlite3.connect(tmp_path / 'cache' / 'index.sqlite')
+    connection.execute(
+        'CREATE TABLE entries (fingerprint TEXT PRIMARY KEY, url TEXT, status INTEGER, digest TEXT, size INTEGER, '
+        'etag TEXT, last_modified TEXT, stored_at REAL, accessed_at REAL)'
+    )
+    connection.close()
+    cache = HttpCache(str(tmp_path / 'cache'))
+    cache.connection.execute(
+        "INSERT INTO entries (fingerprint, url, status, digest, size, stored_at, accessed_at) "
+        "VALUES ('old', 'https://github.com/a/b', 200, 'digest', 4, 0, 0)"
+    )
+    cache.store('new', 'https://github.com/a/c', 200, b'body', {}, encoding='cp1252')
+    assert cache.get('new').encoding == 'cp1252'
+    os.makedirs(os.path.dirname(cache._object_path('digest')), exist_ok=True)
+    with open(cache._object_path('digest'), 'wb') as f:
+        f.write(b'body')
+    assert cache.get('old').encoding == 'utf-8'
+    cache.close()
+
+
+def test_bodies_are_content_addressed(cache):
+    cache.store('fp1', 'https://github.com/a/b', 200, b'same', {})
+    cache.store('fp2', 'https://github.com/a/c', 200, b'same', {})
+    assert cache.get('fp1').digest == cache.get('fp2').digest
+    assert cache.size() == 4
+
+
+def test_stale_entry_is_refreshed(cache):
+    cache.store('fp1', 'https://github.com/a/b', 200, b'body', {'Last-Modified': 'yesterday'})
+    cache.connection.execute('UPDATE entries SET stored_at = ?', (time.time() - 120,))
+    assert not cache.is_fresh(cache.get('fp1'))
+    cache.refresh('fp1', {'ETag': '"new"'})
+    entry = cache.get('fp1')
+    assert cache.is_fresh(entry)
+    assert entry.validators() == {'If-None-Match': '"new"', 'If-Modified-Since': 'yesterday'}
+
+
+def test_lru_eviction(cache):
+    cache.store('old', 'https://github.com/a/old', 200, b'x' * 40, {})
+    cache.store('used', 'https://github.com/a/used', 200, b'y' * 40, {})
+    cache.connection.execute("UPDATE entries SET accessed_at = 0 WHERE fingerprint = 'old'")
+    cache.get('used')
+    cache.store('new', 'https://github.com/a/new', 200, b'z' * 40, {})
+    assert cache.get('old') is None
+    assert cache.get('used') is not None
+    assert cache.get('new') is not None
+    assert sum(len(files) for _, _, files in os.walk(os.path.join(cache.directory, 'objects'))) == 2
@@ -0,0 +1,35 @@
+import time
+
+import pytest
+
+from crawler.incremental import RepositoryIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = RepositoryIndex(str(tmp_path / 'repositories.sqlite'))
+    yield index
+    index.close()
+
+
+def test_lookup_matches_signature(index):
+    index.store('https://github.com/a/b', '2024-01-01|5', {'owner': 'a', 'language_stats': {'Python': 100.0}})
+    assert index.lookup('https://github.com/a/b', '2024-01-01|5') == {'owner': 'a', 'language_stats': {'Python': 100.0}}
+    assert index.lookup('https://github.com/a/b', '2024-02-01|5') is None
+    assert index.lookup('https://github.com/a/c', '2024-01-01|5') is None
+    assert index.unchanged == 1
+
+
+def test_old_entries_are_refetched(index):
+    index.max_age = 60
+    index.store('https://github.com/a/b', 'sig', {})
+    assert index.lookup('https://github.com/a/b', 'sig') == {}
+    index.connection.execute('UPDATE repositories SET crawled_at = ?', (time.time() - 120,))
+    assert index.lookup('https://github.com/a/b', 'sig') is None
+
+
+def test_store_many(index):
+    index.store_many([('https://github.com/a/b', 'sig', {'owner': 'a'}), ('https://github.com/a/c', 'sig', None)])
+    assert len(index) == 2
+    assert index.lookup('https://github.com/a/b', 'sig') == {'owner': 'a'}
+    assert index.lookup('https://github.com/a/c', 'sig') is None
@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from crawler.limiter import AdaptiveLimiter
+
+
+def test_additive_increase_up_to_max():
+    limiter = AdaptiveLimiter(initial=2, max_limit=4)
+    for _ in range(50):
+        limiter.record(0.1)
+    assert limiter.limit == 4
+
+
+def test_multiplicative_decrease_on_throttling():
+    limiter = AdaptiveLimiter(initial=16, min_limit=2, decrease_interval=0)
+    limiter.record(0.1, throttled=True)
+    assert limiter.limit == 8
+    limiter.record(0.1, ok=False)
+    limiter.record(0.1, ok=False)
+    limiter.record(0.1, ok=False)
+    assert limiter.limit == 2
+
+
+def test_latency_spike_backs_off_once_per_interval():
+    limiter = AdaptiveLimiter(initial=16, decrease_interval=60)
+    limiter.record(0.1)
+    limiter.record(1.0)
+    limiter.record(1.0)
+    assert limiter.limit == 8
+
+
+@pytest.mark.asyncio
+async def test_acquire_respects_limit():
+    limiter = AdaptiveLimiter(initial=1, max_limit=1)
+    async with limiter.acquire():
+        assert limiter.in_flight == 1
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(limiter.acquire().__aenter__(), 0.01)
+    assert limiter.in_flight == 0
@@ -0,0 +1,89 @@
+import json
+
+import aiohttp
+import pytest
+
+from crawler.core import Item, Request, Response
+from crawler.metrics import Histogram, Metrics, MetricsServer, StatsReporter
+
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(0.1, 0.5, 1.0))
+    for value in (0.05, 0.05, 0.3, 0.7, 5.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.quantile(0.4) == 0.1
+    assert histogram.quantile(0.6) == 0.5
+    assert histogram.quantile(0.99) == 1.0
+    assert Histogram().quantile(0.5) is None
+
+
+def test_snapshot_groups_series_by_labels():
+    metrics = Metrics()
+    metrics.inc('requests_total', proxy='direct', status=200)
+    metrics.inc('requests_total', proxy='direct', status=200)
+    metrics.observe('request_latency_seconds', 0.2, status=200, proxy='direct')
+    metrics.collect(lambda: {'queue_depth': 3})
+
+    snapshot = metrics.snapshot()
+    assert snapshot['counters']['requests_total'] == {'proxy=direct,status=200': 2}
+    assert snapshot['histograms']['request_latency_seconds']['proxy=direct,status=200']['count'] == 1
+    assert snapshot['gauges'] == {'queue_depth': 3}
+
+
+def test_prometheus_format():
+    metrics = Metrics()
+    metrics.observe('parse_seconds', 0.02, buckets=(0.01, 0.1), function='parse_detail_page')
+    metrics.collect(lambda: {'retries_total': 2, 'queue_depth': 5})
+    lines = metrics.prometheus().splitlines()
+    assert 'gh_crawler_parse_seconds_bucket{function="parse_detail_page",le="0.01"} 0' in lines
+    assert 'gh_crawler_parse_seconds_bucket{function="parse_detail_page",le="0.1"} 1' in lines
+    assert 'gh_crawler_parse_seconds_bucket{function="parse_detail_page",le="+Inf"} 1' in lines
+    assert 'gh_crawler_parse_seconds_count{function="parse_detail_page"} 1' in lines
+    assert '# TYPE gh_crawler_retries_total counter' in lines
+    assert '# TYPE gh_crawler_queue_depth gauge' in lines
+
+
+@pytest.mark.asyncio
+async def test_stats_reporter_keeps_history(tmp_path):
+    metrics = Metrics()
+    depth = iter(range(10))
+    metrics.collect(lambda: {'queue_depth': next(depth)})
+    reporter = StatsReporter(metrics, str(tmp_path / 'stats.json'), interval=60)
+    metrics.inc('items_total', 4)
+    await reporter.dump()
+    await reporter.stop()
+
+    with open(tmp_path / 'stats.json') as f:
+        stats = json.load(f)
+    assert [point['queue_depth'] for point in stats['history']] == [0, 2]
+    assert stats['counters']['items_total'] == {'': 4}
+    assert stats['history'][1]['items_per_second'] == 0
+
+
+@pytest.mark.asyncio
+async def test_metrics_server(unused_tcp_port):
+    metrics = Metrics()
+    metrics.inc('items_total')
+    server = MetricsServer(metrics, unused_tcp_port)
+    await server.start()
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f'http://127.0.0.1:{unused_tcp_port}/metrics') as response:
+                assert 'gh_crawler_items_total 1' in await response.text()
+            async with session.get(f'http://127.0.0.1:{unused_tcp_port}/stats') as response:
+                assert (await response.json())['counters'] == {'items_total': {'': 1}}
+    finally:
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_crawler_records_parse_time_and_items(crawler):
+    request = Request('https://github.com/a/b', lambda response: [Item('https://github.com/a/b')])
+    await crawler.orchestrate(Response('https://github.com/a/b', None, '<html></html>', request))
+    await crawler.orchestrate(crawler.item_stage.queue.get_nowait())
+
+    snapshot = crawler.metrics.snapshot()
+    assert snapshot['histograms']['parse_seconds']['function=<lambda>']['count'] == 1
+    assert snapshot['counters']['items_total'] == {'': 1}
+    assert snapshot['gauges']['queue_depth'] == 0
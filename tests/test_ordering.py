@@ -0,0 +1,50 @@
+from crawler.core import Item, Request, Response
+from crawler.ordering import OutputOrder, work_bound
+
+
+def test_work_bound():
+    search = Request('https://github.com/search', None, meta={'order': (1,), 'page': 2})
+    detail = Request('https://github.com/a/b', None, meta={'item': Item('https://github.com/a/b', order=(1, 2, 7))})
+    assert work_bound(search) == (1, 2)
+    assert work_bound(Response('https://github.com/search', None, b'', search)) == (1, 2)
+    assert work_bound(detail) == (1, 2)
+    assert work_bound(Item('https://github.com/a/b', order=(1, 2, 7))) == (1, 2)
+
+
+def test_items_wait_for_earlier_pages():
+    order = OutputOrder()
+    order.add((0, 1))
+    order.add((0, 2))
+    second = Item('https://github.com/a/second', order=(0, 2, 0))
+    order.hold(second)
+    order.done((0, 2))
+    assert list(order.release((0, 2))) == []
+
+    first = Item('https://github.com/a/first', order=(0, 1, 3))
+    order.hold(first)
+    assert list(order.release((0, 1))) == []
+    order.done((0, 1))
+    assert list(order.release((0, 1))) == [first, second]
+    assert len(order) == 0
+    assert not order.keywords
+
+
+def test_done_without_add_is_ignored():
+    order = OutputOrder()
+    order.done((0, 1))
+    item = Item('https://github.com/a/b', order=(0, 1, 0))
+    order.hold(item)
+    assert list(order.release((0, 1))) == [item]
+
+
+def test_keywords_are_ordered_independently():
+    order = OutputOrder()
+    order.add((0, 1))
+    order.add((1, 1))
+    later = Item('https://github.com/a/later', order=(1, 1, 0))
+    order.hold(later)
+    order.done((1, 1))
+    # Keyword 0 is still on its first page but does not hold back keyword 1
+    assert list(order.release((1, 1))) == [later]
+    assert list(order.release((0, 1))) == []
+    assert list(order.keywords) == [(0,)]
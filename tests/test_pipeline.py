@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from crawler.pipeline import Stage
+
+
+@pytest.mark.asyncio
+async def test_full_queue_blocks_producer():
+    release = asyncio.Event()
+    handled = []
+
+    async def slow(obj):
+        await release.wait()
+        handled.append(obj)
+
+    stage = Stage('parse', slow, workers=1, maxsize=1)
+    stage.start()
+    await stage.put(1)
+    await asyncio.sleep(0)
+    await stage.put(2)
+    producer = asyncio.create_task(stage.put(3))
+    await asyncio.sleep(0.05)
+    assert not producer.done()
+
+    release.set()
+    await producer
+    await stage.queue.join()
+    await stage.stop()
+    assert handled == [1, 2, 3]
+    assert stage.blocked >= 0.04
+    assert stage.idle
+
+
+@pytest.mark.asyncio
+async def test_utilization_and_failures():
+    async def handler(obj):
+        await asyncio.sleep(0.02)
+        if obj == 'bad':
+            raise ValueError(obj)
+
+    stage = Stage('fetch', handler, workers=2)
+    stage.start()
+    for obj in ('a', 'bad', 'b', 'c'):
+        await stage.put(obj)
+    await stage.queue.join()
+    await stage.stop()
+
+    assert stage.processed == 4
+    assert 0 < stage.utilization() <= 1
+    stats = stage.stats()
+    assert stats['fetch_workers'] == 2
+    assert stats['fetch_processed_total'] == 4
+    assert stats['fetch_queue_depth'] == 0
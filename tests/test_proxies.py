@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from crawler.proxies import ProxyPool
+
+
+@pytest.mark.asyncio
+async def test_direct_route_without_proxies():
+    pool = ProxyPool([])
+    async with pool.acquire() as state:
+        assert state.url is None
+
+
+@pytest.mark.asyncio
+async def test_untried_proxies_are_preferred():
+    pool = ProxyPool(['http://a', 'http://b'])
+    pool.report(pool.states[0], 0.5, 200)
+    async with pool.acquire() as state:
+        assert state.url == 'http://b'
+
+
+@pytest.mark.asyncio
+async def test_ban_status_cools_proxy_down():
+    pool = ProxyPool(['http://a', 'http://b'], cooldown=60)
+    pool.report(pool.states[0], 0.1, 429)
+    assert pool.states[0].bans == 1
+    for _ in range(5):
+        async with pool.acquire() as state:
+            assert state.url == 'http://b'
+
+
+@pytest.mark.asyncio
+async def test_consecutive_failures_cool_proxy_down():
+    pool = ProxyPool(['http://a'], cooldown=60, max_failures=2)
+    pool.report(pool.states[0], 0.1, error=ConnectionError())
+    assert pool.states[0].cooldown_until == 0
+    pool.report(pool.states[0], 0.1, 502)
+    assert pool.stats()[0]['cooling_down']
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap_per_proxy():
+    pool = ProxyPool(['http://a'], max_per_proxy=1)
+    async with pool.acquire():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pool.acquire().__aenter__(), 0.01)
+    async with pool.acquire() as state:
+        assert state.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_each_proxy_gets_its_own_session():
+    pool = ProxyPool(['http://a', 'http://b'])
+    first, second = (pool.session_for(state) for state in pool.states)
+    assert first is not second
+    assert pool.session_for(pool.states[0]) is first
+    await pool.close()
+    assert first.closed and second.closed
@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+from crawler.ratelimit import RateLimiter, TokenBucket
+
+
+def test_bucket_allows_burst_then_spaces_requests():
+    bucket = TokenBucket(rate=10, burst=3)
+    delays = [bucket.reserve(100.0) for _ in range(5)]
+    assert delays[:3] == [0, 0, 0]
+    assert delays[3] == pytest.approx(0.1)
+    assert delays[4] == pytest.approx(0.2)
+
+
+def test_pause_spreads_requests_after_it_ends():
+    bucket = TokenBucket(rate=10, burst=5)
+    bucket.pause(105.0)
+    delays = [bucket.reserve(100.0) for _ in range(3)]
+    assert delays == pytest.approx([5.0, 5.1, 5.2])
+
+
+def test_buckets_are_keyed_by_host_and_proxy():
+    limiter = RateLimiter()
+    first = limiter.bucket('https://github.com/search', 'http://a')
+    assert limiter.bucket('https://github.com/user/repo', 'http://a') is first
+    assert limiter.bucket('https://github.com/search', 'http://b') is not first
+
+
+@pytest.mark.parametrize('status, headers, expected', [
+    (429, {'Retry-After': '30'}, 30),
+    (429, {}, 60),
+    (200, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': 10}, 10),
+    (200, {'X-RateLimit-Remaining': '5', 'X-RateLimit-Reset': 10}, 0),
+])
+def test_pause_from_headers(status, headers, expected):
+    if 'X-RateLimit-Reset' in headers:
+        headers = {**headers, 'X-RateLimit-Reset': str(time.time() + headers['X-RateLimit-Reset'])}
+    limiter = RateLimiter(default_pause=60)
+    assert limiter.pause_from_headers(status, headers) == pytest.approx(expected, abs=0.5)
+
+
+def test_update_pauses_bucket():
+    limiter = RateLimiter()
+    limiter.update('https://github.com/search', None, 429, {'Retry-After': '30'})
+    assert limiter.bucket('https://github.com/search', None).paused_until > time.monotonic() + 29
@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+import aiohttp
+import pytest
+
+from crawler.core import Request
+from crawler.retry import DeadLetterLog, DelayedQueue, RetryPolicy
+
+
+def test_retry_policy_defaults():
+    policy = RetryPolicy(max_retries=3)
+    assert policy.max_retries_for(status=503) == 3
+    assert policy.max_retries_for(status=404) == 0
+    assert policy.max_retries_for(error=aiohttp.ClientConnectionError()) == 3
+    assert policy.max_retries_for(error=ValueError()) == 0
+
+
+def test_retry_policy_overrides():
+    policy = RetryPolicy(max_retries=3, overrides={429: 8, '404': 1, 'ClientProxyConnectionError': 0})
+    assert policy.max_retries_for(status=429) == 8
+    assert policy.max_retries_for(status=404) == 1
+    error = aiohttp.ClientProxyConnectionError(None, OSError())
+    assert policy.max_retries_for(error=error) == 0
+
+
+def test_backoff_is_capped_and_jittered():
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+    delays = [policy.delay(10) for _ in range(100)]
+    assert all(0 <= delay <= 5 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+@pytest.mark.asyncio
+async def test_delayed_queue_releases_in_due_order():
+    target = asyncio.Queue()
+    delayed = DelayedQueue(target)
+    delayed.start()
+    delayed.schedule('late', 0.05)
+    delayed.schedule('early', 0.01)
+    assert len(delayed) == 2
+    await asyncio.wait_for(delayed.wait_empty(), 1)
+    assert [target.get_nowait(), target.get_nowait()] == ['early', 'late']
+    await delayed.stop()
+
+
+def test_dead_letter_log(tmp_path):
+    path = tmp_path / 'dead.jsonl'
+    log = DeadLetterLog(str(path))
+    log.write(Request('https://github.com/search', None, meta={'params': {'q': 'x'}, 'retry_times': 3}), 'status 503')
+    assert json.loads(path.read_text()) == {
+        'url': 'https://github.com/search', 'params': {'q': 'x'}, 'retries': 3, 'reason': 'status 503'
+    }
+    assert log.count == 1
@@ -0,0 +1,62 @@
+import pytest
+
+from crawler.core import Request
+from crawler.parsers.github import GHSearchPageParser
+from crawler.scheduler import Priority, Scheduler
+
+
+@pytest.fixture
+def parser():
+    return GHSearchPageParser()
+
+
+@pytest.mark.asyncio
+async def test_priority_order(parser):
+    scheduler = Scheduler()
+    search = Request('https://github.com/search', parser.parse_search_page, priority=Priority.search)
+    detail = Request('https://github.com/a/b', parser.parse_detail_page, priority=Priority.detail)
+    for obj in (search, detail):
+        await scheduler.put(obj)
+    assert [scheduler.get_nowait() for _ in range(2)] == [detail, search]
+
+
+def test_frontier_needs_room_in_memory():
+    with pytest.raises(ValueError, match='max_memory'):
+        Scheduler(max_memory=0)
+
+
+@pytest.mark.asyncio
+async def test_fifo_within_priority(parser):
+    scheduler = Scheduler()
+    requests = [Request(f'https://github.com/a/{i}', parser.parse_detail_page) for i in range(5)]
+    for request in requests:
+        await scheduler.put(request)
+    assert [scheduler.get_nowait() for _ in range(5)] == requests
+
+
+@pytest.mark.asyncio
+async def test_overflow_spills_to_disk(parser, tmp_path):
+    scheduler = Scheduler(max_memory=4, spill_path=str(tmp_path / 'frontier.sqlite'))
+    for i in range(20):
+        await scheduler.put(Request(f'https://github.com/a/{i}', parser.parse_detail_page, priority=i % 2))
+    assert len(scheduler._queue) == 4
+    assert scheduler.qsize() == 20
+    assert scheduler.spilled == 16
+
+    urls = []
+    while not scheduler.empty():
+        urls.append(scheduler.get_nowait().url)
+    assert scheduler.qsize() == 0
+    odd = [f'https://github.com/a/{i}' for i in range(1, 20, 2)]
+    even = [f'https://github.com/a/{i}' for i in range(0, 20, 2)]
+    assert urls == odd + even
+    scheduler.close()
+
+
+@pytest.mark.asyncio
+async def test_unpicklable_requests_stay_in_memory():
+    scheduler = Scheduler(max_memory=1)
+    for i in range(3):
+        await scheduler.put(Request(f'https://github.com/a/{i}', lambda response: []))
+    assert scheduler.spill is None
+    assert scheduler.qsize() == 3
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+from aiohttp.test_utils import TestClient, TestServer
+
+from crawler.service import CrawlService, JobStatus
+
+
+@pytest_asyncio.fixture
+async def service(fake_github):
+    service = CrawlService({'base_url': fake_github.base_url, 'parse_executor': 'inline', 'max_pages': 1,
+                            'rate_limit': {'rate': 1000, 'burst': 100}}, max_jobs=1)
+    yield service
+    await service.stop()
+
+
+@pytest_asyncio.fixture
+async def client(service):
+    client = TestClient(TestServer(service.app()))
+    await client.start_server()
+    yield client
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_job_streams_items(client, service):
+    response = await client.post('/jobs', json={'keywords': ['python']})
+    assert response.status == 201
+    job_id = (await response.json())['id']
+
+    response = await client.get(f'/jobs/{job_id}/items')
+    items = [json.loads(line) for line in (await response.text()).splitlines()]
+    assert len(items) == 10
+    assert all(item['extra']['owner'].startswith('python-1-') for item in items)
+
+    status = await (await client.get(f'/jobs/{job_id}')).json()
+    assert status['status'] == JobStatus.done
+    assert status['items'] == 10
+    # The shared pool outlives the job
+    assert not service.proxy_pool.states[0].session.closed
+
+
+@pytest.mark.asyncio
+async def test_jobs_start_by_priority(service):
+    first = service.submit(['first'])
+    low = service.submit(['low'], priority=0)
+    high = service.submit(['high'], priority=5)
+    assert first.task is not None and low.task is None and high.task is None
+
+    await asyncio.wait_for(first.task, 10)
+    await asyncio.wait_for(high.task, 10)
+    await asyncio.wait_for(low.task, 10)
+    assert first.started_at < high.started_at < low.started_at
+    assert all(job.status == JobStatus.done for job in (first, low, high))
+
+
+@pytest.mark.asyncio
+async def test_cancel_running_and_queued_jobs(client, service, fake_github):
+    fake_github.latency = 10
+    running = service.submit(['slow'])
+    queued = service.submit(['waiting'])
+    await asyncio.sleep(0.05)
+
+    response = await client.delete(f'/jobs/{running.id}')
+    assert (await response.json())['status'] == JobStatus.cancelled
+    assert all(not stage._tasks for stage in running.crawler.stages)
+    await service.cancel(queued)
+    assert queued.status == JobStatus.cancelled
+    assert not service.running
+
+
+@pytest.mark.asyncio
+async def test_invalid_job_is_rejected(client):
+    assert (await client.post('/jobs', json={'keywords': []})).status == 400
+    assert (await client.post('/jobs', json={'keywords': ['a'], 'priority': 'high'})).status == 400
+    assert (await client.get('/jobs/unknown')).status == 404
@@ -0,0 +1,107 @@
+import asyncio
+import pickle
+import queue
+
+import pytest
+
+from crawler.config import build_crawler
+from crawler.core import Item, Request
+from crawler.dupefilter import request_fingerprint
+from crawler.parsers.github import GHSearchPageParser
+from crawler.sharding import ShardCoordinator, ShardCrawler, ShardRouter, ShardSink, shard_config, shard_for
+from crawler.sinks import BaseExporter, ItemSink
+
+
+class ListExporter(BaseExporter):
+
+    def __init__(self):
+        self.items = []
+
+    def export(self, items):
+        self.items.extend(items)
+
+
+def requests(count):
+    parser = GHSearchPageParser()
+    return [Request(f'https://github.com/a/repo{index}', parser.parse_detail_page) for index in range(count)]
+
+
+def test_shard_for_spreads_fingerprints():
+    shards = [shard_for(request_fingerprint(request), 4) for request in requests(200)]
+    assert set(shards) == {0, 1, 2, 3}
+    assert shard_for('ffffffff', 4) == shard_for('ffffffff', 4)
+
+
+def test_router_hands_off_foreign_requests():
+    outbox = queue.Queue()
+    router = ShardRouter(0, 2, outbox)
+    foreign = next(request for request in requests(20) if not router.owns(request))
+
+    assert router.handoff(foreign)
+    kind, source, target, blob = outbox.get_nowait()
+    assert (kind, source, target) == ('request', 0, 1)
+    assert pickle.loads(blob).url == foreign.url
+    assert router.sent == 1
+
+
+def test_router_keeps_unpicklable_requests():
+    router = ShardRouter(0, 2, queue.Queue())
+    assert not router.handoff(Request('https://github.com/a/b', lambda response: []))
+    assert router.sent == 0
+
+
+def test_shard_config_splits_limits():
+    config = shard_config({'rate_limit': {'rate': 4.0, 'burst': 6}, 'max_per_proxy': 5}, 2)
+    assert config['rate_limit'] == {'rate': 2.0, 'burst': 3}
+    assert config['max_per_proxy'] == 3
+
+
+@pytest.mark.asyncio
+async def test_shard_crawler_routes_and_stops():
+    outbox, inbox = queue.Queue(), queue.Queue()
+    router = ShardRouter(0, 2, outbox)
+    crawler = build_crawler({'keywords': ['python', 'async', 'go', 'rust']}, crawler_cls=ShardCrawler,
+                            router=router, inbox=inbox, sink=ShardSink(outbox), parse_executor='inline')
+    try:
+        assert all(router.owns(request) for request in crawler.start_requests())
+        foreign = next(request for request in requests(20) if not router.owns(request))
+        await crawler.schedule(foreign)
+        await crawler.schedule(Item('https://github.com/a/b'))
+        assert outbox.get_nowait()[0] == 'request'
+        assert crawler.queue.qsize() == 0
+        assert crawler.item_stage.queue.qsize() == 1
+
+        await crawler.sink.put(crawler.item_stage.queue.get_nowait())
+        crawler.item_stage.queue.task_done()
+        assert outbox.get_nowait() == ('item', Item('https://github.com/a/b'))
+
+        inbox.put(None)
+        await asyncio.wait_for(crawler.wait_idle(), 5)
+        assert outbox.get_nowait() == ('idle', 0, 1, 0)
+    finally:
+        await crawler.proxy_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_waits_for_routed_requests():
+    exporter = ListExporter()
+    coordinator = ShardCoordinator({}, 2, ItemSink(exporter))
+    await coordinator.handle(('idle', 0, 1, 0))
+    await coordinator.handle(('idle', 1, 0, 0))
+    assert not coordinator.finished()
+
+    await coordinator.handle(('request', 0, 1, b'blob'))
+    assert coordinator.inboxes[1].get(timeout=1) == b'blob'
+    assert not coordinator.finished()
+    await coordinator.handle(('idle', 1, 0, 1))
+    assert coordinator.finished()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_runs_shard_processes():
+    exporter = ListExporter()
+    sink = ItemSink(exporter, flush_interval=0.01)
+    coordinator = ShardCoordinator({'keywords': []}, 2, sink)
+    await asyncio.wait_for(coordinator.crawl(), 60)
+    assert all(process.exitcode == 0 for process in coordinator.processes)
+    assert exporter.items == []
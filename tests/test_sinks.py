@@ -0,0 +1,91 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from crawler.core import Item
+from crawler.sinks import BaseExporter, ItemSink, JsonLinesExporter, SQLiteExporter
+
+
+class RecordingExporter(BaseExporter):
+    def __init__(self):
+        self.batches = []
+
+    def export(self, items):
+        self.batches.append(list(items))
+
+
+@pytest.mark.asyncio
+async def test_sink_flushes_by_size():
+    exporter = RecordingExporter()
+    sink = ItemSink(exporter, flush_size=2, flush_interval=10)
+    await sink.start()
+    for i in range(5):
+        await sink.put(Item(f'http://{i}.url'))
+    await sink.close()
+    assert [len(batch) for batch in exporter.batches] == [2, 2, 1]
+    assert sink.exported == 5
+
+
+@pytest.mark.asyncio
+async def test_sink_flushes_by_interval():
+    exporter = RecordingExporter()
+    sink = ItemSink(exporter, flush_size=100, flush_interval=0.01)
+    await sink.start()
+    await sink.put(Item('http://some.url'))
+    await asyncio.sleep(0.05)
+    assert exporter.batches == [[Item('http://some.url')]]
+    await sink.close()
+
+
+@pytest.mark.asyncio
+async def test_sink_applies_backpressure():
+    sink = ItemSink(RecordingExporter(), buffer_size=1)
+    await sink.put(Item('http://1.url'))
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(sink.put(Item('http://2.url')), 0.01)
+
+
+@pytest.mark.asyncio
+async def test_jsonl_exporter(tmp_path):
+    path = tmp_path / 'output.json'
+    sink = ItemSink(JsonLinesExporter(str(path)))
+    await sink.start()
+    await sink.put(Item('http://some.url', {'owner': 'me'}))
+    await sink.close()
+    assert [json.loads(line) for line in path.read_text().splitlines()] == [
+        {'url': 'http://some.url', 'extra': {'owner': 'me'}}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_exporter(tmp_path):
+    path = tmp_path / 'output.sqlite'
+    sink = ItemSink(SQLiteExporter(str(path)))
+    await sink.start()
+    await sink.put(Item('http://some.url', {'owner': 'me'}))
+    await sink.close()
+    rows = sqlite3.connect(path).execute('SELECT url, extra FROM items').fetchall()
+    assert rows == [('http://some.url', '{"owner": "me"}')]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_exporter_adds_type_column(tmp_path):
+    path = tmp_path / 'output.sqlite'
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE items (url TEXT, extra TEXT)')
+    connection.commit()
+    sink = ItemSink(SQLiteExporter(str(path)))
+    await sink.start()
+    await sink.put(Item('http://some.url/issues/1', type='issues'))
+    await sink.close()
+    assert connection.execute('SELECT url, type FROM items').fetchall() == [('http://some.url/issues/1', 'issues')]
+
+
+def test_jsonl_recover_truncates_partial_line(tmp_path):
+    path = tmp_path / 'output.json'
+    path.write_text('{"url": "http://1.url", "extra": null}\n{"url": "http://2.u')
+    exporter = JsonLinesExporter(str(path), mode='a')
+    assert exporter.recover() == ['http://1.url']
+    assert path.read_text() == '{"url": "http://1.url", "extra": null}\n'
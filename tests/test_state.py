@@ -0,0 +1,95 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from crawler.core import Item, Request
+from crawler.parsers.github import GHSearchPageParser
+from crawler.state import CrawlState
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = CrawlState(str(tmp_path / 'state.sqlite'))
+    yield state
+    state.close()
+
+
+@pytest.fixture
+def parser():
+    return GHSearchPageParser()
+
+
+def test_request_lifecycle(state, parser):
+    request = Request('https://github.com/a/b', parser.parse_detail_page, meta={'item': Item('https://github.com/a/b')})
+    state.add_request(request)
+    restored, = state.pending_requests()
+    assert restored.url == request.url
+    assert restored.meta['item'] == request.meta['item']
+
+    state.complete(request)
+    assert state.pending_requests() == []
+    assert len(list(state.completed_fingerprints())) == 1
+
+    state.add_request(request)
+    assert state.pending_requests() == []
+
+
+def test_retry_replaces_pending_request(state, parser):
+    state.add_request(Request('https://github.com/a/b', parser.parse_detail_page))
+    state.add_request(Request('https://github.com/a/b', parser.parse_detail_page, meta={'retry_times': 2}))
+    restored, = state.pending_requests()
+    assert restored.meta['retry_times'] == 2
+
+
+def test_items_are_tracked_until_exported(state):
+    first, second = Item('https://github.com/a/b', {'owner': 'a'}), Item('https://github.com/a/c')
+    state.add_item(first)
+    state.add_item(second)
+    state.mark_exported([first])
+    assert state.unexported_items() == [second]
+    state.mark_exported_urls([second.url])
+    assert state.unexported_items() == []
+
+
+def test_reset(state, parser):
+    assert state.is_empty()
+    state.add_item(Item('https://github.com/a/b'))
+    assert not state.is_empty()
+    state.reset()
+    assert state.is_empty()
+
+
+def stored_urls(path) -> list[str]:
+    connection = sqlite3.connect(path)
+    try:
+        return [url for url, in connection.execute('SELECT url FROM items ORDER BY url')]
+    finally:
+        connection.close()
+
+
+@pytest.mark.asyncio
+async def test_changes_are_written_in_batches_from_the_writer(tmp_path, parser):
+    path = str(tmp_path / 'state.sqlite')
+    state = CrawlState(path, flush_size=3, flush_interval=60)
+    await state.start()
+    request = Request('https://github.com/a/b', parser.parse_detail_page)
+    state.add_request(request)
+    state.add_item(Item('https://github.com/a/b'))
+    assert stored_urls(path) == []
+
+    state.complete(request)
+    for _ in range(100):
+        if stored_urls(path):
+            break
+        await asyncio.sleep(0.01)
+    assert stored_urls(path) == ['https://github.com/a/b']
+
+    state.add_item(Item('https://github.com/a/c'))
+    await state.stop()
+    state.close()
+    assert stored_urls(path) == ['https://github.com/a/b', 'https://github.com/a/c']
+    reopened = CrawlState(path)
+    assert reopened.pending_requests() == []
+    assert len(reopened.completed_fingerprints()) == 1
+    reopened.close()
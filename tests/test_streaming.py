@@ -0,0 +1,138 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from crawler.core import Request
+from crawler.parsers.github import DetailPageStream
+from crawler.streaming import MarkerScan, StreamMatcher, TagBalance, read_until
+
+
+DETAIL_HTML = (
+    '<html><body><a data-hovercard-type="user">someone</a>'
+    '<div class="Layout-sidebar"><div><h2>About</h2></div>'
+    '<div><h2>Languages</h2><ul class="list-style-none"><li><a><span>Python</span><span>100%</span></a></li></ul></div>'
+    '</div>' + '<div>footer</div>' * 1000 + '</body></html>'
+)
+
+
+class FakeContent:
+    def __init__(self, body: bytes, chunk_size: int):
+        self.chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+        self.served = 0
+
+    async def iter_chunked(self, size):
+        for chunk in self.chunks:
+            self.served += 1
+            yield chunk
+
+    def at_eof(self):
+        return self.served == len(self.chunks)
+
+
+def fake_response(body: bytes, chunk_size: int = 64):
+    response = MagicMock()
+    response.charset = 'utf-8'
+    response.content = FakeContent(body, chunk_size)
+    return response
+
+
+def test_matcher_needs_owner_and_languages():
+    html = DETAIL_HTML.encode()
+    sidebar = html.index(b'<div class="Layout-sidebar">')
+    matcher = DetailPageStream()
+    matcher.feed(html[:sidebar])
+    assert matcher.owner_found and not matcher.done
+    matcher.feed(html[sidebar:])
+    assert matcher.done
+
+
+def test_matcher_finishes_at_end_of_sidebar_without_languages():
+    matcher = DetailPageStream(need_owner=False)
+    matcher.feed(b'<div class="Layout-sidebar"><div><h2>About</h2></div>')
+    assert not matcher.done
+    matcher.feed(b'</div><div>more</div>')
+    assert matcher.done
+
+
+def test_matcher_finds_markers_split_across_chunks():
+    html = DETAIL_HTML.encode()
+    matcher = DetailPageStream()
+    for i in range(0, len(html), 3):
+        matcher.feed(html[i:i + 3])
+        if matcher.done:
+            break
+    assert matcher.done
+    assert i < html.index(b'<div>footer</div>')
+
+
+def test_marker_scan_alternatives_and_rest():
+    scan = MarkerScan((b'<a', b'<b'), b'>')
+    scan.feed(b'xx<')
+    scan.feed(b'b y')
+    assert not scan.done
+    scan.feed(b'z> after')
+    assert scan.done and scan.rest == b' after'
+
+
+def test_tag_balance_counts_split_tags():
+    balance = TagBalance(b'div')
+    for chunk in (b'<di', b'v><', b'/di', b'v>'):
+        balance.feed(chunk)
+    assert not balance.closed
+    balance.feed(b'</div><p>')
+    assert balance.closed
+
+
+def test_for_request_skips_owner_when_known():
+    assert not DetailPageStream.for_request(Request('u', None, meta={'owner': 'me'})).need_owner
+    assert DetailPageStream.for_request(Request('u', None)).need_owner
+
+
+@pytest.mark.asyncio
+async def test_read_until_stops_early():
+    response = fake_response(DETAIL_HTML.encode())
+    body, truncated = await read_until(response, DetailPageStream())
+    html = body.decode()
+    assert truncated
+    assert '<h2>Languages</h2>' in html
+    assert len(html) < len(DETAIL_HTML) // 2
+    response.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_read_until_respects_byte_cap():
+    response = fake_response(b'<div>filler</div>' * 1000)
+    body, truncated = await read_until(response, DetailPageStream(), max_bytes=256)
+    assert truncated
+    assert len(body) == 256
+
+
+@pytest.mark.asyncio
+async def test_read_until_reads_whole_short_page():
+    response = fake_response('<p>naïve</p>'.encode(), chunk_size=8)
+    body, truncated = await read_until(response, DetailPageStream())
+    assert not truncated
+    assert body == '<p>naïve</p>'.encode()
+    response.close.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_read_until_decompresses_chunks():
+    import gzip
+    from crawler.compression import decoder_for
+
+    body = DETAIL_HTML.encode()
+    response = fake_response(gzip.compress(body), chunk_size=16)
+    matcher = DetailPageStream.for_request(Request('https://github.com/a/b', None))
+    read, truncated = await read_until(response, matcher, content_decoder=decoder_for('gzip'))
+    assert truncated
+    assert body.startswith(read)
+    assert b'Languages' in read
+
+
+def test_matcher_must_define_done():
+    class Incomplete(StreamMatcher):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()